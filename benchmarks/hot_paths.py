@@ -0,0 +1,211 @@
+"""
+Micro-benchmarks for engine hot paths, at several data sizes.
+
+    python -m benchmarks.hot_paths                    (compare with the stored baseline)
+    python -m benchmarks.hot_paths --save-baseline    (record a new baseline)
+    python -m benchmarks.hot_paths --only exchange --fail-on-regression
+
+Each case reports the median time per call over several rounds. The comparison
+flags every case slower than the baseline by more than --threshold (default 25%).
+Baselines are machine specific: record one on the machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from src.database import init_db
+from src.game_engine import GameEngine, CombatSystem, ExchangeSystem
+from src.loadgen import seed_roster
+from src.models import Monster, Ability
+from src.offline_ai import OfflineAIManager
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+
+
+def make_engine(workdir, roster=0):
+    db_path = os.path.join(workdir, f"bench_{roster}_{random.random()}.db")
+    init_db(db_path)
+    if roster:
+        seed_roster(db_path, roster)
+    return GameEngine(db_path=db_path, ai=OfflineAIManager(seed=0))
+
+
+def make_monster(n_abilities=4):
+    monster = Monster({"name": "Bench", "type_1": "Feu", "level": 10, "hp_max": 100, "mp_max": 20,
+                       "attack": 20, "defense": 20, "speed": 20})
+    monster.abilities = [Ability({"name": f"Bench Ability {i}", "type": "Feu", "damage": 40})
+                         for i in range(n_abilities)]
+    return monster
+
+
+# Each case: (name, sizes, setup(size, workdir) -> zero-argument callable)
+
+def bench_get_all_monsters(size, workdir):
+    engine = make_engine(workdir, size)
+    return engine.get_all_monsters
+
+
+def bench_save_monster(size, workdir):
+    engine = make_engine(workdir, size)
+    # Fresh monster (INSERT + abilities) every call
+    return lambda: engine.save_monster(make_monster())
+
+
+def bench_buy_item(size, workdir):
+    engine = make_engine(workdir, size)
+    engine.update_player_money(10 ** 9)
+    return lambda: engine.buy_item("ball", 100)
+
+
+def bench_generate_enemy(size, workdir):
+    engine = make_engine(workdir, size)
+    combat = CombatSystem([], engine)
+    return combat.generate_enemy
+
+
+def bench_attack(size, workdir):
+    combat = CombatSystem([], None)
+    attacker, defender = make_monster(), make_monster()
+    ability = attacker.abilities[0]
+
+    def run():
+        defender.current_hp = defender.hp_max
+        combat.attack(attacker, defender, ability)
+    return run
+
+
+def bench_gain_xp(size, workdir):
+    # size = XP gained per call (bigger -> more level-ups in one call)
+    def run():
+        monster = make_monster(0)
+        monster.level = 1
+        monster.gain_xp(size)
+    return run
+
+
+def bench_exchange_encode(size, workdir):
+    monster = make_monster(size)
+    return lambda: ExchangeSystem.generate_code(monster)
+
+
+def bench_exchange_decode(size, workdir):
+    code = ExchangeSystem.generate_code(make_monster(size))
+    return lambda: ExchangeSystem.load_code(code)
+
+
+CASES = [
+    ("get_all_monsters", [10, 100, 1000], bench_get_all_monsters),
+    ("save_monster", [0, 1000, 10000], bench_save_monster),
+    ("buy_item", [0, 1000], bench_buy_item),
+    ("generate_enemy", [0, 100, 1000], bench_generate_enemy),
+    ("combat_attack", [1], bench_attack),
+    ("gain_xp", [100, 10000, 1000000], bench_gain_xp),
+    ("exchange_encode", [0, 4, 16], bench_exchange_encode),
+    ("exchange_decode", [0, 4, 16], bench_exchange_decode),
+]
+
+
+def measure(fn, rounds=5, min_time=0.05):
+    """Median seconds per call. Calls per round grow until a round lasts min_time."""
+    fn() # Warm up
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 100000:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return statistics.median(samples)
+
+
+def run_suite(only=None, rounds=5):
+    random.seed(0)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        # Offline placeholder images go to this temp dir, not the real assets/
+        os.chdir(workdir)
+        try:
+            for name, sizes, setup in CASES:
+                if only and not any(o in name for o in only):
+                    continue
+                for size in sizes:
+                    results[f"{name}[{size}]"] = measure(setup(size, workdir), rounds) * 1e6
+        finally:
+            os.chdir(cwd)
+    return results # Case -> microseconds per call
+
+
+def compare(results, baseline, threshold):
+    """Returns (report lines, regressions)."""
+    lines = [f"{'case':<32}{'baseline us':>14}{'current us':>14}{'ratio':>8}"]
+    regressions = []
+    for case, current in results.items():
+        base = baseline.get(case)
+        if base is None:
+            lines.append(f"{case:<32}{'-':>14}{current:>14.2f}{'new':>8}")
+            continue
+        ratio = current / base if base else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions.append(case)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        lines.append(f"{case:<32}{base:>14.2f}{current:>14.2f}{ratio:>8.2f}{flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine hot path benchmarks")
+    parser.add_argument("--only", nargs="+", help="Run cases whose name contains one of these")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", help="Also write the raw results to this file")
+    args = parser.parse_args()
+
+    results = run_suite(args.only, args.rounds)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results_us': {k: round(v, 3) for k, v in results.items()},
+            }, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results_us']
+    lines, regressions = compare(results, baseline, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        if args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
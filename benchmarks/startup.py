@@ -0,0 +1,189 @@
+"""
+Startup / time-to-interactive benchmark (offscreen Qt).
+
+    python -m benchmarks.startup --rosters 0 100 1000 --repeat 3
+
+Every run happens in a fresh interpreter (cold imports) inside a temporary working
+directory holding its own save. Measured phases:
+  import_ms (per module), init_db_ms, engine_ms, home_build_ms (HomeWidget incl. its
+  first refresh), home_refresh_ms (second refresh), first_paint_ms (show() -> first paint)
+Results (medians per roster size) are written as JSON so versions can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# Imported one after the other: each time is the cost added by that module
+MODULES = [
+    "PyQt6.QtWidgets",
+    "src.config",
+    "src.database",
+    "src.models",
+    "src.ai_manager",
+    "src.game_engine",
+    "src.gui.home",
+    "src.gui.intro",
+    "src.gui.main_window",
+]
+
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def child(roster, with_images):
+    """Runs inside the fresh interpreter; prints one JSON object."""
+    import importlib
+    timings = {'import_ms': {}}
+
+    for name in MODULES:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings['import_ms'][name] = ms(time.perf_counter() - start)
+
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QObject, QEvent
+    from src.config import DB_PATH, ASSETS_PATH
+    from src.database import init_db
+    from src.game_engine import GameEngine
+    from src.gui.home import HomeWidget
+    from src.gui.main_window import MainWindow
+    from src.loadgen import seed_roster
+
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    os.makedirs(ASSETS_PATH, exist_ok=True)
+
+    start = time.perf_counter()
+    init_db()
+    timings['init_db_ms'] = ms(time.perf_counter() - start)
+
+    if roster:
+        seed_roster(DB_PATH, roster)
+        if with_images:
+            from src.offline_ai import OfflineAIManager
+            image = OfflineAIManager().generate_image("bench", "bench")
+            import sqlite3
+            conn = sqlite3.connect(DB_PATH)
+            conn.execute("UPDATE monsters SET image_path = ?", (image,))
+            conn.commit()
+            conn.close()
+
+    app = QApplication([])
+
+    start = time.perf_counter()
+    engine = GameEngine()
+    timings['engine_ms'] = ms(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    home = HomeWidget(engine)
+    timings['home_build_ms'] = ms(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    home.refresh()
+    timings['home_refresh_ms'] = ms(time.perf_counter() - start)
+    home.deleteLater()
+
+    class PaintWatcher(QObject):
+        painted_at = None
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and self.painted_at is None:
+                self.painted_at = time.perf_counter()
+            return False
+
+    window = MainWindow(engine)
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+    start = time.perf_counter()
+    window.show()
+    deadline = start + 30
+    while watcher.painted_at is None and time.perf_counter() < deadline:
+        app.processEvents()
+    timings['first_paint_ms'] = ms((watcher.painted_at or deadline) - start)
+
+    # Main window is interactive once the lazily built Home page is in place
+    while window.home_page is None and time.perf_counter() < deadline:
+        app.processEvents()
+    timings['interactive_ms'] = ms(time.perf_counter() - start)
+
+    timings['roster'] = roster
+    print(json.dumps(timings))
+
+
+def run_once(roster, with_images):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen", PYTHONPATH=REPO_ROOT)
+        cmd = [sys.executable, "-m", "benchmarks.startup", "--child", "--rosters", str(roster)]
+        if with_images:
+            cmd.append("--images")
+        out = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True, check=True).stdout
+        # Last line is the JSON result (earlier lines are app prints)
+        return json.loads(out.strip().splitlines()[-1])
+
+
+def median_of(runs):
+    result = {'roster': runs[0]['roster'], 'import_ms': {}}
+    for name in runs[0]['import_ms']:
+        result['import_ms'][name] = round(statistics.median(r['import_ms'][name] for r in runs), 3)
+    for key in runs[0]:
+        if key.endswith('_ms') and key != 'import_ms':
+            result[key] = round(statistics.median(r[key] for r in runs), 3)
+    return result
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark (offscreen Qt)")
+    parser.add_argument("--rosters", type=int, nargs="+", default=[0, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--images", action="store_true", help="Give seeded monsters an image")
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/startup-<version>.json)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.rosters[0], args.images)
+        return
+
+    version = git_version()
+    report = {
+        'benchmark': 'startup',
+        'version': version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': [],
+    }
+    for roster in args.rosters:
+        runs = [run_once(roster, args.images) for _ in range(args.repeat)]
+        result = median_of(runs)
+        report['results'].append(result)
+        print(f"roster={roster:>6}  import={sum(result['import_ms'].values()):8.1f} ms  "
+              f"engine={result['engine_ms']:7.1f} ms  home={result['home_build_ms']:8.1f} ms  "
+              f"paint={result['first_paint_ms']:7.1f} ms  interactive={result['interactive_ms']:8.1f} ms")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"startup-{version}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,49 @@
+import time
+STARTUP_T0 = time.perf_counter() # Before any import: time-to-first-window reference
+
 import sys
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
 from src.gui.main_window import MainWindow
 from src.gui.intro import IntroWindow
 from src.database import init_db
 from src.game_engine import GameEngine
+from src.config import DB_PATH, ASSETS_PATH, ASSET_PACK, ASSET_PACK_PATH, STARTUP_TARGET_MS, STARTUP_REPORT
+from src.metrics import metrics
+from src.watchdog import install_qt as install_stall_watchdog
 import os
 
+def report_first_window(name):
+    # Runs on the first event loop iteration, i.e. once the window has been shown
+    elapsed_ms = (time.perf_counter() - STARTUP_T0) * 1000
+    metrics.observe(f"startup.first_window.{name}", elapsed_ms) # Shown in the debug panel
+    if STARTUP_REPORT:
+        status = "OK" if elapsed_ms <= STARTUP_TARGET_MS else "SLOW"
+        print(f"Time to first window ({name}): {elapsed_ms:.0f} ms (target {STARTUP_TARGET_MS} ms) {status}")
+
 def main():
+    # Ensure data and assets folders
+    for folder in (os.path.dirname(DB_PATH), ASSETS_PATH):
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
     # Initialize DB
     init_db()
 
-    # Ensure assets folder
-    if not os.path.exists("assets"):
-        os.makedirs("assets")
-
     app = QApplication(sys.argv)
+    watchdog = install_stall_watchdog(app) # Logs every freeze of the event loop to data/stalls.log
 
+    # One engine shared by every window (AI SDKs load on the first AI call)
     engine = GameEngine()
     team = engine.get_player_team()
+    # Unreferenced images are deleted in the background, the thumbnail pack kept up to date
+    engine.start_asset_gc(pack_path=ASSET_PACK_PATH if ASSET_PACK else None)
+    app.aboutToQuit.connect(engine.asset_gc.stop)
+    engine.start_image_jobs() # Images are generated by priority, resumed after a crash
+    app.aboutToQuit.connect(engine.image_jobs.stop)
+    engine.start_evolution_prefetch() # Evolutions close to their level are generated ahead
+    app.aboutToQuit.connect(engine.evolution_prefetch.stop)
+    app.aboutToQuit.connect(engine.ai.usage.close) # Last: the workers above record AI usage
 
     if not team:
         # First run or reset state
@@ -25,16 +51,17 @@ def main():
 
         def on_intro_finished():
             # Need to keep reference to main_window or make it global/member
-            # Simple way: create new window logic here
             global main_window
-            main_window = MainWindow()
+            main_window = MainWindow(engine)
             main_window.show()
 
         intro.finished.connect(on_intro_finished)
         intro.show()
+        QTimer.singleShot(0, lambda: report_first_window("intro"))
     else:
-        window = MainWindow()
+        window = MainWindow(engine)
         window.show()
+        QTimer.singleShot(0, lambda: report_first_window("main"))
 
     sys.exit(app.exec())
 
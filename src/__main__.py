@@ -0,0 +1,113 @@
+"""
+Headless entry point: python -m src <command>
+
+    python -m src --offline recruit [--count 10]
+    python -m src fight --capture
+    python -m src buy ball
+    python -m src evolve <uuid> / evolve_all
+    python -m src export <uuid> / import <code>
+    python -m src serve --stdin          (JSON lines on stdin/stdout)
+    python -m src serve --http 8080      (POST /<op> on localhost)
+    python -m src --profile-sql state    (SQL statement stats on stderr)
+
+No Qt module is imported.
+"""
+import argparse
+import json
+import os
+import sys
+from src.config import DB_PATH, ASSETS_PATH
+from src.database import init_db
+from src.game_engine import GameEngine
+from src.service import GameService, serve_stdin, make_http_server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src", description="Monstres Infinis (headless)")
+    parser.add_argument("--db", default=DB_PATH, help="Save file (SQLite)")
+    parser.add_argument("--offline", action="store_true", help="Use the offline AI stand-in (no Gemini calls)")
+    parser.add_argument("--seed", type=int, help="Seed for the offline AI stand-in")
+    parser.add_argument("--profile-sql", action="store_true", help="Print SQL statement stats to stderr on exit")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("state", help="Money, inventory and monsters")
+    recruit = sub.add_parser("recruit", help="Recruit level 1 monsters")
+    recruit.add_argument("--count", type=int, default=1, help="How many, paid and saved at once")
+    fight = sub.add_parser("fight", help="Auto-battle a wild monster")
+    fight.add_argument("--capture", action="store_true", help="Try to capture it if won")
+    sub.add_parser("capture", help="Capture the last defeated enemy (serve mode)")
+    sub.add_parser("usage", help="Today's AI usage, cost and budget mode")
+    evolve = sub.add_parser("evolve", help="Evolve a monster")
+    evolve.add_argument("uuid")
+    sub.add_parser("evolve_all", help="Evolve every monster that can")
+    buy = sub.add_parser("buy", help="Buy a shop item")
+    buy.add_argument("item")
+    export = sub.add_parser("export", help="Print the exchange code of a monster")
+    export.add_argument("uuid")
+    import_ = sub.add_parser("import", help="Import a monster from an exchange code")
+    import_.add_argument("code")
+
+    serve = sub.add_parser("serve", help="Serve JSON requests")
+    mode = serve.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--stdin", action="store_true", help="JSON lines on stdin/stdout")
+    mode.add_argument("--http", type=int, metavar="PORT", help="HTTP on 127.0.0.1:PORT")
+    return parser
+
+
+def create_service(args):
+    db_dir = os.path.dirname(args.db)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    os.makedirs(ASSETS_PATH, exist_ok=True)
+    init_db(args.db)
+
+    ai = None
+    if args.offline:
+        from src.offline_ai import OfflineAIManager
+        ai = OfflineAIManager(seed=args.seed)
+    engine = GameEngine(db_path=args.db, ai=ai)
+    if args.profile_sql:
+        engine.enable_sql_profiler()
+    return GameService(engine)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    service = create_service(args)
+    try:
+        return run(args, service)
+    finally:
+        if service.engine.profiler:
+            print(service.engine.profiler.format_report(), file=sys.stderr)
+
+
+def run(args, service):
+    if args.command == "serve":
+        if args.stdin:
+            serve_stdin(service, sys.stdin, sys.stdout)
+        else:
+            server = make_http_server(service, port=args.http)
+            print(f"Listening on http://127.0.0.1:{server.server_port}", file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return 0
+
+    request = {"op": args.command}
+    for field in ("uuid", "code", "count"):
+        if hasattr(args, field):
+            request[field] = getattr(args, field)
+    if args.command == "buy":
+        request["item"] = args.item
+
+    reply = service.handle(request)
+    if args.command == "fight" and args.capture and reply.get('won'):
+        reply['capture'] = service.handle({"op": "capture"})
+
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+    return 0 if reply.get('ok') else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import random
+from src.config import ABILITY_LIBRARY_MIN_PER_TYPE
+from src.metrics import metrics, traced
+
+# Every generated ability is kept in the abilities table (unique by name). The library
+# indexes them by type, power band and legendary flag and builds movesets from them;
+# the AI is only asked for new abilities while a type has fewer than
+# ABILITY_LIBRARY_MIN_PER_TYPE of them.
+
+BANDS = ("support", "low", "mid", "high")
+
+# Band weights by monster level: young monsters mostly get weak moves
+LEVEL_WEIGHTS = [
+    (20, {"low": 3, "mid": 2, "high": 0.5}),
+    (50, {"low": 1, "mid": 3, "high": 1}),
+    (None, {"low": 0.5, "mid": 2, "high": 3}),
+]
+
+
+def power_band(ability):
+    damage = ability.get('damage') or 0
+    if damage <= 0:
+        return "support" # Heal, stun without damage...
+    if damage < 35:
+        return "low"
+    if damage < 60:
+        return "mid"
+    return "high"
+
+
+class AbilityLibrary:
+    def __init__(self, engine, min_per_type=ABILITY_LIBRARY_MIN_PER_TYPE, rng=None):
+        self.engine = engine # engine.ai is looked up on each call (tests and tiers swap it)
+        self.min_per_type = min_per_type
+        self.rng = rng or random.Random()
+        self.index = {} # type -> band -> [ability dict]
+        self.legendary = {} # type -> [ability dict]
+        self.names = set()
+        self._last_id = 0
+
+    def _sync(self):
+        """Indexes abilities added since the last call (by the library, save_monster, imports...)."""
+        rows = self.engine.db_conn.execute(
+            "SELECT * FROM abilities WHERE id > ? ORDER BY id", (self._last_id,)).fetchall()
+        for row in rows:
+            self._index(dict(row))
+            self._last_id = row['id']
+
+    def _index(self, ability):
+        if ability['name'] in self.names:
+            return
+        self.names.add(ability['name'])
+        if ability.get('is_legendary'):
+            self.legendary.setdefault(ability['type'], []).append(ability)
+        else:
+            self.index.setdefault(ability['type'], {}).setdefault(power_band(ability), []).append(ability)
+
+    def size(self, monster_type):
+        self._sync()
+        return sum(len(v) for v in self.index.get(monster_type, {}).values()) + len(self.legendary.get(monster_type, []))
+
+    def add(self, abilities):
+        """Stores new abilities (INSERT OR IGNORE by name) and indexes them."""
+        cursor = self.engine.db_conn.cursor()
+        for a in abilities:
+            cursor.execute('''
+                INSERT OR IGNORE INTO abilities (name, description, type, damage, heal, cost_mp, cost_hp, cooldown_local, cooldown_global, stun_duration, drain_percent, is_legendary, image_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (a.get('name'), a.get('description'), a.get('type'), a.get('damage', 0), a.get('heal', 0),
+                  a.get('cost_mp', 0), a.get('cost_hp', 0), a.get('cooldown_local', 0), a.get('cooldown_global', 0),
+                  a.get('stun_duration', 0), a.get('drain_percent', 0), bool(a.get('is_legendary')), a.get('image_path')))
+        self.engine.db_conn.commit()
+        self._sync()
+
+    def _weights(self, level):
+        for max_level, weights in LEVEL_WEIGHTS:
+            if max_level is None or level < max_level:
+                return weights
+
+    @traced("abilities.moveset")
+    def moveset(self, monster_type, count=4, level=1, allow_legendary=False):
+        """
+        count distinct abilities for a monster: at most one support move, attacks weighted
+        by level, one legendary move if allowed and available. Generated by the AI only while
+        the type's library is too small; the same rules then apply to the fresh abilities.
+        Fewer than count if the type (and Normal) lack attacks.
+        """
+        if self.size(monster_type) < self.min_per_type:
+            metrics.count("abilities.generated")
+            generated = self.engine.ai.generate_abilities(monster_type, count=count)
+            self.add(generated)
+            fresh = {a.get('name') for a in generated}
+            bands = {band: [a for a in pool if a['name'] in fresh]
+                     for band, pool in self.index.get(monster_type, {}).items()}
+            legendary = [a for a in self.legendary.get(monster_type, []) if a['name'] in fresh]
+        else:
+            metrics.count("abilities.reused")
+            bands = self.index.get(monster_type, {})
+            legendary = self.legendary.get(monster_type, [])
+        return self._pick(monster_type, bands, legendary, count, level, allow_legendary)
+
+    def _pick(self, monster_type, bands, legendary, count, level, allow_legendary):
+        rng = self.rng
+        picked = []
+
+        def take(pool):
+            choices = [a for a in pool if a not in picked]
+            if choices:
+                picked.append(rng.choice(choices))
+
+        if allow_legendary:
+            take(legendary)
+        if bands.get("support") and rng.random() < 0.5:
+            take(bands["support"])
+
+        weights = self._weights(level)
+        attack_bands = [b for b in ("low", "mid", "high") if bands.get(b)]
+        for _ in range(count * 3): # Bounded: small bands can run out
+            if len(picked) >= count or not attack_bands:
+                break
+            band = rng.choices(attack_bands, [weights[b] for b in attack_bands])[0]
+            take(bands[band])
+
+        # Short on attacks: complete with the type's (then Normal's) other attacks, and one
+        # support move if there is none yet
+        for pool_type in (monster_type, "Normal"):
+            pool = [a for band in ("low", "mid", "high") for a in self.index.get(pool_type, {}).get(band, [])
+                    if a not in picked]
+            rng.shuffle(pool)
+            picked += pool[:max(0, count - len(picked))]
+        if len(picked) < count and not any(power_band(a) == "support" and not a.get('is_legendary') for a in picked):
+            take(self.index.get(monster_type, {}).get("support", []))
+        return picked[:count]
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.config import AI_BATCH_CONCURRENCY
+from src.metrics import metrics
+
+# Concurrent AI calls for batch operations ("evolve all", "recruit x10").
+#
+# At most AI_BATCH_CONCURRENCY calls are in flight, to stay under the API rate limit. The
+# calls must not use the caller's sqlite connection (the AI usage ledger opens its own per
+# thread): callers write their results afterwards, on their own thread, in one transaction.
+
+PROGRESS_INTERVAL_S = 0.1
+
+
+def fan_out(calls, progress=None, workers=AI_BATCH_CONCURRENCY):
+    """
+    Runs the zero-argument callables concurrently and returns their results in order.
+    progress(done, total) is called on the calling thread as results arrive, and at least
+    every PROGRESS_INTERVAL_S while waiting (a GUI can process its events there). The
+    first exception is raised once every call has finished.
+    """
+    results = [None] * len(calls)
+    if not calls:
+        return results
+    errors = []
+    with metrics.span("ai.batch", size=len(calls)):
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(calls))), thread_name_prefix="ai-batch") as pool:
+            futures = {pool.submit(call): i for i, call in enumerate(calls)}
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=PROGRESS_INTERVAL_S, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                if progress:
+                    progress(len(calls) - len(pending), len(calls))
+    if errors:
+        metrics.error("ai.batch")
+        raise errors[0]
+    return results
@@ -0,0 +1,206 @@
+import datetime
+import sqlite3
+import time
+from src.config import (
+    AI_DAILY_TOKEN_BUDGET, AI_DAILY_IMAGE_BUDGET, AI_BUDGET_ECONOMY_AT,
+    AI_PRICE_INPUT_PER_1M, AI_PRICE_OUTPUT_PER_1M, AI_PRICE_PER_IMAGE, AI_TIER
+)
+from src.database import ThreadConnections
+from src.metrics import metrics
+
+# AI usage accounting and budget-aware scheduling.
+#
+# AIManager records every model call in the ai_usage table through a UsageLedger.
+# BudgetedAI wraps it with the same interface and picks, per call, how to serve it:
+#   normal     -> the real AI
+#   economy    -> (AI_BUDGET_ECONOMY_AT of a daily budget used) abilities reused from the
+#                 save when possible, procedural images, low priority work (prefetch) paused
+#   exhausted  -> everything procedural (src/procedural.py) until the next day
+# With AI_TIER=procedural, everything is procedural whatever the budget.
+
+NORMAL, ECONOMY, EXHAUSTED = "normal", "economy", "exhausted"
+
+
+def today():
+    return datetime.date.today().isoformat()
+
+
+def estimate_tokens(text):
+    # Used when the API does not report usage (~4 characters per token)
+    return max(1, len(text or "") // 4)
+
+
+def call_cost(prompt_tokens, response_tokens, images=0):
+    return (prompt_tokens * AI_PRICE_INPUT_PER_1M + response_tokens * AI_PRICE_OUTPUT_PER_1M) / 1e6 \
+        + images * AI_PRICE_PER_IMAGE
+
+
+class UsageLedger:
+    def __init__(self, db_conn):
+        self.db_conn = db_conn
+        self.db_path = next((row[2] for row in db_conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+        # A connection of its own on every thread: sqlite3 connections belong to their thread
+        # (image job workers, batches), and committing a record on the engine's connection
+        # would also commit whatever the engine has not committed yet
+        self._conns = ThreadConnections(self.db_path) if self.db_path else None # In-memory: cannot be reopened
+
+    def _conn(self):
+        return self._conns.get() if self._conns else self.db_conn
+
+    def close(self):
+        """Closes the connections opened by the ledger (on quit, once the workers are stopped)."""
+        if self._conns:
+            self._conns.close()
+
+    def record(self, method, prompt_tokens=0, response_tokens=0, images=0, latency_ms=0.0, ok=True):
+        conn = self._conn()
+        try:
+            conn.execute('''
+                INSERT INTO ai_usage (ts, day, method, prompt_tokens, response_tokens, images, latency_ms, ok)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (int(time.time()), today(), method, prompt_tokens, response_tokens, images, latency_ms, ok))
+            conn.commit()
+        except sqlite3.OperationalError as e: # e.g. locked by a long write: the call itself went fine
+            print(f"AI usage not recorded ({method}): {e}")
+            metrics.error("ai.usage_record")
+        metrics.count("ai.tokens", prompt_tokens + response_tokens)
+        if images:
+            metrics.count("ai.images", images)
+
+    def totals(self, day=None):
+        row = self._conn().execute('''
+            SELECT count(*), coalesce(sum(prompt_tokens), 0), coalesce(sum(response_tokens), 0),
+                   coalesce(sum(images), 0), coalesce(sum(latency_ms), 0), coalesce(sum(NOT ok), 0)
+            FROM ai_usage WHERE day = ?
+        ''', (day or today(),)).fetchone()
+        calls, prompt_tokens, response_tokens, images, latency_ms, failures = row
+        return {
+            'calls': calls,
+            'failures': failures,
+            'prompt_tokens': prompt_tokens,
+            'response_tokens': response_tokens,
+            'tokens': prompt_tokens + response_tokens,
+            'images': images,
+            'latency_ms': round(latency_ms, 1),
+            'cost': round(call_cost(prompt_tokens, response_tokens, images), 4),
+        }
+
+    def saved_abilities(self, monster_type, count):
+        """Up to count random abilities of monster_type already in the save (no AI call)."""
+        rows = self._conn().execute(
+            "SELECT * FROM abilities WHERE type = ? ORDER BY RANDOM() LIMIT ?", (monster_type, count)).fetchall()
+        return [{k: row[k] for k in row.keys() if k != 'id'} for row in rows]
+
+    def by_method(self, day=None):
+        rows = self._conn().execute('''
+            SELECT method, count(*), sum(prompt_tokens + response_tokens), sum(images), avg(latency_ms)
+            FROM ai_usage WHERE day = ? GROUP BY method ORDER BY method
+        ''', (day or today(),)).fetchall()
+        return {method: {'calls': calls, 'tokens': tokens, 'images': images, 'mean_latency_ms': round(latency, 1)}
+                for method, calls, tokens, images, latency in rows}
+
+
+class BudgetScheduler:
+    def __init__(self, ledger, token_budget=AI_DAILY_TOKEN_BUDGET, image_budget=AI_DAILY_IMAGE_BUDGET,
+                 economy_at=AI_BUDGET_ECONOMY_AT):
+        self.ledger = ledger
+        self.token_budget = token_budget
+        self.image_budget = image_budget
+        self.economy_at = economy_at
+
+    def used_fraction(self, kind="tokens"):
+        """Share of today's budget used (0 = unlimited budget)."""
+        budget = self.token_budget if kind == "tokens" else self.image_budget
+        if not budget:
+            return 0.0
+        return self.ledger.totals()[kind] / budget
+
+    def mode(self, kind="tokens"):
+        used = self.used_fraction(kind)
+        if used >= 1:
+            return EXHAUSTED
+        if used >= self.economy_at:
+            return ECONOMY
+        return NORMAL
+
+    def allows_low_priority(self):
+        return self.mode("tokens") == NORMAL and self.mode("images") == NORMAL
+
+    def status(self):
+        totals = self.ledger.totals()
+        totals['mode'] = self.mode("tokens")
+        totals['image_mode'] = self.mode("images")
+        totals['token_budget'] = self.token_budget
+        totals['image_budget'] = self.image_budget
+        return totals
+
+
+class BudgetedAI:
+    """
+    AIManager interface, served by the real AI, the save's own data or the procedural
+    generator depending on today's budget (see BudgetScheduler).
+    """
+    def __init__(self, ai, db_conn, fallback=None, scheduler=None, tier=AI_TIER):
+        self.ai = ai
+        self.db_conn = db_conn
+        self.tier = tier
+        self.usage = UsageLedger(db_conn)
+        self.scheduler = scheduler or BudgetScheduler(self.usage)
+        self._fallback = fallback
+        ai.usage = self.usage # AIManager records each model call here
+
+    def __getattr__(self, name):
+        # Everything else (model_text, _create_placeholder_image...) is the wrapped AI's
+        return getattr(self.ai, name)
+
+    @property
+    def fallback(self):
+        if self._fallback is None:
+            from src.procedural import ProceduralGenerator
+            self._fallback = ProceduralGenerator()
+        return self._fallback
+
+    def _mode(self, kind="tokens"):
+        if self.tier == "procedural":
+            return EXHAUSTED # Same routing: nothing reaches the real AI
+        return self.scheduler.mode(kind)
+
+    def can_prefetch(self):
+        """Low priority work (speculative generation) only runs while within budget."""
+        return self.tier != "procedural" and self.scheduler.allows_low_priority()
+
+    def _degraded(self, method, mode):
+        metrics.count(f"ai.budget.{mode}")
+        metrics.count(f"ai.budget.{mode}.{method}")
+
+    def generate_monster_stats(self, level=1, context="random", on_field=None):
+        options = {'on_field': on_field} if on_field else {}
+        if self._mode() == EXHAUSTED:
+            self._degraded("generate_monster_stats", EXHAUSTED)
+            return self.fallback.generate_monster_stats(level, context, **options)
+        return self.ai.generate_monster_stats(level, context, **options)
+
+    def generate_abilities(self, monster_type, count=5):
+        mode = self._mode()
+        if mode != NORMAL:
+            self._degraded("generate_abilities", mode)
+            # Abilities already in the save cost nothing
+            saved = self.usage.saved_abilities(monster_type, count)
+            if len(saved) >= count:
+                return saved
+            if mode == EXHAUSTED:
+                return self.fallback.generate_abilities(monster_type, count)
+        return self.ai.generate_abilities(monster_type, count)
+
+    def generate_image(self, description, filename_prefix, is_monster=True):
+        mode = self._mode("images")
+        if mode != NORMAL:
+            self._degraded("generate_image", mode)
+            return self.fallback.generate_image(description, filename_prefix, is_monster)
+        return self.ai.generate_image(description, filename_prefix, is_monster)
+
+    def evolve_monster_stats(self, current_stats, evolution_stage):
+        if self._mode() == EXHAUSTED:
+            self._degraded("evolve_monster_stats", EXHAUSTED)
+            return self.fallback.evolve_monster_stats(current_stats, evolution_stage)
+        return self.ai.evolve_monster_stats(current_stats, evolution_stage)
@@ -1,26 +1,49 @@
-import os
 import json
-import google.generativeai as genai
-from PIL import Image
-from io import BytesIO
-import requests
-# rembg needs to be handled carefully as it might not be installed in some environments
-try:
-    from rembg import remove
-    REMBG_AVAILABLE = True
-except ImportError:
-    REMBG_AVAILABLE = False
-    print("Warning: rembg not found. Background removal disabled.")
-
-from src.config import GEMINI_API_KEY, GEMINI_MODEL_TEXT, ASSETS_PATH
-
-# Configure Gemini
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+import os
+import tempfile
+import time
+from urllib.parse import urljoin
+
+from src.config import GEMINI_API_KEY, GEMINI_MODEL_TEXT, AI_REPAIR_RETRIES, IMAGE_BACKEND_URL
+from src.metrics import metrics, traced
+from src.stream_json import IncrementalJSONObject
+from src.ai_budget import estimate_tokens
+from src.procedural import ProceduralGenerator
+from src.ai_schema import (
+    MONSTER_STATS_SCHEMA, ABILITIES_SCHEMA, EVOLUTION_SCHEMA, STAT_RANGES, extract_json, coerce_field,
+    validate_monster_stats, validate_abilities, validate_evolution
+)
+
+# Heavy SDKs (google.generativeai, PIL) are imported on first use,
+# not at startup: the window can appear before any of them is loaded.
+_genai = None
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        # Configure Gemini
+        if GEMINI_API_KEY:
+            genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
+    return _genai
+
+REPAIR_PROMPT = """
+Your previous answer could not be used:
+{problems}
+
+Previous answer:
+{answer}
+
+Return ONLY the corrected JSON, same structure, no markdown.
+"""
 
 class AIManager:
     def __init__(self):
-        self.model_text = genai.GenerativeModel(GEMINI_MODEL_TEXT)
+        self._model_text = None
+        self.usage = None # UsageLedger recording every model call (set by BudgetedAI)
+        self.procedural = ProceduralGenerator() # Fallback when a call fails
+        self.image_backend_url = IMAGE_BACKEND_URL
         # Note: Image generation usually requires a specific client or endpoint in Vertex AI
         # or the specific Gemini multimodal capability.
         # For this 'free tier' request, we assume the standard GenerativeModel usage if available
@@ -32,9 +55,73 @@ class AIManager:
         # or a standard one if the SDK supports it.
         pass
 
-    def generate_monster_stats(self, level=1, context="random"):
+    @property
+    def model_text(self):
+        # Created on the first AI call (loads the Gemini SDK)
+        if self._model_text is None:
+            self._model_text = get_genai().GenerativeModel(GEMINI_MODEL_TEXT)
+        return self._model_text
+
+    def _stream_text(self, prompt, on_field, generation_config=None):
+        """
+        Streams the response, calling on_field(key, value) for each top-level JSON field
+        as soon as it is complete. Returns (full text, usage metadata of the last chunk).
+        """
+        parser = IncrementalJSONObject()
+        usage = None
+        for chunk in self.model_text.generate_content(prompt, generation_config=generation_config, stream=True):
+            for key, value in parser.feed(chunk.text):
+                on_field(key, value)
+            usage = getattr(chunk, "usage_metadata", None) or usage
+        return parser.text, usage
+
+    def _call_model(self, method, prompt, generation_config, on_field=None):
+        """One model call (streamed if on_field), recorded in the usage ledger. Returns the text."""
+        start = time.perf_counter()
+        text, usage = "", None
+        try:
+            if on_field:
+                text, usage = self._stream_text(prompt, on_field, generation_config)
+            else:
+                response = self.model_text.generate_content(prompt, generation_config=generation_config)
+                text, usage = response.text, getattr(response, "usage_metadata", None)
+            return text
+        finally:
+            if self.usage is not None:
+                # Token counts come from the API when it reports them, else are estimated
+                self.usage.record(
+                    method,
+                    prompt_tokens=getattr(usage, "prompt_token_count", 0) or estimate_tokens(prompt),
+                    response_tokens=getattr(usage, "candidates_token_count", 0) or (estimate_tokens(text) if text else 0),
+                    latency_ms=round((time.perf_counter() - start) * 1000, 1),
+                    ok=bool(text),
+                )
+
+    def _generate_json(self, method, prompt, schema, validate, expect=dict, on_field=None):
+        """
+        JSON mode call constrained by schema. The answer is extracted and checked by validate;
+        if problems remain, the model is asked to fix its own answer (AI_REPAIR_RETRIES times),
+        which is cheaper than generating again from scratch.
+        Raises ValueError when no valid answer was obtained.
+        """
+        config = {"response_mime_type": "application/json", "response_schema": schema}
+        for attempt in range(AI_REPAIR_RETRIES + 1):
+            text = self._call_model(method, prompt, config, on_field if attempt == 0 else None)
+            try:
+                value, problems = validate(extract_json(text, expect))
+            except ValueError as e:
+                problems = [str(e)]
+            if not problems:
+                return value
+            metrics.count("ai.repairs")
+            prompt = REPAIR_PROMPT.format(problems="\n".join(f"- {p}" for p in problems), answer=text[:4000])
+        raise ValueError(f"Invalid answer after {AI_REPAIR_RETRIES} repair(s): {'; '.join(problems)}")
+
+    @traced("ai.generate_monster_stats")
+    def generate_monster_stats(self, level=1, context="random", on_field=None):
         """
         Generates JSON stats for a new monster.
+        on_field(key, value), if given, receives each field while the response is streamed.
         """
         prompt = f"""
         Create a unique RPG monster inspired by Pokémon.
@@ -60,30 +147,28 @@ class AIManager:
         """
 
         try:
-            response = self.model_text.generate_content(prompt)
-            # Clean response of markdown code blocks if present
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.endswith("```"):
-                text = text[:-3]
-            return json.loads(text)
+            if on_field:
+                reveal = on_field
+
+                def on_field(key, value):
+                    # Show the game's type name ("fire" -> "Feu") and integer stats ("80" -> 80)
+                    value = coerce_field(key, value)
+                    if value is None and key in STAT_RANGES:
+                        return # Not a number: validation asks the model to fix it
+                    try:
+                        reveal(key, value)
+                    except Exception as e:
+                        # A display problem must not throw the answer away
+                        print(f"Streamed field '{key}' not shown: {e}")
+                        metrics.error("ai.on_field")
+            return self._generate_json("generate_monster_stats", prompt, MONSTER_STATS_SCHEMA, validate_monster_stats, on_field=on_field)
         except Exception as e:
             print(f"Error generating monster stats: {e}")
-            # Fallback
-            return {
-                "name": "Glitch",
-                "is_mythical": False,
-                "type_1": "Normal",
-                "type_2": None,
-                "hp_max": 20,
-                "mp_max": 10,
-                "attack": 5,
-                "defense": 5,
-                "speed": 5,
-                "description": "A glitchy pixelated blob."
-            }
+            metrics.error("ai.generate_monster_stats")
+            # Fallback: a procedural monster of the requested level (streamed fields included)
+            return self.procedural.generate_monster_stats(level, context, on_field=on_field)
 
+    @traced("ai.generate_abilities")
     def generate_abilities(self, monster_type, count=5):
         """
         Generates a list of abilities.
@@ -110,69 +195,66 @@ class AIManager:
         ]
         """
         try:
-            response = self.model_text.generate_content(prompt)
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.endswith("```"):
-                text = text[:-3]
-            return json.loads(text)
+            return self._generate_json("generate_abilities", prompt, ABILITIES_SCHEMA,
+                                       lambda data: validate_abilities(data, monster_type), expect=list)
         except Exception as e:
             print(f"Error generating abilities: {e}")
-            return []
+            metrics.error("ai.generate_abilities")
+            return self.procedural.generate_abilities(monster_type, count)
 
+    @traced("ai.generate_image")
     def generate_image(self, description, filename_prefix, is_monster=True):
         """
-        Generates an image (mocked or using available tools), removes background, and saves it.
+        Generates an image (HTTP backend if configured, else procedural) and saves it in the
+        content-addressed asset store. Returns the stored path.
         """
-        image_path = os.path.join(ASSETS_PATH, f"{filename_prefix}.png")
-
-        # Attempt Real Generation (Best Effort)
-        # Note: This SDK (google-generativeai) is primarily for text/multimodal chat.
-        # Image generation usually requires 'imagen' model endpoint which might differ.
-        # We assume a standard interface if available, or fallback.
-        try:
-            if self.model_text and GEMINI_API_KEY:
-               # Experimental: Some versions of SDK support model.generate_images or separate ImageGenerationModel
-               # Since specific syntax varies by version (v1beta/v1), we try a generic hypothetical call
-               # or just log that we would call it here.
-               # However, strictly following user request to "Use gemini generation",
-               # we will try to use the 'imagen-3.0-generate-001' if instantiate-able.
-
-               # Example of what the call *would* look like if the SDK exposes it directly:
-               # model = genai.ImageGenerationModel("imagen-3.0-generate-001")
-               # response = model.generate_images(prompt=description, number_of_images=1)
-               # img = response.images[0]
-               # img.save(image_path)
-
-               # Since we can't guarantee the environment supports this specific experimental call
-               # without potentially crashing, we default to placeholder but leave this block
-               # as the place where the integration lives.
-               pass
-
-        except Exception as e:
-            print(f"Image Gen failed: {e}")
+        if self.image_backend_url:
+            try:
+                return self._generate_image_http(description)
+            except Exception as e:
+                print(f"Image backend failed: {e}")
+                metrics.error("ai.generate_image")
 
-        # Fallback to placeholder for stability
-        if not os.path.exists(image_path):
-            self._create_placeholder_image(image_path, description)
+        # No Imagen call yet: the SDK's image API differs between versions (GEMINI_MODEL_IMAGE
+        # is where it would plug in). Procedural art meanwhile.
+        return self.procedural.generate_image(description, filename_prefix)
 
-        return image_path
+    def _generate_image_http(self, description):
+        """
+        Image from the HTTP backend, streamed to a temporary file through the pooled session
+        (checksum verified when the backend gives one), then added to the asset store.
+        """
+        from PIL import Image
+        from src.net.http_pool import get_session, download, stream_to_file, TIMEOUT
+        start = time.perf_counter()
+        fd, tmp = tempfile.mkstemp(suffix=".img")
+        os.close(fd)
+        ok = False
+        try:
+            with get_session().post(self.image_backend_url, json={"prompt": description, "size": 256},
+                                    stream=True, timeout=TIMEOUT) as response:
+                response.raise_for_status()
+                if response.headers.get("Content-Type", "").startswith("application/json"):
+                    reply = response.json()
+                    download(urljoin(self.image_backend_url, reply["url"]), tmp, sha256=reply.get("sha256"))
+                else:
+                    stream_to_file(response, tmp, sha256=response.headers.get("X-Content-SHA256"))
+            with Image.open(tmp) as img:
+                img.load()
+                path = self.procedural.store.put_image(img)
+            ok = True
+            return path
+        finally:
+            os.remove(tmp)
+            if self.usage is not None:
+                self.usage.record("generate_image", images=1 if ok else 0,
+                                  latency_ms=round((time.perf_counter() - start) * 1000, 1), ok=ok)
 
     def _create_placeholder_image(self, path, description):
-        # Create a simple colored block with text
-        from PIL import Image, ImageDraw
-        import random
-
-        img = Image.new('RGBA', (256, 256), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-
-        # Random color blob
-        color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255), 255)
-        draw.ellipse([20, 20, 236, 236], fill=color)
-
-        img.save(path)
+        # Procedural creature drawn from the description (type colours, seeded shape)
+        self.procedural._create_placeholder_image(path, description)
 
+    @traced("ai.evolve_monster_stats")
     def evolve_monster_stats(self, current_stats, evolution_stage):
         """
         Evolves the stats and name.
@@ -199,13 +281,8 @@ class AIManager:
         }}
         """
         try:
-            response = self.model_text.generate_content(prompt)
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.endswith("```"):
-                text = text[:-3]
-            return json.loads(text)
+            return self._generate_json("evolve_monster_stats", prompt, EVOLUTION_SCHEMA, validate_evolution)
         except Exception as e:
             print(f"Error generating evolution: {e}")
-            return current_stats # Fail safe
+            metrics.error("ai.evolve_monster_stats")
+            return self.procedural.evolve_monster_stats(current_stats, evolution_stage)
@@ -0,0 +1,219 @@
+import json
+import re
+import unicodedata
+from src.constants import TYPES
+
+# Structured output for the AI calls: response schemas (Gemini JSON mode), a tolerant
+# JSON extractor and validators that coerce what can be fixed and list what cannot.
+# A validator returns (value, problems); problems are sent back to the model in a
+# repair prompt (see AIManager._generate_json).
+
+MONSTER_STATS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "is_mythical": {"type": "boolean"},
+        "type_1": {"type": "string", "enum": TYPES},
+        "type_2": {"type": "string", "enum": TYPES, "nullable": True},
+        "hp_max": {"type": "integer"},
+        "mp_max": {"type": "integer"},
+        "attack": {"type": "integer"},
+        "defense": {"type": "integer"},
+        "speed": {"type": "integer"},
+        "description": {"type": "string"},
+    },
+    "required": ["name", "type_1", "hp_max", "mp_max", "attack", "defense", "speed", "description"],
+}
+
+ABILITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "description": {"type": "string"},
+        "type": {"type": "string", "enum": TYPES},
+        "damage": {"type": "integer"},
+        "heal": {"type": "integer"},
+        "cost_mp": {"type": "integer"},
+        "cost_hp": {"type": "integer"},
+        "cooldown_local": {"type": "integer"},
+        "cooldown_global": {"type": "integer"},
+        "stun_duration": {"type": "integer"},
+        "drain_percent": {"type": "integer"},
+        "is_legendary": {"type": "boolean"},
+        "visual_description": {"type": "string"},
+    },
+    "required": ["name", "description", "type", "damage", "cost_mp"],
+}
+
+ABILITIES_SCHEMA = {"type": "array", "items": ABILITY_SCHEMA}
+
+EVOLUTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "hp_max": {"type": "integer"},
+        "mp_max": {"type": "integer"},
+        "attack": {"type": "integer"},
+        "defense": {"type": "integer"},
+        "speed": {"type": "integer"},
+        "description": {"type": "string"},
+    },
+    "required": ["name", "hp_max", "mp_max", "attack", "defense", "speed"],
+}
+
+# Accepted ranges; out of range values are clamped
+STAT_RANGES = {'hp_max': (1, 5000), 'mp_max': (0, 2000), 'attack': (1, 1000), 'defense': (1, 1000), 'speed': (1, 1000)}
+ABILITY_RANGES = {
+    'damage': (0, 500), 'heal': (0, 500), 'cost_mp': (0, 200), 'cost_hp': (0, 200),
+    'cooldown_local': (0, 10), 'cooldown_global': (0, 10), 'stun_duration': (0, 5), 'drain_percent': (0, 100),
+}
+
+# English (or misspelt) type names the model sometimes answers with
+TYPE_ALIASES = {
+    "water": "Eau", "fire": "Feu", "electric": "Electricité", "electricity": "Electricité",
+    "grass": "Plante", "plant": "Plante", "rock": "Pierre", "stone": "Pierre", "space": "Espace",
+    "time": "Temps", "light": "Lumière", "dark": "Ténèbre", "darkness": "Ténèbre", "tenebres": "Ténèbre",
+    "psychic": "Psy", "ghost": "Fantome", "steel": "Metal", "monster": "Monstre", "dragon": "Monstre",
+}
+
+
+def _fold(text):
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return text.strip().lower()
+
+_TYPES_BY_KEY = {_fold(t): t for t in TYPES}
+_TYPES_BY_KEY.update(TYPE_ALIASES)
+
+
+def coerce_type(value):
+    """Game type for value ("feu", "Électricité", "Fire"...), or None."""
+    if value is None:
+        return None
+    return _TYPES_BY_KEY.get(_fold(value))
+
+
+def _coerce_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(?:\.\d+)?", value)
+        if match:
+            return int(float(match.group()))
+    return None
+
+
+def coerce_field(key, value):
+    """
+    A streamed monster stats field as validate_monster_stats will keep it, for display
+    before the whole answer is checked: game type names, clamped integer stats (None if
+    not a number).
+    """
+    if key in ('type_1', 'type_2'):
+        return coerce_type(value) or value
+    if key in STAT_RANGES:
+        number = _coerce_int(value)
+        if number is None:
+            return None
+        low, high = STAT_RANGES[key]
+        return max(low, min(high, number))
+    return value
+
+
+def _coerce_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "oui", "1")
+    return bool(value)
+
+
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def extract_json(text, expect=dict):
+    """
+    First JSON value of type expect (dict or list) found in text, ignoring code fences,
+    prose around it and trailing commas. Raises ValueError if there is none.
+    """
+    text = _FENCE.sub("", text or "")
+    opener = "{" if expect is dict else "["
+    decoder = json.JSONDecoder()
+    for candidate in (text, _TRAILING_COMMA.sub(r"\1", text)):
+        start = candidate.find(opener)
+        while start != -1:
+            try:
+                value, _ = decoder.raw_decode(candidate, start)
+                if isinstance(value, expect):
+                    return value
+            except ValueError:
+                pass
+            start = candidate.find(opener, start + 1)
+    raise ValueError(f"No JSON {expect.__name__} in response: {text[:80]!r}")
+
+
+def _check_ranges(data, ranges, problems, required=()):
+    for key, (low, high) in ranges.items():
+        if key not in data or data[key] is None:
+            if key in required:
+                problems.append(f"'{key}' is missing")
+            continue
+        number = _coerce_int(data[key])
+        if number is None:
+            problems.append(f"'{key}' must be an integer, got {data[key]!r}")
+            continue
+        data[key] = max(low, min(high, number))
+
+
+def validate_monster_stats(data):
+    stats = dict(data)
+    problems = []
+    if not str(stats.get('name') or "").strip():
+        problems.append("'name' is missing")
+    type_1 = coerce_type(stats.get('type_1'))
+    if type_1 is None:
+        problems.append(f"'type_1' must be one of {TYPES}, got {stats.get('type_1')!r}")
+    stats['type_1'] = type_1
+    # type_2 is optional: anything unknown ("null", "none", typos) just drops it
+    type_2 = coerce_type(stats.get('type_2'))
+    stats['type_2'] = type_2 if type_2 != type_1 else None
+    stats['is_mythical'] = _coerce_bool(stats.get('is_mythical', False))
+    _check_ranges(stats, STAT_RANGES, problems, required=STAT_RANGES)
+    stats.setdefault('description', stats.get('name') or "monster")
+    return stats, problems
+
+
+def validate_ability(data, default_type=None):
+    ability = dict(data)
+    problems = []
+    if not str(ability.get('name') or "").strip():
+        problems.append("ability 'name' is missing")
+    ability['type'] = coerce_type(ability.get('type')) or default_type or "Normal"
+    ability['is_legendary'] = _coerce_bool(ability.get('is_legendary', False))
+    _check_ranges(ability, ABILITY_RANGES, problems, required=('damage',))
+    for key in ABILITY_RANGES:
+        ability.setdefault(key, 0)
+    return ability, problems
+
+
+def validate_abilities(data, default_type=None):
+    abilities, problems = [], []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict):
+            problems.append(f"item {i} is not an object")
+            continue
+        ability, item_problems = validate_ability(item, default_type)
+        abilities.append(ability)
+        problems += [f"item {i}: {p}" for p in item_problems]
+    if not abilities:
+        problems.append("no abilities")
+    return abilities, problems
+
+
+def validate_evolution(data):
+    stats = dict(data)
+    problems = []
+    if not str(stats.get('name') or "").strip():
+        problems.append("'name' is missing")
+    _check_ranges(stats, STAT_RANGES, problems, required=STAT_RANGES)
+    return stats, problems
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from src.asset_store import AssetStore, store_lock
+from src.config import ASSETS_PATH, ASSET_QUOTA_MB, ASSET_GC_GRACE_S, ASSET_GC_INTERVAL_S
+from src.database import get_db_connection
+from src.metrics import metrics
+
+# Background collector for generated images.
+#
+# 1. Garbage: image files no DB row references (asset_refs.refcount = 0), e.g. the art of a
+#    wild monster that fled, or everything left behind by reset_game. Files younger than
+#    ASSET_GC_GRACE_S are kept: the enemy on screen is not in the DB yet.
+# 2. Quota: past ASSET_QUOTA_MB, art only kept for monster templates (never captured) or
+#    prefetched evolutions is evicted least recently used first (mtime, refreshed on every
+#    reuse). The template then gets a new image the next time it is encountered, the
+#    evolution when it happens.
+#
+# 3. Pack: the thumbnail pack (src/asset_pack.py) at pack_path, if given, is rebuilt when it
+#    no longer matches.
+#
+# Work is done one shard directory at a time with a short pause in between, on its own
+# thread and DB connection, so a big store never blocks the UI.
+
+LEGACY_PREFIXES = ("wild_", "draft_", "evo_", "starter_") # Pre-store per-encounter PNGs in assets/
+
+
+class AssetGC:
+    def __init__(self, db_path=None, store=None, quota_mb=ASSET_QUOTA_MB, grace_s=ASSET_GC_GRACE_S,
+                 interval_s=ASSET_GC_INTERVAL_S, pause_s=0.005, legacy_dir=ASSETS_PATH, pack_path=None):
+        self.db_path = db_path
+        self.store = store or AssetStore()
+        self.quota = quota_mb * 1024 * 1024
+        self.grace_s = grace_s
+        self.interval_s = interval_s
+        self.pause_s = pause_s
+        self.legacy_dir = legacy_dir
+        self.pack_path = pack_path
+        self.last_run = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _batches(self):
+        """Lists of (path, size, mtime) files, one per shard directory (plus legacy files)."""
+        if self.legacy_dir and os.path.isdir(self.legacy_dir):
+            yield [self._entry(e) for e in os.scandir(self.legacy_dir)
+                   if e.is_file() and e.name.startswith(LEGACY_PREFIXES)]
+        if not os.path.isdir(self.store.root):
+            return
+        for first in sorted(os.scandir(self.store.root), key=lambda e: e.name):
+            if not first.is_dir():
+                continue
+            for second in sorted(os.scandir(first.path), key=lambda e: e.name):
+                if second.is_dir():
+                    yield [self._entry(e) for e in os.scandir(second.path)
+                           if e.is_file() and not e.name.endswith(".tmp")]
+
+    @staticmethod
+    def _entry(dir_entry):
+        st = dir_entry.stat()
+        return dir_entry.path, st.st_size, st.st_mtime
+
+    @staticmethod
+    def _refcounts(conn, paths):
+        counts = {}
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            rows = conn.execute(f"SELECT path, refcount FROM asset_refs WHERE path IN ({','.join('?' * len(chunk))})",
+                                chunk)
+            counts.update((row[0], row[1]) for row in rows)
+        return counts
+
+    def _remove(self, conn, path, now):
+        # Re-checked under the store lock: the file may have been reused since the scan
+        with store_lock:
+            try:
+                if now - os.path.getmtime(path) < self.grace_s:
+                    return 0
+                row = conn.execute("SELECT refcount FROM asset_refs WHERE path = ?", (path,)).fetchone()
+                if row and row[0] > 0:
+                    return 0
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return 0
+        conn.execute("DELETE FROM asset_refs WHERE path = ? AND refcount <= 0", (path,))
+        return size
+
+    def run_once(self):
+        """A full incremental pass. Returns a summary dict."""
+        conn = get_db_connection(self.db_path)
+        summary = {"scanned": 0, "removed": 0, "evicted": 0, "freed_bytes": 0, "total_bytes": 0}
+        kept = [] # (mtime, path, size) still referenced
+        try:
+            with metrics.span("assets.gc"):
+                now = time.time()
+                for batch in self._batches():
+                    if self._stop.is_set():
+                        break
+                    counts = self._refcounts(conn, [path for path, _, _ in batch])
+                    for path, size, mtime in batch:
+                        summary["scanned"] += 1
+                        freed = 0
+                        if counts.get(path, 0) <= 0 and now - mtime >= self.grace_s:
+                            freed = self._remove(conn, path, now)
+                        if freed:
+                            summary["removed"] += 1
+                            summary["freed_bytes"] += freed
+                        else:
+                            summary["total_bytes"] += size
+                            kept.append((mtime, path, size))
+                    conn.commit()
+                    time.sleep(self.pause_s)
+                if summary["total_bytes"] > self.quota:
+                    self._evict(conn, kept, summary)
+                if self.pack_path and not self._stop.is_set():
+                    from src.asset_pack import build_pack, is_stale
+                    if is_stale(conn, self.pack_path):
+                        summary["packed"] = build_pack(conn, self.pack_path)[0]
+        finally:
+            conn.close()
+        metrics.count("assets.gc_removed", summary["removed"] + summary["evicted"])
+        self.last_run = summary
+        return summary
+
+    def _evict(self, conn, kept, summary):
+        # Only art that no owned monster or ability shows: template-only references
+        owned = {row[0] for row in conn.execute(
+            "SELECT image_path FROM monsters WHERE image_path IS NOT NULL UNION "
+            "SELECT image_path FROM abilities WHERE image_path IS NOT NULL")}
+        for mtime, path, size in sorted(kept):
+            if summary["total_bytes"] <= self.quota or self._stop.is_set():
+                break
+            if path in owned or time.time() - mtime < self.grace_s:
+                continue
+            conn.execute("UPDATE monster_templates SET image_path = NULL WHERE image_path = ?", (path,))
+            conn.execute("UPDATE evolution_cache SET image_path = NULL WHERE image_path = ?", (path,))
+            conn.commit()
+            with store_lock:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            conn.execute("DELETE FROM asset_refs WHERE path = ? AND refcount <= 0", (path,))
+            conn.commit()
+            summary["evicted"] += 1
+            summary["freed_bytes"] += size
+            summary["total_bytes"] -= size
+
+    # Background thread
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="asset-gc", daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        """Runs a pass as soon as possible (e.g. after reset_game)."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Asset GC failed: {e}")
+                metrics.error("assets.gc")
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
@@ -0,0 +1,243 @@
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from src.config import ASSET_PACK_PATH, ASSET_PACK_SIZES
+from src.metrics import metrics, traced
+
+# Packed thumbnail archive: every image the save references, pre-scaled to the sizes the GUI
+# shows (home cards, combatants) and encoded as lossless WebP/PNG, in one file:
+#
+#     b"MOSPACK1" | index offset (u64) | index length (u32) | blobs... | JSON index
+#
+# The index maps "<image path>|<size>" to (offset, length). Readers mmap the file and hand
+# the slice to the image decoder: a cold Home screen is one open and sequential reads instead
+# of one open + full-size decode per monster. Stored images are content-addressed (never
+# modified), so an entry stays valid as long as its path is referenced.
+#
+# Each build writes a new version next to the configured path (thumbs.<n>.pack for
+# thumbs.pack) and readers switch to the newest one on reload: a file stays untouched while
+# it is mapped (Windows refuses to replace or delete it). Old versions are deleted by the
+# next builds once no reader maps them anymore.
+
+MAGIC = b"MOSPACK1"
+HEADER = struct.Struct("<8sQI")
+
+
+def _key(path, size):
+    return f"{path}|{size}"
+
+
+def _versions(path):
+    """[(version, file)] of the pack files for path, oldest first (path itself is version 0)."""
+    folder = os.path.dirname(path) or "."
+    stem, ext = os.path.splitext(os.path.basename(path))
+    found = [(0, path)] if os.path.exists(path) else []
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        names = []
+    for name in names:
+        middle = name[len(stem) + 1:len(name) - len(ext)]
+        if name.startswith(stem + ".") and name.endswith(ext) and middle.isdigit():
+            found.append((int(middle), os.path.join(folder, name)))
+    return sorted(found)
+
+
+def current_file(path):
+    """The newest pack file for path, or None."""
+    versions = _versions(path)
+    return versions[-1][1] if versions else None
+
+
+class AssetPack:
+    """
+    Read-only view of a pack file, safe to share with decoder threads. Missing or invalid
+    file: every get() returns None.
+    """
+
+    def __init__(self, path=ASSET_PACK_PATH):
+        self.path = path
+        self.file = None # Version being read
+        self.index = {}
+        self.skipped = set()
+        self.sizes = ()
+        self._file = None
+        self._map = None
+        self._mtime = None
+        self._lock = threading.Lock() # reload() must not unmap under a reader
+        self.reload()
+
+    def reload(self):
+        """(Re)opens the file if it changed on disk. Cheap: one stat when it did not."""
+        with self._lock:
+            return self._reload()
+
+    def _reload(self):
+        current = current_file(self.path)
+        try:
+            st = os.stat(current)
+            mtime = (current, st.st_ino, st.st_mtime_ns)
+        except (OSError, TypeError):
+            mtime = None
+        if mtime == self._mtime:
+            return self
+        self._close()
+        self._mtime = mtime
+        if mtime is None:
+            return self
+        try:
+            self.file = current
+            self._file = open(current, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, offset, length = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError("not an asset pack")
+            index = json.loads(self._map[offset:offset + length])
+            self.index = {k: tuple(v) for k, v in index["entries"].items()}
+            self.skipped = set(index.get("skipped", ()))
+            self.sizes = tuple(index["sizes"])
+        except Exception as e:
+            print(f"Asset pack ignored ({current}): {e}")
+            self._close()
+        return self
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = self._file = None
+        self.index = {}
+        self.skipped = set()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def paths(self):
+        """Images the pack accounts for, including the ones that could not be decoded."""
+        return {key.rsplit("|", 1)[0] for key in self.index} | self.skipped
+
+    def get(self, path, size):
+        """Encoded bytes of path pre-scaled to fit size x size, or None if not packed."""
+        data = self.read(_key(path, size))
+        metrics.count("assets.pack_hits" if data is not None else "assets.pack_misses")
+        return data
+
+    def read(self, key):
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            offset, length = entry
+            return self._map[offset:offset + length]
+
+
+def encode_variant(img, size):
+    from PIL import Image
+    variant = img.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    try:
+        variant.save(buf, "WEBP", lossless=True, method=1) # 3-4x faster than 4, same size here
+    except (OSError, KeyError, ValueError): # Pillow built without WebP
+        buf = io.BytesIO()
+        variant.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+@traced("assets.build_pack")
+def build_pack(db_conn, path=ASSET_PACK_PATH, sizes=ASSET_PACK_SIZES):
+    """
+    Writes a new pack version for every referenced image. Entries already in the current pack
+    are copied as is (only new images are decoded and scaled); images that fail to decode are
+    listed as skipped, so they do not make the pack look stale forever. Returns (images
+    packed, images encoded).
+    """
+    from PIL import Image
+    referenced = {row[0] for row in db_conn.execute("SELECT path FROM asset_refs WHERE refcount > 0")}
+    # Roster first, in the Home screen's order: a cold refresh reads the file front to back
+    roster = [row[0] for row in db_conn.execute("SELECT image_path FROM monsters ORDER BY id")]
+    wanted = [p for p in dict.fromkeys(roster + sorted(referenced)) if p in referenced]
+    old = AssetPack(path)
+    sizes = tuple(sizes)
+    versions = _versions(path)
+    stem, ext = os.path.splitext(path)
+    target = f"{stem}.{max(time.time_ns(), versions[-1][0] + 1 if versions else 0)}{ext}"
+    tmp = f"{path}.{os.getpid()}.tmp"
+    entries, skipped, packed, encoded = {}, [], 0, 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        with open(tmp, "wb") as out:
+            out.write(HEADER.pack(MAGIC, 0, 0))
+            for image_path in wanted:
+                if old.sizes == sizes and all(_key(image_path, s) in old for s in sizes):
+                    blobs = [old.read(_key(image_path, s)) for s in sizes]
+                elif old.sizes == sizes and image_path in old.skipped:
+                    skipped.append(image_path) # Content-addressed: still undecodable
+                    continue
+                elif os.path.exists(image_path):
+                    try:
+                        with Image.open(image_path) as img:
+                            img.load()
+                            blobs = [encode_variant(img, s) for s in sizes]
+                    except Exception as e:
+                        print(f"Asset pack skipped {image_path}: {e}")
+                        skipped.append(image_path)
+                        continue
+                    encoded += 1
+                else:
+                    continue
+                for size, blob in zip(sizes, blobs):
+                    entries[_key(image_path, size)] = (out.tell(), len(blob))
+                    out.write(blob)
+                packed += 1
+            index = json.dumps({"sizes": sizes, "entries": entries, "skipped": skipped}).encode()
+            offset = out.tell()
+            out.write(index)
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, offset, len(index)))
+        old.close()
+        os.replace(tmp, target) # A new name: never one a reader has mapped
+    finally:
+        old.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    for _, previous in versions:
+        try:
+            os.remove(previous)
+        except OSError: # Still mapped by a reader (Windows): removed by a later build
+            pass
+    return packed, encoded
+
+
+def is_stale(db_conn, path=ASSET_PACK_PATH):
+    """True when the pack lacks a referenced image or still holds unreferenced ones."""
+    pack = AssetPack(path)
+    try:
+        packed = pack.paths()
+    finally:
+        pack.close()
+    wanted = {row[0] for row in db_conn.execute("SELECT path FROM asset_refs WHERE refcount > 0")}
+    return bool(packed - wanted) or any(p not in packed and os.path.exists(p) for p in wanted)
+
+
+if __name__ == "__main__":
+    # python -m src.asset_pack [db path]: (re)builds the thumbnail pack
+    from src.database import get_db_connection, init_db
+    db_path = sys.argv[1] if len(sys.argv) > 1 else None
+    init_db(db_path)
+    packed, encoded = build_pack(get_db_connection(db_path))
+    pack_file = current_file(ASSET_PACK_PATH)
+    print(f"{packed} image(s) in {pack_file} ({encoded} new), {os.path.getsize(pack_file) / 1024:.0f} KiB")
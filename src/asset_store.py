@@ -0,0 +1,137 @@
+import hashlib
+import io
+import os
+import sys
+import threading
+from src.config import ASSETS_PATH, ASSET_STORE_PATH, ASSET_FORMAT, ASSET_WEBP_QUALITY
+from src.database import IMAGE_TABLES
+from src.metrics import metrics, traced
+
+# Content-addressed image store.
+#
+# Generated images are named after the sha256 of their pixels and written once, compressed
+# (WebP, or optimized PNG when Pillow lacks WebP), under two levels of shard directories:
+#     assets/store/3f/a2/3fa2....webp
+# Identical images (same seeded procedural drawing, template reuse...) share one file and
+# no directory grows past a few hundred entries. The DB counts references to every path in
+# asset_refs (triggers on monsters, abilities and monster_templates, see database.py).
+# A file's mtime is its last use: reusing stored content touches it (LRU for src/asset_gc.py).
+
+store_lock = threading.Lock() # Dedup hits vs. the garbage collector deleting the same file
+
+
+def _webp_available():
+    try:
+        from PIL import features
+        return features.check("webp")
+    except Exception:
+        return False
+
+
+class AssetStore:
+    def __init__(self, root=ASSET_STORE_PATH, fmt=ASSET_FORMAT, quality=ASSET_WEBP_QUALITY):
+        self.root = root
+        self.fmt = "webp" if fmt == "webp" and _webp_available() else "png"
+        self.quality = quality
+
+    @staticmethod
+    def digest(img):
+        h = hashlib.sha256(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode())
+        h.update(img.tobytes())
+        return h.hexdigest()
+
+    def path_for(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.{self.fmt}")
+
+    def encode(self, img):
+        buf = io.BytesIO()
+        if self.fmt == "webp" and img.getcolors(256) is not None:
+            # Flat-colour art (procedural drawings): lossless is ~6x smaller than lossy here
+            img.save(buf, "WEBP", lossless=True, method=6)
+        elif self.fmt == "webp":
+            img.save(buf, "WEBP", quality=self.quality, method=6)
+        else:
+            img.save(buf, "PNG", optimize=True)
+        return buf.getvalue()
+
+    @traced("assets.put_image")
+    def put_image(self, img):
+        """Stores a PIL image, returns its path. Already stored content is not written again."""
+        path = self.path_for(self.digest(img))
+        with store_lock:
+            if self.touch(path):
+                metrics.count("assets.dedup_hits")
+                return path
+        data = self.encode(img)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path) # Atomic: readers never see half a file
+        metrics.count("assets.written")
+        metrics.count("assets.bytes_written", len(data))
+        return path
+
+    def put_file(self, path):
+        """Stores an image file, returns (store path, newly written)."""
+        from PIL import Image
+        with Image.open(path) as img:
+            img.load()
+            is_new = not os.path.exists(self.path_for(self.digest(img)))
+            return self.put_image(img), is_new
+
+    @staticmethod
+    def touch(path):
+        """Marks a stored file as just used. False if it does not exist (anymore)."""
+        try:
+            os.utime(path)
+            return True
+        except (OSError, TypeError):
+            return False
+
+    def contains(self, path):
+        return bool(path) and os.path.abspath(path).startswith(os.path.abspath(self.root) + os.sep)
+
+
+def migrate(db_conn, store=None):
+    """
+    Moves the images referenced by the DB into the store (legacy one-file-per-monster PNGs),
+    rewrites image_path and deletes the old files. Returns (files moved, bytes saved).
+    """
+    store = store or AssetStore()
+    paths = [row[0] for row in db_conn.execute("SELECT path FROM asset_refs WHERE refcount > 0")]
+    moved, saved = 0, 0
+    for old in paths:
+        if store.contains(old) or not os.path.exists(old):
+            continue
+        try:
+            new, is_new = store.put_file(old)
+        except Exception as e:
+            print(f"Asset migration skipped {old}: {e}")
+            continue
+        for table in IMAGE_TABLES:
+            db_conn.execute(f"UPDATE {table} SET image_path = ? WHERE image_path = ?", (new, old))
+        db_conn.commit()
+        saved += os.path.getsize(old) - (os.path.getsize(new) if is_new else 0)
+        os.remove(old)
+        moved += 1
+    return moved, saved
+
+
+if __name__ == "__main__":
+    # python -m src.asset_store [migrate|gc] [db path]
+    #   migrate: move legacy assets/*.png into the store
+    #   gc: one garbage collection / quota pass (see src/asset_gc.py)
+    from src.database import get_db_connection, init_db
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else None
+    init_db(db_path)
+    if command == "gc":
+        from src.asset_gc import AssetGC
+        from src.config import ASSET_PACK, ASSET_PACK_PATH
+        summary = AssetGC(db_path=db_path, pack_path=ASSET_PACK_PATH if ASSET_PACK else None).run_once()
+        print(f"{summary['scanned']} file(s) scanned, {summary['removed']} removed, {summary['evicted']} evicted, "
+              f"{summary['freed_bytes'] / 1024:.0f} KiB freed, {summary['total_bytes'] / 1024:.0f} KiB in use")
+    else:
+        moved, saved = migrate(get_db_connection(db_path))
+        print(f"{moved} image(s) moved to {ASSET_STORE_PATH}, {saved / 1024:.0f} KiB saved (from {ASSETS_PATH})")
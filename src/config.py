@@ -7,17 +7,102 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 # Note: 'gemini-2.5' might not be the exact string yet, defaulting to a high capability model variable.
 GEMINI_MODEL_TEXT = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
 GEMINI_MODEL_IMAGE = "imagen-3.0-generate-001"
+# Optional HTTP image backend: POST {"prompt", "size"} answers the image itself or JSON
+# {"url", "sha256"} to download. Connections are pooled (see src/net/http_pool.py).
+IMAGE_BACKEND_URL = os.getenv("IMAGE_BACKEND_URL", "")
+HTTP_POOL_SIZE = 8
+HTTP_CONNECT_TIMEOUT_S = 5
+HTTP_READ_TIMEOUT_S = int(os.getenv("HTTP_READ_TIMEOUT_S", "60"))
+DOWNLOAD_MAX_BYTES = 20 * 1024 * 1024
+AI_REPAIR_RETRIES = 1 # Invalid JSON answers are sent back to the model for correction this many times
+# "ai": Gemini first, procedural generator as fallback. "procedural": local generator only (no calls).
+AI_TIER = os.getenv("AI_TIER", "ai")
+# Abilities are reused from the save once a type has this many (see src/ability_library.py)
+ABILITY_LIBRARY_MIN_PER_TYPE = int(os.getenv("ABILITY_LIBRARY_MIN_PER_TYPE", "12"))
+# Monster templates (see src/monster_templates.py): near-duplicate threshold (estimated Jaccard
+# of name/description shingles), share of new encounters remixed from the library once it
+# holds TEMPLATE_MIN_LIBRARY templates
+TEMPLATE_SIMILARITY = 0.6
+TEMPLATE_REUSE_RATE = float(os.getenv("TEMPLATE_REUSE_RATE", "0.5"))
+TEMPLATE_MIN_LIBRARY = 30
+
+# AI budget (per day, 0 = unlimited). Past AI_BUDGET_ECONOMY_AT of a budget the game saves
+# calls (reused abilities, procedural images, no prefetch); past 100% it goes fully procedural.
+AI_DAILY_TOKEN_BUDGET = int(os.getenv("AI_DAILY_TOKEN_BUDGET", "500000"))
+AI_DAILY_IMAGE_BUDGET = int(os.getenv("AI_DAILY_IMAGE_BUDGET", "100"))
+AI_BUDGET_ECONOMY_AT = 0.8
+# Batch operations (evolve all, recruit x10): AI calls in flight at once (see src/ai_batch.py)
+AI_BATCH_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "4"))
+# Prices (USD) used for the cost estimate
+AI_PRICE_INPUT_PER_1M = float(os.getenv("AI_PRICE_INPUT_PER_1M", "1.25"))
+AI_PRICE_OUTPUT_PER_1M = float(os.getenv("AI_PRICE_OUTPUT_PER_1M", "5.0"))
+AI_PRICE_PER_IMAGE = float(os.getenv("AI_PRICE_PER_IMAGE", "0.03"))
 
 # Game Constants
 DB_PATH = os.path.join("data", "game.db")
 ASSETS_PATH = "assets"
+# Generated images: content-addressed, deduplicated store (see src/asset_store.py)
+ASSET_STORE_PATH = os.path.join(ASSETS_PATH, "store")
+ASSET_FORMAT = os.getenv("ASSET_FORMAT", "webp") # "webp" or "png" (optimized)
+ASSET_WEBP_QUALITY = int(os.getenv("ASSET_WEBP_QUALITY", "90"))
+# Background asset GC (see src/asset_gc.py): unreferenced images older than the grace period
+# are deleted; past the quota, template-only art is evicted least recently used first
+ASSET_QUOTA_MB = int(os.getenv("ASSET_QUOTA_MB", "200"))
+ASSET_GC_GRACE_S = 600
+ASSET_GC_INTERVAL_S = int(os.getenv("ASSET_GC_INTERVAL_S", "300"))
+# Packed thumbnails (see src/asset_pack.py), rebuilt by the asset GC when out of date.
+# Sizes are the ones the GUI draws: home cards, player and enemy in combat.
+ASSET_PACK = os.getenv("ASSET_PACK", "1") == "1"
+ASSET_PACK_PATH = os.path.join(ASSETS_PATH, "thumbs.pack")
+ASSET_PACK_SIZES = (100, 150, 200)
+# GUI image decoding (see src/gui/images.py): worker threads and decoded pixmaps kept in memory
+IMAGE_DECODER_THREADS = int(os.getenv("IMAGE_DECODER_THREADS", "2"))
+IMAGE_CACHE_SIZE = 512
+# Image generation queue (see src/image_jobs.py)
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+IMAGE_JOB_MAX_ATTEMPTS = 3
+
+# Startup budget: main.py reports time-to-first-window against this
+STARTUP_TARGET_MS = int(os.getenv("STARTUP_TARGET_MS", "1500"))
+STARTUP_REPORT = os.getenv("MOS_STARTUP_REPORT", "") == "1" # Also print it on stdout
+
+# Debug panel exports (spans as JSON lines / Chrome trace)
+METRICS_EXPORT_DIR = os.path.join("data", "metrics")
+
+# SQL profiler (opt-in, see src/query_profiler.py)
+PROFILE_SQL = os.getenv("MOS_PROFILE_SQL", "") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "20"))
+SLOW_QUERY_LOG = os.path.join("data", "slow_queries.log")
+N_PLUS_ONE_THRESHOLD = 10 # Same statement this many times in one action
+QUERY_PROFILER_PROGRESS_OPS = 100 # VM instructions between two progress ticks
+
+# Event loop stall watchdog (0 disables it), see src/watchdog.py
+STALL_THRESHOLD_MS = float(os.getenv("STALL_THRESHOLD_MS", "250"))
+STALL_LOG = os.path.join("data", "stalls.log")
 
 # Gameplay Constants
 MAX_TEAM_SIZE = 3
 BOSS_PROBABILITY = 0.01
 EVOLUTION_LEVEL_1 = 45
 EVOLUTION_LEVEL_2 = 90
+# Evolutions are pre-generated in the background this many levels before (see src/evolution_prefetch.py)
+EVOLUTION_PREFETCH_LEVELS = int(os.getenv("EVOLUTION_PREFETCH_LEVELS", "3"))
 MAX_LEVEL = 100
 
 # Security
 SECRET_KEY = b'change_this_to_a_random_key_for_production' # For hash generation
+
+# Exchange ledger (used codes). Bloom filter sized for this many codes.
+LEDGER_BLOOM_CAPACITY = int(os.getenv("LEDGER_BLOOM_CAPACITY", "1000000"))
+LEDGER_BLOOM_ERROR_RATE = 0.001
+
+# Trade server (optional, see src/net/trade_server.py)
+TRADE_SERVER_HOST = os.getenv("TRADE_SERVER_HOST", "127.0.0.1")
+TRADE_SERVER_PORT = int(os.getenv("TRADE_SERVER_PORT", "8765"))
+TRADE_SERVER_DB = os.path.join("data", "trade_server.db")
+
+# PvP battle server (optional, see src/net/battle_server.py)
+BATTLE_SERVER_HOST = os.getenv("BATTLE_SERVER_HOST", "127.0.0.1")
+BATTLE_SERVER_PORT = int(os.getenv("BATTLE_SERVER_PORT", "8766"))
+BATTLE_TURN_TIMEOUT = 30 # Seconds before a missing move defaults to "Lutte"
+BATTLE_MAX_TURNS = 200 # Immune matchups (e.g. Normal vs Fantome) could otherwise never end
@@ -4,6 +4,16 @@ TYPES = [
     "Fantome", "Poison", "Metal", "Monstre", "Normal"
 ]
 
+# Shop: item_id -> (label, price)
+SHOP_ITEMS = {
+    "ball": ("Ball de Capture", 100),
+    "potion": ("Potion de Soin", 50),
+    "revive": ("Rappel", 200),
+    "boost_atk": ("Boost Attaque", 150),
+    "boost_spd": ("Boost Vitesse", 150),
+    "ability_copier": ("Copieur de Capacité", 1000),
+}
+
 # Key: Attacker Type, Value: {Defender Type: Multiplier}
 # Default is 1.0. Weakness usually 2.0, Resistance 0.5.
 TYPE_CHART = {
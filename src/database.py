@@ -1,14 +1,46 @@
 import sqlite3
 import json
+import threading
 from src.config import DB_PATH
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Tables with an image_path column: reference-counted in asset_refs, rewritten by migrations
+IMAGE_TABLES = ("monsters", "abilities", "monster_templates", "evolution_cache")
+
+def get_db_connection(path=None, **options):
+    conn = sqlite3.connect(path or DB_PATH, **options)
     conn.row_factory = sqlite3.Row
     return conn
 
-def init_db():
-    conn = get_db_connection()
+
+class ThreadConnections:
+    """
+    One connection to the save per thread (background workers, GUI). close() closes all of
+    them, once the threads using them are done (e.g. after joining the workers).
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._local = threading.local()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Closed by close() from another thread: no same-thread check
+            conn = self._local.conn = get_db_connection(self.path, check_same_thread=False)
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            opened, self._opened = self._opened, []
+            self._local = threading.local() # Used again after a restart: new connections
+        for conn in opened:
+            conn.close()
+
+def init_db(path=None):
+    conn = get_db_connection(path)
     cursor = conn.cursor()
 
     # Monsters Table
@@ -53,6 +85,8 @@ def init_db():
         )
     ''')
 
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_abilities_type ON abilities(type)')
+
     # Monster-Ability Mapping (A monster knows specific moves)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS monster_abilities (
@@ -81,6 +115,124 @@ def init_db():
         )
     ''')
 
+    # Redeemed exchange codes (one row per code digest, see src/ledger.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS used_codes (
+            digest BLOB PRIMARY KEY,
+            redeemed_at INTEGER
+        ) WITHOUT ROWID
+    ''')
+
+    # Generated monster species, deduplicated by similarity (see src/monster_templates.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS monster_templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            type_1 TEXT,
+            type_2 TEXT,
+            is_mythical BOOLEAN,
+            hp_max REAL, -- Level 1 equivalents
+            mp_max REAL,
+            attack REAL,
+            defense REAL,
+            speed REAL,
+            description TEXT,
+            image_path TEXT,
+            signature BLOB, -- MinHash of name/description shingles
+            uses INTEGER DEFAULT 1,
+            created_at INTEGER
+        )
+    ''')
+
+    # AI calls (see src/ai_budget.py): one row per model call, summed per day for the budgets
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts INTEGER,
+            day TEXT, -- YYYY-MM-DD, local time
+            method TEXT,
+            prompt_tokens INTEGER DEFAULT 0,
+            response_tokens INTEGER DEFAULT 0,
+            images INTEGER DEFAULT 0,
+            latency_ms REAL,
+            ok BOOLEAN
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ai_usage_day ON ai_usage(day)')
+
+    # Image generation queue (see src/image_jobs.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS image_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            prompt_hash TEXT UNIQUE,
+            prompt TEXT,
+            priority INTEGER,
+            status TEXT, -- pending, running, done, failed
+            image_path TEXT,
+            attempts INTEGER DEFAULT 0,
+            error TEXT,
+            created_at INTEGER,
+            finished_at INTEGER
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_image_jobs_queue ON image_jobs(status, priority, id)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS image_job_targets (
+            job_id INTEGER,
+            kind TEXT, -- monster (uuid), template (id) or evolution (monster uuid)
+            key TEXT,
+            PRIMARY KEY (job_id, kind, key)
+        )
+    ''')
+
+    # Prefetched evolutions (see src/evolution_prefetch.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS evolution_cache (
+            monster_uuid TEXT,
+            stage INTEGER, -- evolution_stage it evolves from
+            name TEXT,
+            description TEXT,
+            ratios TEXT, -- JSON: new stat / stat when generated
+            image_path TEXT,
+            created_at INTEGER,
+            PRIMARY KEY (monster_uuid, stage)
+        )
+    ''')
+
+    # References to image files (see src/asset_store.py), kept up to date by triggers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS asset_refs (
+            path TEXT PRIMARY KEY,
+            refcount INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table in IMAGE_TABLES:
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_asset_insert AFTER INSERT ON {table}
+            WHEN NEW.image_path IS NOT NULL BEGIN
+                INSERT INTO asset_refs (path, refcount) VALUES (NEW.image_path, 1)
+                ON CONFLICT(path) DO UPDATE SET refcount = refcount + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS {table}_asset_update AFTER UPDATE OF image_path ON {table}
+            WHEN OLD.image_path IS NOT NEW.image_path BEGIN
+                UPDATE asset_refs SET refcount = refcount - 1 WHERE path = OLD.image_path;
+                INSERT INTO asset_refs (path, refcount) SELECT NEW.image_path, 1 WHERE NEW.image_path IS NOT NULL
+                ON CONFLICT(path) DO UPDATE SET refcount = refcount + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS {table}_asset_delete AFTER DELETE ON {table}
+            WHEN OLD.image_path IS NOT NULL BEGIN
+                UPDATE asset_refs SET refcount = refcount - 1 WHERE path = OLD.image_path;
+            END;
+        ''')
+    # Recount at startup: covers databases created before the triggers existed
+    cursor.execute("DELETE FROM asset_refs")
+    cursor.execute(f'''
+        INSERT INTO asset_refs (path, refcount)
+        SELECT image_path, count(*) FROM (
+            {" UNION ALL ".join(f"SELECT image_path FROM {table}" for table in IMAGE_TABLES)}
+        ) WHERE image_path IS NOT NULL GROUP BY image_path
+    ''')
+
     # Initialize player if not exists
     cursor.execute('INSERT OR IGNORE INTO player (id, money) VALUES (1, 1000)')
 
@@ -0,0 +1,170 @@
+import json
+import queue
+import threading
+import time
+from src.config import EVOLUTION_LEVEL_1, EVOLUTION_LEVEL_2, EVOLUTION_PREFETCH_LEVELS
+from src.database import ThreadConnections
+from src.image_jobs import PRIORITY_PREFETCH
+from src.metrics import metrics
+
+# Speculative evolutions.
+#
+# When a monster gets within EVOLUTION_PREFETCH_LEVELS of its next evolution level, its
+# evolution (name, description, stats) and art are generated in the background and kept in
+# the evolution_cache table, so pressing "Évoluer" costs no AI call. Stats are stored as
+# ratios to the stats they were generated from: the levels gained in between still count.
+# Only runs while the AI budget allows low priority work (BudgetedAI.can_prefetch).
+
+STATS = ('hp_max', 'mp_max', 'attack', 'defense', 'speed')
+
+
+def evolution_level(stage):
+    """Level of the next evolution from stage, or None (final stage, or mythical: no level)."""
+    return {0: EVOLUTION_LEVEL_1, 1: EVOLUTION_LEVEL_2}.get(stage)
+
+
+def peek_cached(db_conn, monster):
+    """
+    The prefetched evolution of monster as evolve_monster_stats would return it, with
+    'image_path' (may be None while queued), or None if there is none. The row is kept.
+    """
+    row = db_conn.execute('''
+        SELECT name, description, ratios, image_path FROM evolution_cache WHERE monster_uuid = ? AND stage = ?
+    ''', (monster.uuid, monster.evolution_stage)).fetchone()
+    if row is None:
+        metrics.count("evolution_prefetch.misses")
+        return None
+    metrics.count("evolution_prefetch.hits")
+    ratios = json.loads(row['ratios'])
+    stats = {stat: max(1, round(getattr(monster, stat) * ratios[stat])) for stat in STATS if stat in ratios}
+    stats.update(name=row['name'], description=row['description'], image_path=row['image_path'])
+    return stats
+
+
+def drop_cached(db_conn, monster):
+    """Deletes the prefetched evolution of monster, in the caller's transaction (no commit)."""
+    db_conn.execute("DELETE FROM evolution_cache WHERE monster_uuid = ? AND stage = ?",
+                    (monster.uuid, monster.evolution_stage))
+
+
+class EvolutionPrefetcher:
+    def __init__(self, engine, window=EVOLUTION_PREFETCH_LEVELS):
+        self.engine = engine
+        self.window = window
+        self.pending = queue.Queue() # Monster snapshots (dicts)
+        self.queued = set() # (uuid, stage) in pending or being generated
+        self.lock = threading.Lock()
+        self._conns = ThreadConnections(engine.db_path)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _conn(self):
+        return self._conns.get()
+
+    def allowed(self):
+        can_prefetch = getattr(self.engine.ai, "can_prefetch", None)
+        return can_prefetch() if can_prefetch else True # Unmetered AI (offline)
+
+    def is_due(self, monster):
+        target = evolution_level(monster.evolution_stage)
+        return target is not None and monster.level >= target - self.window
+
+    def notify(self, monster):
+        """Queues monster if it is close to evolving (after a level up). True if queued."""
+        if not self.is_due(monster) or not self.allowed():
+            return False
+        key = (monster.uuid, monster.evolution_stage)
+        with self.lock:
+            if key in self.queued:
+                return False
+            cached = self._conn().execute("SELECT 1 FROM evolution_cache WHERE monster_uuid = ? AND stage = ?",
+                                          key).fetchone()
+            if cached:
+                return False
+            self.queued.add(key)
+        self.pending.put(monster.to_dict())
+        return True
+
+    def scan(self):
+        """Queues every monster of the save that is close to evolving. Returns how many."""
+        rows = self._conn().execute('''
+            SELECT * FROM monsters m
+            WHERE ((m.evolution_stage = 0 AND m.level >= ?) OR (m.evolution_stage = 1 AND m.level >= ?))
+              AND NOT EXISTS (SELECT 1 FROM evolution_cache c
+                              WHERE c.monster_uuid = m.uuid AND c.stage = m.evolution_stage)
+        ''', (EVOLUTION_LEVEL_1 - self.window, EVOLUTION_LEVEL_2 - self.window)).fetchall()
+        from src.models import Monster
+        return sum(self.notify(Monster(dict(row))) for row in rows)
+
+    def prefetch(self, data):
+        """Generates and caches the next evolution of the monster snapshot data."""
+        conn = self._conn()
+        stage = data['evolution_stage']
+        with metrics.span("evolution_prefetch.generate"):
+            new_stats = self.engine.ai.evolve_monster_stats(dict(data), stage)
+        ratios = {stat: new_stats[stat] / data[stat] for stat in STATS
+                  if new_stats.get(stat) is not None and data.get(stat)}
+        description = new_stats.get('description', new_stats.get('name', data['name']))
+        # Row first: a queued image is written to it by the job queue ('evolution' target)
+        conn.execute('''
+            INSERT OR REPLACE INTO evolution_cache (monster_uuid, stage, name, description, ratios, image_path, created_at)
+            VALUES (?, ?, ?, ?, ?, NULL, ?)
+        ''', (data['uuid'], stage, new_stats.get('name', data['name']), description, json.dumps(ratios),
+              int(time.time())))
+        conn.commit()
+        jobs = self.engine.image_jobs
+        if jobs is None:
+            path = self.engine.ai.generate_image(description, f"evo_{data['uuid']}")
+        else:
+            path = jobs.submit(description, PRIORITY_PREFETCH, [('evolution', f"{data['uuid']}|{stage}")])
+        if path:
+            conn.execute("UPDATE evolution_cache SET image_path = ? WHERE monster_uuid = ? AND stage = ?",
+                         (path, data['uuid'], stage))
+            conn.commit()
+        metrics.count("evolution_prefetch.generated")
+
+    def run_next(self, block=False, timeout=None):
+        """Prefetches the next queued monster. False when there was nothing to do."""
+        try:
+            data = self.pending.get(block, timeout)
+        except queue.Empty:
+            return False
+        try:
+            if self.allowed(): # The budget may have run low since it was queued
+                self.prefetch(data)
+        except Exception as e:
+            print(f"Evolution prefetch failed ({data.get('name')}): {e}")
+            metrics.error("evolution_prefetch.generate")
+        finally:
+            with self.lock:
+                self.queued.discard((data['uuid'], data['evolution_stage']))
+        return True
+
+    def drain(self):
+        """Runs every queued prefetch in the calling thread (tests)."""
+        while self.run_next():
+            pass
+
+    # Background thread
+
+    def start(self):
+        self._stop.clear()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="evolution-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._conns.close()
+
+    def _loop(self):
+        try:
+            self.scan()
+        except Exception as e:
+            print(f"Evolution prefetch scan failed: {e}")
+        while not self._stop.is_set():
+            self.run_next(block=True, timeout=0.5)
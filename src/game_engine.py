@@ -3,16 +3,88 @@ import json
 import hashlib
 import hmac
 import base64
-from src.config import SECRET_KEY, BOSS_PROBABILITY, MAX_TEAM_SIZE
+import uuid
+from src.config import SECRET_KEY, BOSS_PROBABILITY, MAX_TEAM_SIZE, EVOLUTION_LEVEL_1, EVOLUTION_LEVEL_2, PROFILE_SQL
 from src.models import Monster, Ability
 from src.database import get_db_connection
 from src.ai_manager import AIManager
+from src.ai_budget import BudgetedAI
+from src.ability_library import AbilityLibrary
+from src.monster_templates import TemplateLibrary
+from src.asset_store import AssetStore
+from src.evolution_prefetch import peek_cached, drop_cached
+from src.ai_batch import fan_out
+from src.image_jobs import PRIORITY_ACTIVE, PRIORITY_TEAM, PRIORITY_ROSTER
 from src.constants import get_type_multiplier
+from src.ledger import CodeLedger
+from src.metrics import metrics, traced
 
 class GameEngine:
-    def __init__(self):
-        self.ai = AIManager()
-        self.db_conn = get_db_connection()
+    def __init__(self, db_path=None, ai=None):
+        # ai: any object with the AIManager interface (e.g. OfflineAIManager for headless runs)
+        self.db_path = db_path
+        self.db_conn = get_db_connection(db_path)
+        # The real AI is metered and falls back to procedural content past the daily budget
+        self.ai = ai or BudgetedAI(AIManager(), self.db_conn)
+        self.ledger = CodeLedger(self.db_conn)
+        self.abilities = AbilityLibrary(self)
+        self.templates = TemplateLibrary(self.db_conn)
+        self.profiler = None
+        if PROFILE_SQL:
+            self.enable_sql_profiler()
+        self.asset_gc = None
+        self.image_jobs = None
+        self.evolution_prefetch = None
+
+    def enable_sql_profiler(self, **options):
+        """Records every statement run on db_conn (see src/query_profiler.py)."""
+        from src.query_profiler import QueryProfiler
+        if self.profiler is None:
+            self.profiler = QueryProfiler(**options).attach(self.db_conn)
+        return self.profiler
+
+    def start_asset_gc(self, **options):
+        """Deletes unreferenced images in the background (see src/asset_gc.py)."""
+        from src.asset_gc import AssetGC
+        if self.asset_gc is None:
+            self.asset_gc = AssetGC(db_path=self.db_path, **options).start()
+        return self.asset_gc
+
+    def start_image_jobs(self, **options):
+        """Generates images on background workers, by priority (see src/image_jobs.py)."""
+        from src.image_jobs import ImageJobQueue
+        if self.image_jobs is None:
+            self.image_jobs = ImageJobQueue(self.ai, db_path=self.db_path, **options).start()
+        return self.image_jobs
+
+    def start_evolution_prefetch(self, **options):
+        """Pre-generates upcoming evolutions in the background (see src/evolution_prefetch.py)."""
+        from src.evolution_prefetch import EvolutionPrefetcher
+        if self.evolution_prefetch is None:
+            self.evolution_prefetch = EvolutionPrefetcher(self, **options).start()
+        return self.evolution_prefetch
+
+    def request_image(self, description, filename_prefix, priority=PRIORITY_ROSTER, monster=None, template_id=None):
+        """
+        Image for description. Without the job queue it is generated now. With it, the path is
+        only returned if the prompt was already rendered; otherwise None, and monster and the
+        template get their image_path (DB and memory) once the queue has made it.
+        """
+        if self.image_jobs is None:
+            return self.ai.generate_image(description, filename_prefix)
+        targets = []
+        if monster is not None:
+            targets.append(('monster', monster.uuid))
+        if template_id is not None:
+            targets.append(('template', template_id))
+
+        def on_done(path):
+            if monster is not None:
+                monster.image_path = path
+            if template_id in (self.templates.templates or {}):
+                self.templates.templates[template_id]['image_path'] = path
+
+        return self.image_jobs.submit(description, priority, targets, on_done)
 
     def reset_game(self):
         """
@@ -22,9 +94,13 @@ class GameEngine:
         cursor.execute("DELETE FROM monster_abilities")
         cursor.execute("DELETE FROM monsters")
         cursor.execute("DELETE FROM inventory")
+        cursor.execute("DELETE FROM evolution_cache")
         cursor.execute("UPDATE player SET money = 1000 WHERE id = 1")
         self.db_conn.commit()
+        if self.asset_gc:
+            self.asset_gc.wake() # The old roster's images are garbage now
 
+    @traced("db.get_player_team")
     def get_player_team(self):
         """Returns list of Monster objects."""
         # Simplified: In this prototype, team is just the first 3 monsters in DB.
@@ -39,6 +115,7 @@ class GameEngine:
             monsters.append(m)
         return monsters
 
+    @traced("db.get_all_monsters")
     def get_all_monsters(self):
         cursor = self.db_conn.cursor()
         cursor.execute("SELECT * FROM monsters")
@@ -50,6 +127,37 @@ class GameEngine:
             monsters.append(m)
         return monsters
 
+    def image_for_new_monster(self, stats, filename_prefix, level=1, monster=None, priority=PRIORITY_ROSTER):
+        """
+        Image for freshly generated stats. A near-duplicate of a known template reuses its
+        image (no generation, no new file); otherwise the monster becomes a new template.
+        None while the image is queued (see request_image).
+        """
+        template, is_duplicate = self.templates.register(stats, level)
+        if is_duplicate and AssetStore.touch(template['image_path']):
+            return template['image_path']
+        path = self.request_image(stats.get('description', 'monster'), filename_prefix, priority,
+                                  monster=monster, template_id=template['id'])
+        if path:
+            self.templates.set_image(template['id'], path)
+        return path
+
+    def image_for_remix(self, stats, filename_prefix, level=1, monster=None, priority=PRIORITY_ROSTER):
+        """Image of a template remix; regenerated if the asset GC evicted it."""
+        if AssetStore.touch(stats.get('image_path')):
+            return stats['image_path']
+        return self.image_for_new_monster(stats, filename_prefix, level, monster, priority)
+
+    def get_monster(self, monster_uuid):
+        cursor = self.db_conn.cursor()
+        cursor.execute("SELECT * FROM monsters WHERE uuid = ?", (monster_uuid,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        m = Monster(dict(row))
+        m.abilities = self.get_monster_abilities(m.id)
+        return m
+
     def get_monster_abilities(self, monster_id):
         cursor = self.db_conn.cursor()
         cursor.execute('''
@@ -65,12 +173,14 @@ class GameEngine:
         cursor.execute("SELECT money FROM player WHERE id = 1")
         return cursor.fetchone()['money']
 
-    def update_player_money(self, amount):
+    def update_player_money(self, amount, commit=True):
         cursor = self.db_conn.cursor()
         cursor.execute("UPDATE player SET money = money + ? WHERE id = 1", (amount,))
-        self.db_conn.commit()
+        if commit:
+            self.db_conn.commit()
         return self.get_player_money()
 
+    @traced("db.buy_item")
     def buy_item(self, item_name, cost):
         if self.get_player_money() >= cost:
             self.update_player_money(-cost)
@@ -84,6 +194,7 @@ class GameEngine:
             return True
         return False
 
+    @traced("db.use_item")
     def use_item(self, item_name):
         cursor = self.db_conn.cursor()
         cursor.execute("SELECT quantity FROM inventory WHERE item_name = ?", (item_name,))
@@ -106,7 +217,111 @@ class GameEngine:
         # Real implementation would read max_hp and update current_hp (if we stored current_hp in DB)
         pass
 
-    def save_monster(self, monster):
+    def can_evolve(self, monster):
+        """Returns (bool, reason)."""
+        if monster.level < EVOLUTION_LEVEL_1 and monster.evolution_stage == 0:
+            return False, f"Niveau {EVOLUTION_LEVEL_1} requis pour la première évolution."
+        if monster.level < EVOLUTION_LEVEL_2 and monster.evolution_stage == 1:
+            return False, f"Niveau {EVOLUTION_LEVEL_2} requis pour la deuxième évolution."
+        if monster.evolution_stage >= 2 and not monster.is_mythical:
+            return False, "Ce monstre a atteint son stade final."
+        return True, ""
+
+    @traced("engine.evolve_monster")
+    def evolve_monster(self, monster):
+        """
+        Evolves the monster (AI stats + new image) and saves it. Returns (success, message).
+        """
+        ok, reason = self.can_evolve(monster)
+        if not ok:
+            return False, reason
+
+        # Prefetched when the monster got close to the threshold: no AI call. Only consumed
+        # with the save, so a failure keeps it (and its image) for the next try
+        cached = peek_cached(self.db_conn, monster)
+        new_stats = cached or self.ai.evolve_monster_stats(monster.to_dict(), monster.evolution_stage)
+        path = self._evolution_image(monster, new_stats, monster.uuid in self._team_uuids())
+        try:
+            if cached:
+                drop_cached(self.db_conn, monster)
+            self._apply_evolution(monster, new_stats, path)
+            self.save_monster(monster, commit=False)
+            self.db_conn.commit()
+        except Exception:
+            self.db_conn.rollback()
+            raise
+        return True, f"Votre monstre a évolué en {monster.name} !"
+
+    @traced("engine.evolve_all")
+    def evolve_all(self, progress=None):
+        """
+        Evolves every monster that can: the AI calls run concurrently (see src/ai_batch.py),
+        then all of them are saved in one transaction. progress(done, total) as in fan_out.
+        Returns the evolved monsters.
+        """
+        monsters = [m for m in self.get_all_monsters() if self.can_evolve(m)[0]]
+        # Prefetched evolutions are only consumed with the save: a failed batch keeps them
+        cached = {m.uuid: peek_cached(self.db_conn, m) for m in monsters}
+        team = self._team_uuids()
+
+        results = fan_out([lambda m=m: cached[m.uuid] or self.ai.evolve_monster_stats(m.to_dict(), m.evolution_stage)
+                           for m in monsters], progress)
+        # Images on this thread: the job queue and the monster callbacks are not the workers' business
+        paths = [self._evolution_image(monster, new_stats, monster.uuid in team)
+                 for monster, new_stats in zip(monsters, results)]
+        try:
+            for monster, new_stats, path in zip(monsters, results, paths):
+                if cached[monster.uuid]:
+                    drop_cached(self.db_conn, monster)
+                self._apply_evolution(monster, new_stats, path)
+                self.save_monster(monster, commit=False)
+            self.db_conn.commit()
+        except Exception:
+            self.db_conn.rollback()
+            raise
+        return monsters
+
+    def _team_uuids(self):
+        return {row['uuid'] for row in self.db_conn.execute("SELECT uuid FROM monsters LIMIT ?", (MAX_TEAM_SIZE,))}
+
+    def _evolution_image(self, monster, new_stats, in_team):
+        path = new_stats.get('image_path')
+        if AssetStore.touch(path):
+            return path
+        # Queued: the monster keeps its current look until the new one is ready
+        return self.request_image(new_stats.get('description', new_stats.get('name', monster.name)),
+                                  f"evo_{monster.uuid}", PRIORITY_TEAM if in_team else PRIORITY_ROSTER,
+                                  monster=monster)
+
+    @staticmethod
+    def _apply_evolution(monster, new_stats, path):
+        monster.name = new_stats.get('name', monster.name)
+        for stat in ['hp_max', 'mp_max', 'attack', 'defense', 'speed']:
+            if new_stats.get(stat) is not None:
+                setattr(monster, stat, int(new_stats[stat]))
+        monster.evolution_stage += 1
+        if path:
+            monster.image_path = path
+
+    def import_monster(self, code_str):
+        """
+        Redeems an exchange code and saves its monster as a new local copy, in one transaction:
+        a failed save does not burn the code. Returns the monster, or None if the code is
+        invalid or already used.
+        """
+        try:
+            monster = ExchangeSystem.load_code(code_str, ledger=self.ledger, commit=False)
+            if monster is not None:
+                monster.uuid = str(uuid.uuid4()) # The original may coexist with the copy
+                self.save_monster(monster, commit=False)
+            self.db_conn.commit()
+        except Exception:
+            self.db_conn.rollback()
+            raise
+        return monster
+
+    @traced("db.save_monster")
+    def save_monster(self, monster, commit=True):
         cursor = self.db_conn.cursor()
 
         # Check if exists
@@ -117,8 +332,10 @@ class GameEngine:
 
         if existing:
             monster_id = existing['id']
+            # coalesce: an instance loaded before its queued image was written must not erase it
             cursor.execute('''
-                UPDATE monsters SET level=?, xp=?, hp_max=?, mp_max=?, attack=?, defense=?, speed=?, evolution_stage=?, name=?, image_path=?
+                UPDATE monsters SET level=?, xp=?, hp_max=?, mp_max=?, attack=?, defense=?, speed=?, evolution_stage=?, name=?,
+                       image_path=coalesce(?, image_path)
                 WHERE uuid=?
             ''', (monster.level, monster.xp, monster.hp_max, monster.mp_max, monster.attack, monster.defense, monster.speed, monster.evolution_stage, monster.name, monster.image_path, monster.uuid))
         else:
@@ -146,7 +363,9 @@ class GameEngine:
                     # Link
                     cursor.execute("INSERT OR IGNORE INTO monster_abilities (monster_id, ability_id) VALUES (?, ?)", (monster_id, ab_id))
 
-        self.db_conn.commit()
+        monster.id = monster_id
+        if commit:
+            self.db_conn.commit()
 
 class CombatSystem:
     def __init__(self, player_team, engine):
@@ -156,12 +375,15 @@ class CombatSystem:
         self.turn_log = []
         self.is_boss_fight = False
 
-    def generate_enemy(self):
+    @traced("combat.generate_enemy")
+    def generate_enemy(self, on_field=None):
         """
         Logic:
         1. Determine level (2 to 80).
         2. Determine if Boss (1% chance).
         3. 1/(Existing Monsters + 1) chance of new monster vs existing.
+        on_field(key, value) receives the stats of a new monster while they are generated
+        (before its image and abilities), so the UI can show them early.
         """
         level = random.randint(2, 80)
         is_boss = random.random() < BOSS_PROBABILITY
@@ -174,21 +396,39 @@ class CombatSystem:
         new_monster_chance = 1.0 / (count + 1)
 
         if random.random() < new_monster_chance or count == 0:
-            # Generate New
-            stats = self.engine.ai.generate_monster_stats(level=level, context="boss" if is_boss else "wild")
-            if is_boss:
-                stats['is_mythical'] = True
-                # Boost stats x10 (simulated here roughly)
-                for key in ['hp_max', 'attack', 'defense', 'speed']:
-                    stats[key] = int(stats.get(key, 10) * 10)
-
-            # Create visuals immediately? Or wait? Let's do it now.
-            monster = Monster(stats)
-            img_path = self.engine.ai.generate_image(stats.get('description', 'monster'), f"wild_{monster.uuid}")
-            monster.image_path = img_path
+            # Generate New (bosses are always unique; others may be remixed from known templates)
+            stats = None if is_boss else self.engine.templates.maybe_reuse(level)
+            if stats is not None:
+                monster = Monster(stats)
+                monster.image_path = self.engine.image_for_remix(stats, f"wild_{monster.uuid}", level, monster,
+                                                                 PRIORITY_ACTIVE)
+                if on_field:
+                    for key, value in stats.items():
+                        on_field(key, value)
+            else:
+                options = {}
+                if on_field:
+                    def boss_aware(key, value):
+                        if is_boss and key in ('hp_max', 'attack', 'defense', 'speed'):
+                            value = int(value * 10)
+                        on_field(key, value)
+                    options['on_field'] = boss_aware
+                stats = self.engine.ai.generate_monster_stats(level=level, context="boss" if is_boss else "wild", **options)
+                monster = Monster(stats)
+                if is_boss:
+                    stats['is_mythical'] = True
+                    # Boost stats x10 (simulated here roughly)
+                    for key in ['hp_max', 'attack', 'defense', 'speed']:
+                        stats[key] = int(stats.get(key, 10) * 10)
+                    monster = Monster(stats)
+                    monster.image_path = self.engine.request_image(stats.get('description', 'monster'), f"wild_{monster.uuid}",
+                                                                   PRIORITY_ACTIVE, monster=monster)
+                else:
+                    monster.image_path = self.engine.image_for_new_monster(stats, f"wild_{monster.uuid}", level, monster,
+                                                                           PRIORITY_ACTIVE)
 
             # Generate Abilities
-            abilities_data = self.engine.ai.generate_abilities(monster.type_1, count=4)
+            abilities_data = self.engine.abilities.moveset(monster.type_1, count=4, level=level, allow_legendary=is_boss)
             monster.abilities = [Ability(a) for a in abilities_data]
 
             self.enemy = monster
@@ -201,7 +441,6 @@ class CombatSystem:
 
             # CRITICAL: Create a NEW UUID for the encounter instance.
             # If we don't, capturing it updates the original record (which might belong to the player).
-            import uuid
             monster.uuid = str(uuid.uuid4())
             monster.id = None # Ensure it's treated as new insertion
 
@@ -249,11 +488,79 @@ class CombatSystem:
         defender.current_hp = max(0, defender.current_hp - damage)
         return damage
 
+    def enemy_turn(self, target):
+        """
+        Enemy attacks target with a random ability. Returns (move_name, damage).
+        """
+        enemy_ab = random.choice(self.enemy.abilities) if self.enemy.abilities else None
+        dmg = self.attack(self.enemy, target, enemy_ab)
+        return (enemy_ab.name if enemy_ab else "Attaque"), dmg
+
+    def award_xp(self, monster):
+        """
+        XP for defeating the current enemy. Saves the monster. Returns (xp, leveled_up).
+        """
+        xp = self.enemy.level * 10
+        leveled = monster.gain_xp(xp)
+        self.engine.save_monster(monster)
+        if leveled and self.engine.evolution_prefetch:
+            self.engine.evolution_prefetch.notify(monster)
+        return xp, leveled
+
+    @traced("combat.capture")
+    def capture(self):
+        """
+        Tries to capture the defeated enemy (needs a 'ball'). Returns (captured, message).
+        """
+        if not self.engine.use_item("ball"):
+            return False, "Vous avez besoin d'une 'ball' (à acheter en boutique)."
+
+        # 70% chance, only possible once the enemy is defeated
+        if random.random() > 0.3:
+            # Reset stats before saving (heal)
+            self.enemy.current_hp = self.enemy.hp_max
+            self.engine.save_monster(self.enemy)
+            return True, "Capture réussie !"
+        return False, "La capture a échoué... La ball s'est brisée."
+
+    def auto_battle(self, max_turns=200):
+        """
+        Plays the whole fight without UI: each player monster uses its strongest ability.
+        Returns a dict with the outcome and the battle log.
+        """
+        if self.enemy is None:
+            self.generate_enemy()
+        team = [m for m in self.player_team if m.current_hp > 0]
+        log = [f"Un {self.enemy.name} sauvage apparaît (Niveau {self.enemy.level}) !"]
+
+        for _ in range(max_turns):
+            if not team:
+                return {'won': False, 'log': log}
+            active = team[0]
+            ability = max(active.abilities, key=lambda a: a.damage or 0) if active.abilities else None
+            dmg = self.attack(active, self.enemy, ability)
+            log.append(f"{active.name} utilise {ability.name if ability else 'Lutte'} et inflige {dmg} dégâts !")
+
+            if self.enemy.current_hp <= 0:
+                xp, leveled = self.award_xp(active)
+                log.append(f"Vous avez vaincu {self.enemy.name} ! Gain de {xp} XP.")
+                return {'won': True, 'log': log, 'xp': xp, 'leveled_up': leveled, 'monster': active}
+
+            move_name, dmg = self.enemy_turn(active)
+            log.append(f"L'ennemi {self.enemy.name} utilise {move_name} et inflige {dmg} dégâts !")
+            if active.current_hp <= 0:
+                log.append(f"{active.name} est KO !")
+                team.pop(0)
+
+        log.append("Le combat s'éternise, vous fuyez.")
+        return {'won': False, 'log': log}
+
 class RecruitmentSystem:
     def __init__(self, engine):
         self.engine = engine
         self.cost = 500 # Base cost
 
+    @traced("recruit.draft_monster")
     def draft_monster(self):
         money = self.engine.get_player_money()
         if money < self.cost:
@@ -261,26 +568,77 @@ class RecruitmentSystem:
 
         self.engine.update_player_money(-self.cost)
 
-        # Generate Level 1 Weak Monster
-        stats = self.engine.ai.generate_monster_stats(level=1, context="weak starter")
-        monster = Monster(stats)
-        path = self.engine.ai.generate_image(stats.get('description'), f"draft_{monster.uuid}")
-        monster.image_path = path
+        # Generate Level 1 Weak Monster (or remix a known template)
+        stats = self.engine.templates.maybe_reuse(1)
+        if stats is not None:
+            monster = Monster(stats)
+            monster.image_path = self.engine.image_for_remix(stats, f"draft_{monster.uuid}", 1, monster)
+        else:
+            stats = self.engine.ai.generate_monster_stats(level=1, context="weak starter")
+            monster = Monster(stats)
+            monster.image_path = self.engine.image_for_new_monster(stats, f"draft_{monster.uuid}", 1, monster)
 
         # Abilities
-        abilities_data = self.engine.ai.generate_abilities(monster.type_1, count=4)
+        abilities_data = self.engine.abilities.moveset(monster.type_1, count=4, level=1)
         monster.abilities = [Ability(a) for a in abilities_data]
 
         self.engine.save_monster(monster)
         return monster, "Success"
 
+    @traced("recruit.draft_monsters")
+    def draft_monsters(self, count, progress=None):
+        """
+        Recruits count monsters, all or nothing: their stats are generated concurrently (see
+        src/ai_batch.py), then the price and the monsters are written in one transaction.
+        progress(done, total) as in fan_out. Returns (monsters, message).
+        """
+        if count < 1:
+            return [], "Invalid count"
+        total = self.cost * count
+        if self.engine.get_player_money() < total:
+            return [], "Not enough money"
+
+        remixes = [self.engine.templates.maybe_reuse(1) for _ in range(count)]
+        stats_list = fan_out([
+            lambda stats=stats: stats or self.engine.ai.generate_monster_stats(level=1, context="weak starter")
+            for stats in remixes], progress)
+
+        # Images and abilities may write to the DB (templates, AI usage): before the transaction,
+        # but not for a recruitment that can no longer be paid (money spent during the AI calls)
+        if self.engine.get_player_money() < total:
+            return [], "Not enough money"
+        monsters = []
+        for remixed, stats in zip(remixes, stats_list):
+            monster = Monster(stats)
+            image_for = self.engine.image_for_remix if remixed else self.engine.image_for_new_monster
+            monster.image_path = image_for(stats, f"draft_{monster.uuid}", 1, monster)
+            abilities_data = self.engine.abilities.moveset(monster.type_1, count=4, level=1)
+            monster.abilities = [Ability(a) for a in abilities_data]
+            monsters.append(monster)
+
+        conn = self.engine.db_conn
+        try:
+            if self.engine.get_player_money() < total: # Spent by another thread during the images
+                return [], "Not enough money"
+            self.engine.update_player_money(-total, commit=False)
+            for monster in monsters:
+                self.engine.save_monster(monster, commit=False)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return monsters, "Success"
+
 class ExchangeSystem:
     @staticmethod
     def generate_code(monster):
         """
         Serialize monster data + HMAC signature.
+        Abilities are part of the signed data so a peer (e.g. the battle server) can trust them.
         """
         data = monster.to_dict()
+        if monster.abilities:
+            data['abilities'] = [a.to_dict() for a in monster.abilities]
         json_str = json.dumps(data, sort_keys=True)
 
         # Create signature
@@ -291,7 +649,20 @@ class ExchangeSystem:
         return base64.b64encode(payload.encode()).decode()
 
     @staticmethod
-    def load_code(code_str):
+    def code_digest(code_str):
+        """
+        Ledger key of a code (only meaningful once the code has been verified).
+        """
+        payload = json.loads(base64.b64decode(code_str).decode())
+        return CodeLedger.digest(payload['sig'])
+
+    @staticmethod
+    def load_code(code_str, ledger=None, commit=True):
+        """
+        Verifies and decodes a code. If a ledger is given, the code is also
+        redeemed: a code that was already used is rejected. commit=False: see
+        CodeLedger.redeem.
+        """
         try:
             decoded = base64.b64decode(code_str).decode()
             payload = json.loads(decoded)
@@ -303,10 +674,16 @@ class ExchangeSystem:
             json_str = json.dumps(data, sort_keys=True)
             expected_sig = hmac.new(SECRET_KEY, json_str.encode(), hashlib.sha256).hexdigest()
 
-            if hmac.compare_digest(sig, expected_sig):
-                return Monster(data)
-            else:
+            if not hmac.compare_digest(sig, expected_sig):
                 raise ValueError("Invalid signature")
+
+            if ledger is not None and not ledger.redeem(CodeLedger.digest(expected_sig), commit=commit):
+                raise ValueError("Code already used")
+
+            monster = Monster(data)
+            monster.abilities = [Ability(a) for a in data.get('abilities', [])]
+            return monster
         except Exception as e:
             print(f"Exchange Error: {e}")
+            metrics.error("exchange.load_code")
             return None
@@ -1,17 +1,40 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QProgressBar, QMessageBox, QTextEdit
+    QProgressBar, QMessageBox, QTextEdit, QGridLayout, QApplication
 )
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import Qt, pyqtSignal
 from src.game_engine import CombatSystem
+from src.gui.images import decoder, PRIORITY_ACTIVE, PLACEHOLDER_TEXT
+from src.metrics import metrics
 import os
 
+def format_preview(stats):
+    """Text for a monster whose stats are still arriving (missing fields are skipped)."""
+    lines = []
+    if 'name' in stats:
+        lines.append(stats['name'])
+    types = [t for t in (stats.get('type_1'), stats.get('type_2')) if t and t != "null"]
+    if types:
+        lines.append(" / ".join(types))
+    labels = [('hp_max', "PV"), ('mp_max', "PM"), ('attack', "Atk"), ('defense', "Déf"), ('speed', "Vit")]
+    values = [f"{label} {stats[key]}" for key, label in labels if key in stats]
+    if values:
+        lines.append("  ".join(values))
+    return "\n".join(lines) or "???"
+
 class CombatWidget(QWidget):
+    image_ready = pyqtSignal() # From image job workers: queued to the GUI thread
+
     def __init__(self, engine):
         super().__init__()
         self.engine = engine
         self.combat_system = None
+        self.image_ready.connect(self.on_image_ready)
+        if engine.image_jobs:
+            # Removed with the widget: the shared engine must not keep it alive nor emit on it
+            jobs, listener = engine.image_jobs, lambda job_id, path: self.image_ready.emit()
+            jobs.add_listener(listener)
+            self.destroyed.connect(lambda: jobs.remove_listener(listener))
 
         self.layout = QVBoxLayout(self)
 
@@ -110,7 +133,12 @@ class CombatWidget(QWidget):
         self.active_monster = self.team[self.active_monster_idx]
 
         self.log("Recherche d'un adversaire...")
-        self.enemy = self.combat_system.generate_enemy()
+        self.lbl_enemy_img.clear()
+        self.lbl_enemy_info.setText("???")
+        self.preview = {}
+        # Parent span: "ui.start_combat > combat.generate_enemy > ai.generate_abilities"
+        with metrics.span("ui.start_combat"):
+            self.enemy = self.combat_system.generate_enemy(on_field=self.show_enemy_field)
 
         self.log(f"Un {self.enemy.name} sauvage apparaît (Niveau {self.enemy.level}) !")
         self.update_ui()
@@ -118,6 +146,15 @@ class CombatWidget(QWidget):
         self.set_combat_active(True)
         self.btn_capture.setEnabled(False)
 
+    def show_enemy_field(self, key, value):
+        # Streamed stats: show the enemy while its image and abilities are still generated
+        self.preview[key] = value
+        self.lbl_enemy_info.setText(format_preview(self.preview))
+        if key == 'hp_max':
+            self.bar_enemy_hp.setMaximum(value)
+            self.bar_enemy_hp.setValue(value)
+        QApplication.processEvents() # Force update UI
+
     def setup_abilities(self):
         # Clear old buttons
         for i in reversed(range(self.abilities_layout.count())):
@@ -146,19 +183,28 @@ class CombatWidget(QWidget):
         self.lbl_enemy_info.setText(f"{self.enemy.name} (Lv {self.enemy.level})")
         self.bar_enemy_hp.setMaximum(self.enemy.hp_max)
         self.bar_enemy_hp.setValue(self.enemy.current_hp)
-        if self.enemy.image_path and os.path.exists(self.enemy.image_path):
-             self.lbl_enemy_img.setPixmap(QPixmap(self.enemy.image_path).scaled(200, 200))
 
         # Update Player UI
         self.lbl_player_info.setText(f"{self.active_monster.name} (Lv {self.active_monster.level})")
         self.bar_player_hp.setMaximum(self.active_monster.hp_max)
         self.bar_player_hp.setValue(self.active_monster.current_hp)
-        if self.active_monster.image_path and os.path.exists(self.active_monster.image_path):
-             self.lbl_player_img.setPixmap(QPixmap(self.active_monster.image_path).scaled(150, 150))
+        self.show_images()
+
+    def show_images(self):
+        for label, monster, size in ((self.lbl_enemy_img, self.enemy, 200), (self.lbl_player_img, self.active_monster, 150)):
+            if monster.image_path:
+                decoder().request(label, monster.image_path, size, PRIORITY_ACTIVE)
+            else:
+                label.setText(PLACEHOLDER_TEXT) # Still in the image job queue
+
+    def on_image_ready(self):
+        if self.combat_system and getattr(self, 'enemy', None):
+            self.show_images()
 
     def do_attack(self, ability):
         # Player Attack
         move_name = ability.name if ability else "Lutte"
+        metrics.count("ui.attack")
         dmg = self.combat_system.attack(self.active_monster, self.enemy, ability)
         self.log(f"{self.active_monster.name} utilise {move_name} et inflige {dmg} dégâts !")
 
@@ -167,14 +213,7 @@ class CombatWidget(QWidget):
             return
 
         # Enemy Attack (Turn resolution)
-        # Pick random enemy ability if available
-        enemy_ab = None
-        if self.enemy.abilities:
-            import random
-            enemy_ab = random.choice(self.enemy.abilities)
-
-        dmg_enemy = self.combat_system.attack(self.enemy, self.active_monster, enemy_ab)
-        move_name_enemy = enemy_ab.name if enemy_ab else "Attaque"
+        move_name_enemy, dmg_enemy = self.combat_system.enemy_turn(self.active_monster)
         self.log(f"L'ennemi {self.enemy.name} utilise {move_name_enemy} et inflige {dmg_enemy} dégâts !")
 
         if self.active_monster.current_hp <= 0:
@@ -206,34 +245,24 @@ class CombatWidget(QWidget):
         self.btn_capture.setEnabled(True) # Unlock capture
         self.btn_start.setEnabled(True)
 
-        # XP Gain
-        xp = self.enemy.level * 10
-        leveled = self.active_monster.gain_xp(xp)
+        # XP Gain (saves the monster)
+        xp, leveled = self.combat_system.award_xp(self.active_monster)
         self.log(f"Gain de {xp} XP.")
         if leveled:
             self.log(f"{self.active_monster.name} monte au niveau {self.active_monster.level} !")
 
-        self.engine.save_monster(self.active_monster)
-
     def do_capture(self):
-        # Check inventory
-        if not self.engine.use_item("ball"):
+        # Only possible once the enemy is defeated (button unlocked in win_combat)
+        if self.engine.get_inventory().get("ball", 0) <= 0:
              QMessageBox.warning(self, "Objet Manquant", "Vous avez besoin d'une 'ball' (à acheter en boutique).")
              return
 
-        # Success chance (Simplified: 100% if won as per user request "capturer une fois vaincu seulement")
-        # User said: "buy items allowing to capture ONLY after defeated".
-        import random
-        if random.random() > 0.3: # 70% chance
-            self.log("Capture réussie !")
-            # Reset stats before saving (remove boss buff if any, heal)
-            self.enemy.current_hp = self.enemy.hp_max
-            self.engine.save_monster(self.enemy)
+        with metrics.span("ui.capture"):
+            captured, msg = self.combat_system.capture()
+        self.log(msg)
+        self.btn_capture.setEnabled(False)
+        if captured:
             QMessageBox.information(self, "Capturé !", f"{self.enemy.name} a rejoint votre équipe.")
-            self.btn_capture.setEnabled(False)
-        else:
-            self.log("La capture a échoué... La ball s'est brisée.")
-            self.btn_capture.setEnabled(False)
 
     def flee(self):
         self.log("Vous avez fui.")
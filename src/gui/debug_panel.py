@@ -0,0 +1,90 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox
+)
+from PyQt6.QtCore import QTimer
+from src.config import METRICS_EXPORT_DIR
+from src.metrics import metrics
+import os
+
+class DebugPanel(QDialog):
+    """
+    Hidden panel (Ctrl+Shift+D in the main window): live latencies and error rates
+    of every instrumented operation, refreshed every second.
+    """
+    COLUMNS = ["Opération", "Appels", "Erreurs", "Taux d'erreur", "Moy. (ms)", "p50 (ms)", "p95 (ms)", "Max (ms)"]
+
+    def __init__(self, parent=None, engine=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.setWindowTitle("Debug - Métriques")
+        self.resize(900, 500)
+        self.layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setSortingEnabled(True)
+        self.layout.addWidget(self.table)
+
+        self.lbl_counters = QLabel()
+        self.lbl_counters.setWordWrap(True)
+        self.layout.addWidget(self.lbl_counters)
+
+        self.lbl_ai_usage = QLabel()
+        self.layout.addWidget(self.lbl_ai_usage)
+
+        self.buttons = QHBoxLayout()
+        self.btn_jsonl = QPushButton("Exporter JSONL")
+        self.btn_jsonl.clicked.connect(lambda: self.export("jsonl"))
+        self.btn_trace = QPushButton("Exporter Chrome Trace")
+        self.btn_trace.clicked.connect(lambda: self.export("trace"))
+        self.btn_reset = QPushButton("Remettre à zéro")
+        self.btn_reset.clicked.connect(self.reset)
+        self.buttons.addWidget(self.btn_jsonl)
+        self.buttons.addWidget(self.btn_trace)
+        self.buttons.addWidget(self.btn_reset)
+        self.layout.addLayout(self.buttons)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        snapshot = metrics.snapshot()
+        rows = sorted(snapshot['histograms'].items())
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+        for row, (name, h) in enumerate(rows):
+            values = [name, h['count'], h['errors'], f"{h['error_rate']:.1%}",
+                      round(h['mean_ms'], 2), round(h['p50_ms'], 2), round(h['p95_ms'], 2), round(h['max_ms'], 2)]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(0, value) # DisplayRole: numbers sort numerically
+                self.table.setItem(row, col, item)
+        self.table.setSortingEnabled(True)
+
+        counters = ", ".join(f"{k}: {v}" for k, v in sorted(snapshot['counters'].items()))
+        self.lbl_counters.setText(f"Compteurs : {counters or '-'}")
+
+        scheduler = getattr(self.engine.ai, "scheduler", None) if self.engine else None
+        if scheduler:
+            s = scheduler.status()
+            self.lbl_ai_usage.setText(
+                f"IA aujourd'hui : {s['calls']} appels, {s['tokens']}/{s['token_budget'] or '∞'} tokens, "
+                f"{s['images']}/{s['image_budget'] or '∞'} images, ~{s['cost']:.2f} $ (mode : {s['mode']})")
+
+    def export(self, kind):
+        if kind == "jsonl":
+            path = metrics.export_jsonl(os.path.join(METRICS_EXPORT_DIR, "spans.jsonl"))
+        else:
+            path = metrics.export_chrome_trace(os.path.join(METRICS_EXPORT_DIR, "trace.json"))
+        QMessageBox.information(self, "Export", f"Écrit dans {path}")
+
+    def reset(self):
+        metrics.reset()
+        self.refresh()
@@ -47,22 +47,10 @@ class ImportDialog(QDialog):
 
     def do_import(self):
         code = self.txt_input.text().strip()
-        monster = ExchangeSystem.load_code(code)
+        # The engine ledger rejects codes that were already imported once
+        monster = self.engine.import_monster(code)
         if monster:
-            # Check if we already have it (UUID check)
-            # (Ideally we generate a NEW uuid for the imported monster to avoid collisions if it's a clone,
-            # but the prompt said 'unique', implies transfer. For now we keep uuid to detect duplicates).
-
-            # Save
-            # We need to regenerate the ID/UUID to allow "Trade" effectively or check used codes.
-            # The prompt says "hash unique and not used twice".
-            # Implementing "used code" logic locally is tricky without a central server.
-            # We will just check if we already own this UUID.
-
-            import uuid
-            monster.uuid = str(uuid.uuid4()) # Generate new UUID for the local copy so it can coexist
-            self.engine.save_monster(monster)
             QMessageBox.information(self, "Succès", f"Monstre {monster.name} importé avec succès !")
             self.accept()
         else:
-            QMessageBox.warning(self, "Erreur", "Code invalide ou corrompu.")
+            QMessageBox.warning(self, "Erreur", "Code invalide, corrompu ou déjà utilisé.")
@@ -3,8 +3,10 @@ from PyQt6.QtWidgets import (
     QGridLayout, QPushButton, QFrame, QDialog, QMessageBox
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap
 from src.gui.exchange import ExchangeDialog, ImportDialog
+from src.gui.images import asset_pack, decoder, PRIORITY_VISIBLE, PRIORITY_BACKGROUND
+from src.gui.progress import batch_progress
+from src.metrics import metrics
 import os
 
 class HomeWidget(QWidget):
@@ -25,6 +27,10 @@ class HomeWidget(QWidget):
 
         self.header_layout.addWidget(self.lbl_title)
         self.header_layout.addWidget(self.btn_import)
+
+        self.btn_evolve_all = QPushButton("🧬 Tout faire évoluer")
+        self.btn_evolve_all.clicked.connect(self.evolve_all)
+        self.header_layout.addWidget(self.btn_evolve_all)
         self.header_layout.addStretch()
 
         self.btn_reset = QPushButton("⚠️ Réinitialiser")
@@ -42,20 +48,29 @@ class HomeWidget(QWidget):
         self.grid_layout = QGridLayout(self.scroll_content)
         self.scroll.setWidget(self.scroll_content)
         self.layout.addWidget(self.scroll)
+        self.image_labels = []
+        self.scroll.verticalScrollBar().valueChanged.connect(self.boost_visible_images)
 
         self.refresh()
 
     def refresh(self):
+        with metrics.span("ui.home_refresh"):
+            self._refresh()
+
+    def _refresh(self):
         # Update Money
         money = self.engine.get_player_money()
         self.lbl_money.setText(f"💰 Argent: {money}")
 
         # Clear Grid
+        decoder().forget(self.image_labels)
+        self.image_labels = []
         for i in reversed(range(self.grid_layout.count())):
             self.grid_layout.itemAt(i).widget().setParent(None)
 
         # Load Monsters
         monsters = self.engine.get_all_monsters()
+        asset_pack(reload=True) # The asset GC may have rebuilt the thumbnails
         row = 0
         col = 0
         max_cols = 4
@@ -66,15 +81,21 @@ class HomeWidget(QWidget):
             self.grid_layout.addWidget(lbl_empty, 0, 0)
             return
 
-        for monster in monsters:
-            card = self.create_monster_card(monster)
+        first_screen = max_cols * 3 # Cards visible before any scrolling, decoded first
+        for index, monster in enumerate(monsters):
+            card = self.create_monster_card(monster, PRIORITY_VISIBLE if index < first_screen else PRIORITY_BACKGROUND)
             self.grid_layout.addWidget(card, row, col)
             col += 1
             if col >= max_cols:
                 col = 0
                 row += 1
 
-    def create_monster_card(self, monster):
+    def boost_visible_images(self):
+        # Scrolled: the cards now in the viewport jump ahead of the decode queue
+        viewport = self.scroll.viewport().rect().translated(0, self.scroll.verticalScrollBar().value())
+        decoder().boost(lbl for lbl in self.image_labels if lbl.parentWidget().geometry().intersects(viewport))
+
+    def create_monster_card(self, monster, image_priority=PRIORITY_BACKGROUND):
         frame = QFrame()
         frame.setStyleSheet("background-color: #3a3a3a; border-radius: 10px; padding: 5px;")
         layout = QVBoxLayout(frame)
@@ -83,9 +104,8 @@ class HomeWidget(QWidget):
         lbl_img = QLabel()
         lbl_img.setFixedSize(100, 100)
         lbl_img.setStyleSheet("background-color: #222; border-radius: 5px;")
-        if monster.image_path and os.path.exists(monster.image_path):
-            pixmap = QPixmap(monster.image_path)
-            lbl_img.setPixmap(pixmap.scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
+        decoder().request(lbl_img, monster.image_path, 100, image_priority) # Placeholder until decoded
+        self.image_labels.append(lbl_img)
         layout.addWidget(lbl_img, alignment=Qt.AlignmentFlag.AlignCenter)
 
         # Info
@@ -195,33 +215,40 @@ class HomeWidget(QWidget):
 
     def evolve_monster(self, monster):
         # Check conditions
-        if monster.level < 45 and monster.evolution_stage == 0:
-            QMessageBox.warning(self, "Impossible", "Niveau 45 requis pour la première évolution.")
+        ok, reason = self.engine.can_evolve(monster)
+        if not ok:
+            QMessageBox.warning(self, "Impossible", reason)
             return
-        if monster.level < 90 and monster.evolution_stage == 1:
-             QMessageBox.warning(self, "Impossible", "Niveau 90 requis pour la deuxième évolution.")
-             return
-        if monster.evolution_stage >= 2 and not monster.is_mythical:
-             QMessageBox.warning(self, "Impossible", "Ce monstre a atteint son stade final.")
-             return
 
         confirm = QMessageBox.question(self, "Évolution", f"Voulez-vous faire évoluer {monster.name} ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if confirm == QMessageBox.StandardButton.Yes:
             QMessageBox.information(self, "Patience", "L'IA génère l'évolution... Cela peut prendre quelques secondes.")
-            # Call AI Logic
-            new_stats = self.engine.ai.evolve_monster_stats(monster.to_dict(), monster.evolution_stage)
-
-            # Update Monster
-            monster.name = new_stats.get('name', monster.name)
-            monster.hp_max = int(new_stats.get('hp_max'))
-            monster.attack = int(new_stats.get('attack'))
-            # ... update others ...
-            monster.evolution_stage += 1
-
-            # New Image
-            path = self.engine.ai.generate_image(new_stats.get('description', monster.name), f"evo_{monster.uuid}")
-            monster.image_path = path
-
-            self.engine.save_monster(monster)
+            with metrics.span("ui.evolve"):
+                success, msg = self.engine.evolve_monster(monster)
             self.refresh()
-            QMessageBox.information(self, "Félicitations !", f"Votre monstre a évolué en {monster.name} !")
+            if success:
+                QMessageBox.information(self, "Félicitations !", msg)
+            else:
+                QMessageBox.warning(self, "Impossible", msg)
+
+    def evolve_all(self):
+        eligible = [m for m in self.engine.get_all_monsters() if self.engine.can_evolve(m)[0]]
+        if not eligible:
+            QMessageBox.information(self, "Évolution", "Aucun monstre ne peut évoluer pour le moment.")
+            return
+
+        confirm = QMessageBox.question(self, "Évolution", f"Faire évoluer {len(eligible)} monstre(s) ?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if confirm != QMessageBox.StandardButton.Yes:
+            return
+        dialog, progress = batch_progress(self, "Évolution", "L'IA génère les évolutions...", len(eligible))
+        try:
+            with metrics.span("ui.evolve_all", count=len(eligible)):
+                evolved = self.engine.evolve_all(progress)
+        except Exception as e:
+            QMessageBox.warning(self, "Erreur", f"Aucune évolution enregistrée : {e}")
+            return
+        finally:
+            dialog.close()
+        self.refresh()
+        names = ", ".join(m.name for m in evolved)
+        QMessageBox.information(self, "Félicitations !", f"{len(evolved)} monstre(s) ont évolué : {names}")
@@ -0,0 +1,196 @@
+import heapq
+import itertools
+from collections import OrderedDict
+from PyQt6 import sip
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QBuffer, QByteArray, QIODevice, QSize, pyqtSignal
+from PyQt6.QtGui import QPixmap, QImage, QImageReader
+from src.asset_pack import AssetPack
+from src.config import ASSET_PACK, ASSET_PACK_PATH, IMAGE_DECODER_THREADS, IMAGE_CACHE_SIZE
+from src.metrics import metrics
+import os
+
+# Monster images for the views: pre-scaled thumbnail from the mmapped pack when it has one,
+# otherwise the full image file scaled on the fly.
+#
+# Views ask the shared ImageDecoder for an image: a cached pixmap is shown at once, otherwise
+# the label gets a placeholder and the image is decoded by QImageReader on a worker thread
+# (scaled while decoding), then swapped in. Pending requests are served by priority:
+# combatants first, then the cards on screen, then the rest of the roster.
+
+PRIORITY_ACTIVE = 0 # Combatants
+PRIORITY_VISIBLE = 1 # Cards in the viewport
+PRIORITY_BACKGROUND = 2
+PLACEHOLDER_TEXT = "…"
+
+_pack = None
+_decoder = None
+
+
+def asset_pack(reload=False):
+    """The shared pack reader (None when disabled). reload=True picks up a rebuilt pack."""
+    global _pack
+    if not ASSET_PACK:
+        return None
+    if _pack is None:
+        _pack = AssetPack(ASSET_PACK_PATH)
+    elif reload:
+        _pack.reload()
+    return _pack
+
+
+def decode_image(path, size):
+    """QImage of path fitting size x size (thread-safe, unlike QPixmap), or None."""
+    if not path:
+        return None
+    pack = asset_pack()
+    data = pack.get(path, size) if pack else None
+    if data is not None:
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        image = QImageReader(buffer).read()
+        if not image.isNull():
+            return image
+    if not os.path.exists(path):
+        return None
+    reader = QImageReader(path)
+    full = reader.size()
+    if full.isValid():
+        # Decode straight to the target size instead of decoding full size and scaling
+        reader.setScaledSize(full.scaled(QSize(size, size), Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    return None if image.isNull() else image
+
+
+def load_pixmap(path, size):
+    """Synchronous QPixmap of path fitting size x size, or None if there is no image."""
+    image = decode_image(path, size)
+    return QPixmap.fromImage(image) if image is not None else None
+
+
+class _DecodeJob(QRunnable):
+    def __init__(self, decoder, key):
+        super().__init__()
+        self.decoder = decoder
+        self.key = key
+
+    def run(self):
+        path, size = self.key
+        try:
+            with metrics.timer("ui.decode_image"):
+                image = decode_image(path, size)
+        except Exception as e:
+            print(f"Image decode failed ({path}): {e}")
+            image = None
+        # Queued to the GUI thread: the decoder lives there
+        self.decoder.decoded.emit(self.key, image if image is not None else QImage())
+
+
+class ImageDecoder(QObject):
+    decoded = pyqtSignal(object, QImage)
+
+    def __init__(self, threads=IMAGE_DECODER_THREADS, cache_size=IMAGE_CACHE_SIZE, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(threads)
+        self.cache = OrderedDict() # (path, size) -> QPixmap, least recently used first
+        self.cache_size = cache_size
+        self.wanted = {} # label -> (path, size) it should show
+        self.waiting = {} # (path, size) -> set of labels waiting for it
+        self.priorities = {} # (path, size) -> best pending priority
+        self.queue = [] # heap of (priority, seq, key); stale entries skipped
+        self.in_flight = set()
+        self._seq = itertools.count()
+        self.decoded.connect(self._on_decoded)
+
+    def request(self, label, path, size, priority=PRIORITY_BACKGROUND):
+        """Shows path on label: now if cached, else a placeholder until decoded."""
+        self._unwant(label)
+        if not path:
+            return
+        key = (path, size)
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            self.cache.move_to_end(key)
+            metrics.count("ui.image_cache_hits")
+            label.setPixmap(pixmap)
+            return
+        self.wanted[label] = key
+        self.waiting.setdefault(key, set()).add(label)
+        label.setText(PLACEHOLDER_TEXT)
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._enqueue(key, priority)
+        self._pump()
+
+    def boost(self, labels, priority=PRIORITY_VISIBLE):
+        """Moves the pending images of labels ahead of the queue (e.g. after a scroll)."""
+        for label in labels:
+            key = self.wanted.get(label)
+            if key is not None:
+                self._enqueue(key, priority)
+        self._pump()
+
+    def _enqueue(self, key, priority):
+        if key in self.in_flight or self.priorities.get(key, priority + 1) <= priority:
+            return
+        self.priorities[key] = priority
+        heapq.heappush(self.queue, (priority, next(self._seq), key))
+
+    def _pump(self):
+        while self.queue and len(self.in_flight) < self.pool.maxThreadCount():
+            priority, _, key = heapq.heappop(self.queue)
+            if self.priorities.get(key) != priority:
+                continue # Superseded by a higher priority entry, or already decoded
+            if key not in self.waiting:
+                del self.priorities[key] # Nobody shows it anymore (view refreshed)
+                continue
+            del self.priorities[key]
+            self.in_flight.add(key)
+            self.pool.start(_DecodeJob(self, key))
+
+    def _on_decoded(self, key, image):
+        self.in_flight.discard(key)
+        pixmap = QPixmap.fromImage(image) if not image.isNull() else None
+        if pixmap is not None:
+            self.cache[key] = pixmap
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        for label in list(self.waiting.get(key, ())):
+            self._unwant(label)
+            if sip.isdeleted(label):
+                continue
+            if pixmap is not None:
+                label.setPixmap(pixmap)
+            else:
+                label.clear()
+        self._pump()
+
+    def forget(self, labels):
+        """Drops the pending requests of labels about to be destroyed."""
+        for label in labels:
+            self._unwant(label)
+
+    def _unwant(self, label):
+        key = self.wanted.pop(label, None)
+        if key is not None:
+            labels = self.waiting[key]
+            labels.discard(label)
+            if not labels:
+                del self.waiting[key]
+
+    def wait(self, timeout_ms=5000):
+        """Blocks until every queued image is decoded and delivered (tests, benchmarks)."""
+        from PyQt6.QtCore import QCoreApplication, QDeadlineTimer
+        deadline = QDeadlineTimer(timeout_ms)
+        while (self.queue or self.in_flight) and not deadline.hasExpired():
+            self.pool.waitForDone(10)
+            QCoreApplication.processEvents()
+            self._pump()
+
+
+def decoder():
+    """The shared decoder (created on first use, needs a QApplication)."""
+    global _decoder
+    if _decoder is None:
+        _decoder = ImageDecoder()
+    return _decoder
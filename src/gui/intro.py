@@ -6,6 +6,8 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QPixmap
 from src.constants import TYPES
 from src.models import Monster, Ability
+from src.gui.combat import format_preview
+from src.image_jobs import PRIORITY_TEAM
 import os
 
 class IntroWindow(QMainWindow):
@@ -121,16 +123,24 @@ class IntroWindow(QMainWindow):
 
             # Generate Starter
             try:
-                stats = self.engine.ai.generate_monster_stats(level=1, context=f"starter pokemon type {type_name}")
+                def show_field(key, value):
+                    # Streamed stats: reveal the starter while the rest is generated
+                    preview[key] = type_name if key == 'type_1' else value
+                    self.lbl_dialogue.setText(f"Votre compagnon arrive...\n{format_preview(preview)}")
+                    QApplication.processEvents()
+
+                preview = {}
+                stats = self.engine.ai.generate_monster_stats(level=1, context=f"starter pokemon type {type_name}",
+                                                              on_field=show_field)
                 # Force type to match choice if AI deviated
                 stats['type_1'] = type_name
 
                 monster = Monster(stats)
-                path = self.engine.ai.generate_image(stats.get('description', 'starter'), f"starter_{monster.uuid}")
-                monster.image_path = path
+                monster.image_path = self.engine.request_image(stats.get('description', 'starter'), f"starter_{monster.uuid}",
+                                                               PRIORITY_TEAM, monster=monster)
 
                 # Abilities
-                abilities_data = self.engine.ai.generate_abilities(type_name, count=4)
+                abilities_data = self.engine.abilities.moveset(type_name, count=4, level=1)
                 monster.abilities = [Ability(a) for a in abilities_data]
 
                 self.engine.save_monster(monster)
@@ -2,7 +2,8 @@ from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QLabel, QStackedWidget, QMessageBox
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QShortcut, QKeySequence
 from src.gui.home import HomeWidget
 from src.gui.shop import ShopWidget
 from src.gui.combat import CombatWidget
@@ -10,13 +11,16 @@ from src.game_engine import GameEngine
 import sys
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # Tab index -> page class. Pages are built on their first visit.
+    PAGE_CLASSES = [HomeWidget, ShopWidget, CombatWidget]
+
+    def __init__(self, engine=None):
         super().__init__()
         self.setWindowTitle("Monstres Infinis")
         self.resize(1024, 768)
 
-        # Initialize Engine
-        self.engine = GameEngine()
+        # Shared engine (main.py passes the one used by the intro)
+        self.engine = engine or GameEngine()
 
         # Main Layout
         self.central_widget = QWidget()
@@ -39,32 +43,69 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         self.layout.addWidget(self.stack)
 
-        # Pages
-        self.home_page = HomeWidget(self.engine)
-        self.shop_page = ShopWidget(self.engine)
-        self.combat_page = CombatWidget(self.engine)
-
-        self.stack.addWidget(self.home_page)
-        self.stack.addWidget(self.shop_page)
-        self.stack.addWidget(self.combat_page)
+        # Pages: empty placeholders until visited
+        self.pages = [None] * len(self.PAGE_CLASSES)
+        for _ in self.PAGE_CLASSES:
+            self.stack.addWidget(QWidget())
 
         # Signals
         self.btn_home.clicked.connect(lambda: self.switch_tab(0))
         self.btn_shop.clicked.connect(lambda: self.switch_tab(1))
         self.btn_combat.clicked.connect(lambda: self.switch_tab(2))
 
+        # Hidden debug panel (metrics)
+        self.debug_panel = None
+        self.shortcut_debug = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        self.shortcut_debug.activated.connect(self.toggle_debug_panel)
+
         # Style
         self.apply_styles()
 
+        # Home is built right after the window is first shown
+        QTimer.singleShot(0, lambda: self.switch_tab(0))
+
+    @property
+    def home_page(self):
+        return self.pages[0]
+
+    @property
+    def shop_page(self):
+        return self.pages[1]
+
+    @property
+    def combat_page(self):
+        return self.pages[2]
+
+    def get_page(self, index):
+        """
+        Returns (page, created). The page is built (and added to the stack) on first use.
+        """
+        if self.pages[index] is not None:
+            return self.pages[index], False
+        page = self.PAGE_CLASSES[index](self.engine)
+        placeholder = self.stack.widget(index)
+        self.stack.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self.stack.insertWidget(index, page)
+        self.pages[index] = page
+        return page, True
+
     def switch_tab(self, index):
+        page, created = self.get_page(index)
         self.stack.setCurrentIndex(index)
-        # Refresh pages when visited
-        if index == 0:
-            self.home_page.refresh()
-        elif index == 1:
-            self.shop_page.refresh()
-        elif index == 2:
-            self.combat_page.refresh()
+        # Refresh pages when visited (a new page has just loaded its data)
+        if not created:
+            page.refresh()
+
+    def toggle_debug_panel(self):
+        if self.debug_panel is None:
+            from src.gui.debug_panel import DebugPanel
+            self.debug_panel = DebugPanel(self, self.engine)
+        if self.debug_panel.isVisible():
+            self.debug_panel.hide()
+        else:
+            self.debug_panel.show()
+            self.debug_panel.refresh()
 
     def apply_styles(self):
         self.setStyleSheet("""
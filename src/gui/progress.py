@@ -0,0 +1,21 @@
+from PyQt6.QtWidgets import QProgressDialog, QApplication
+from PyQt6.QtCore import Qt
+
+
+def batch_progress(parent, title, label, total):
+    """
+    Modal progress dialog for a batch operation (see src/ai_batch.py). Returns (dialog,
+    progress): pass progress(done, total) to the batch, it keeps the UI repainting.
+    """
+    dialog = QProgressDialog(label, None, 0, total, parent) # No cancel: results are saved together
+    dialog.setWindowTitle(title)
+    dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    dialog.setMinimumDuration(0)
+    dialog.setValue(0)
+
+    def progress(done, total):
+        dialog.setLabelText(f"{label} ({done}/{total})")
+        dialog.setValue(done)
+        QApplication.processEvents()
+
+    return dialog, progress
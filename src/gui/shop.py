@@ -3,6 +3,11 @@ from PyQt6.QtWidgets import (
     QMessageBox, QGroupBox
 )
 from src.game_engine import RecruitmentSystem
+from src.constants import SHOP_ITEMS
+from src.gui.progress import batch_progress
+from src.metrics import metrics
+
+RECRUIT_BATCH = 10
 
 class ShopWidget(QWidget):
     def __init__(self, engine):
@@ -31,6 +36,10 @@ class ShopWidget(QWidget):
         self.btn_recruit.clicked.connect(self.recruit_monster)
         self.layout_recruit.addWidget(self.btn_recruit)
 
+        self.btn_recruit_batch = QPushButton(f"Recruter ×{RECRUIT_BATCH} ({RECRUIT_BATCH * self.recruitment_system.cost} crédits)")
+        self.btn_recruit_batch.clicked.connect(self.recruit_batch)
+        self.layout_recruit.addWidget(self.btn_recruit_batch)
+
         self.group_recruit.setLayout(self.layout_recruit)
         self.layout.addWidget(self.group_recruit)
 
@@ -38,12 +47,8 @@ class ShopWidget(QWidget):
         self.group_items = QGroupBox("Objets")
         self.layout_items = QVBoxLayout()
 
-        self.create_buy_btn("Ball de Capture (100$)", "ball", 100)
-        self.create_buy_btn("Potion de Soin (50$)", "potion", 50)
-        self.create_buy_btn("Rappel (200$)", "revive", 200)
-        self.create_buy_btn("Boost Attaque (150$)", "boost_atk", 150)
-        self.create_buy_btn("Boost Vitesse (150$)", "boost_spd", 150)
-        self.create_buy_btn("Copieur de Capacité (1000$)", "ability_copier", 1000)
+        for item_id, (label, cost) in SHOP_ITEMS.items():
+            self.create_buy_btn(f"{label} ({cost}$)", item_id, cost)
 
         self.group_items.setLayout(self.layout_items)
         self.layout.addWidget(self.group_items)
@@ -58,7 +63,9 @@ class ShopWidget(QWidget):
         self.layout_items.addWidget(btn)
 
     def buy_item(self, item_id, cost):
-        if self.engine.buy_item(item_id, cost):
+        with metrics.span("ui.buy_item", item=item_id):
+            bought = self.engine.buy_item(item_id, cost)
+        if bought:
              QMessageBox.information(self, "Achat", f"Vous avez acheté : {item_id}")
              self.refresh()
         else:
@@ -70,11 +77,29 @@ class ShopWidget(QWidget):
         inv_str = ", ".join([f"{k}: {v}" for k, v in inv.items()])
         self.lbl_money.setText(f"💰 Argent: {money} | Sac: {inv_str}")
         self.btn_recruit.setEnabled(money >= self.recruitment_system.cost)
+        self.btn_recruit_batch.setEnabled(money >= RECRUIT_BATCH * self.recruitment_system.cost)
 
     def recruit_monster(self):
-        monster, msg = self.recruitment_system.draft_monster()
+        with metrics.span("ui.recruit"):
+            monster, msg = self.recruitment_system.draft_monster()
         if monster:
             QMessageBox.information(self, "Succès", f"Vous avez recruté {monster.name} !")
             self.refresh()
         else:
             QMessageBox.warning(self, "Erreur", msg)
+
+    def recruit_batch(self):
+        dialog, progress = batch_progress(self, "Recrutement", "L'IA génère les recrues...", RECRUIT_BATCH)
+        try:
+            with metrics.span("ui.recruit_batch", count=RECRUIT_BATCH):
+                monsters, msg = self.recruitment_system.draft_monsters(RECRUIT_BATCH, progress)
+        except Exception as e:
+            monsters, msg = [], f"Recrutement annulé, rien n'a été débité : {e}"
+        finally:
+            dialog.close()
+        if monsters:
+            names = ", ".join(m.name for m in monsters)
+            QMessageBox.information(self, "Succès", f"Vous avez recruté {len(monsters)} monstres : {names}")
+            self.refresh()
+        else:
+            QMessageBox.warning(self, "Erreur", msg)
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import threading
+import time
+from src.config import IMAGE_JOB_WORKERS, IMAGE_JOB_MAX_ATTEMPTS
+from src.database import ThreadConnections
+from src.metrics import metrics
+
+# Persistent, prioritized image generation queue.
+#
+# Jobs live in the image_jobs table, so nothing is lost when the game is closed or crashes:
+# jobs left "running" go back to "pending" on start. Identical prompts share one job, and a
+# prompt already rendered returns its image at once. Each job lists its targets
+# (image_job_targets: a monster uuid, a template id or a prefetched evolution, keyed "uuid|stage") whose
+# image_path is written when the image is ready, even after a restart; in-memory objects are updated through callbacks
+# (called with None when the job has failed max_attempts times).
+# A fixed number of worker threads take the highest priority job first.
+
+PRIORITY_ACTIVE = 0 # Monster on screen in a combat
+PRIORITY_TEAM = 1
+PRIORITY_ROSTER = 2
+PRIORITY_PREFETCH = 3
+
+TARGET_TABLES = {
+    'monster': "UPDATE monsters SET image_path = ? WHERE uuid = ?",
+    'template': "UPDATE monster_templates SET image_path = ? WHERE id = ?",
+    'evolution': "UPDATE evolution_cache SET image_path = ? WHERE monster_uuid || '|' || stage = ?",
+}
+
+
+def prompt_hash(description):
+    return hashlib.sha256((description or "").strip().lower().encode()).hexdigest()
+
+
+class ImageJobQueue:
+    def __init__(self, ai, db_path=None, workers=IMAGE_JOB_WORKERS, max_attempts=IMAGE_JOB_MAX_ATTEMPTS):
+        self.ai = ai
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.callbacks = {} # job id -> [fn(path)] for objects in memory
+        self.listeners = [] # fn(job id, path) after every finished or failed job (path None)
+        self.lock = threading.Lock() # Claims and callback lists
+        self.wakeup = threading.Condition(self.lock)
+        self._conns = ThreadConnections(db_path) # Workers, GUI
+        self._threads = []
+        self._stop = threading.Event()
+
+    def _conn(self):
+        return self._conns.get()
+
+    def submit(self, description, priority=PRIORITY_ROSTER, targets=(), on_done=None):
+        """
+        Queues an image for description. Returns the image path right away when the same
+        prompt was already rendered (targets and on_done are applied), otherwise None.
+        on_done(path) is called once the image is made, or with None if the job fails.
+        """
+        conn = self._conn()
+        key = prompt_hash(description)
+        with self.lock:
+            row = conn.execute("SELECT id, status, image_path, priority FROM image_jobs WHERE prompt_hash = ?",
+                               (key,)).fetchone()
+            if row and row['status'] == 'done' and row['image_path'] and os.path.exists(row['image_path']):
+                metrics.count("image_jobs.dedup_done")
+                self._apply(conn, row['image_path'], targets)
+                conn.commit()
+                ready = row['image_path']
+            else:
+                ready = None
+                now = int(time.time())
+                if row is None:
+                    job_id = conn.execute('''
+                        INSERT INTO image_jobs (prompt_hash, prompt, priority, status, attempts, created_at)
+                        VALUES (?, ?, ?, 'pending', 0, ?)
+                    ''', (key, description, priority, now)).lastrowid
+                else:
+                    job_id = row['id']
+                    metrics.count("image_jobs.dedup_queued")
+                    if row['status'] == 'running':
+                        conn.execute("UPDATE image_jobs SET priority = min(priority, ?) WHERE id = ?", (priority, job_id))
+                    else: # pending, failed, or done but the file was collected
+                        conn.execute('''
+                            UPDATE image_jobs SET status = 'pending', attempts = 0, error = NULL,
+                                   priority = CASE WHEN status = 'pending' THEN min(priority, ?) ELSE ? END
+                            WHERE id = ?
+                        ''', (priority, priority, job_id))
+                conn.executemany("INSERT OR IGNORE INTO image_job_targets (job_id, kind, key) VALUES (?, ?, ?)",
+                                 [(job_id, kind, str(target_key)) for kind, target_key in targets])
+                conn.commit()
+                if on_done:
+                    self.callbacks.setdefault(job_id, []).append(on_done)
+                self.wakeup.notify()
+        if ready and on_done:
+            on_done(ready)
+        return ready
+
+    @staticmethod
+    def _apply(conn, path, targets):
+        for kind, target_key in targets:
+            conn.execute(TARGET_TABLES[kind], (path, target_key))
+
+    def _claim(self):
+        conn = self._conn()
+        row = conn.execute('''
+            SELECT id, prompt FROM image_jobs WHERE status = 'pending' ORDER BY priority, id LIMIT 1
+        ''').fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE image_jobs SET status = 'running', attempts = attempts + 1 WHERE id = ?", (row['id'],))
+        conn.commit()
+        return row['id'], row['prompt']
+
+    def run_next(self):
+        """Generates the highest priority pending image. False when there was nothing to do."""
+        with self.lock:
+            job = self._claim()
+        if job is None:
+            return False
+        job_id, prompt = job
+        conn = self._conn()
+        try:
+            with metrics.span("image_jobs.generate"):
+                path = self.ai.generate_image(prompt, f"job_{job_id}")
+        except Exception as e:
+            print(f"Image job {job_id} failed: {e}")
+            metrics.error("image_jobs.generate")
+            with self.lock:
+                conn.execute('''
+                    UPDATE image_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?
+                    WHERE id = ?
+                ''', (self.max_attempts, str(e), job_id))
+                conn.commit()
+                status = conn.execute("SELECT status FROM image_jobs WHERE id = ?", (job_id,)).fetchone()['status']
+                # Given up: objects waiting for this image keep their placeholder
+                callbacks = self.callbacks.pop(job_id, []) if status == 'failed' else None
+            if callbacks is not None:
+                metrics.count("image_jobs.failed")
+                self._notify(job_id, None, callbacks)
+            return True
+
+        with self.lock:
+            conn.execute("UPDATE image_jobs SET status = 'done', image_path = ?, error = NULL, finished_at = ? WHERE id = ?",
+                         (path, int(time.time()), job_id))
+            targets = conn.execute("SELECT kind, key FROM image_job_targets WHERE job_id = ?", (job_id,)).fetchall()
+            self._apply(conn, path, targets)
+            conn.execute("DELETE FROM image_job_targets WHERE job_id = ?", (job_id,))
+            conn.commit()
+            callbacks = self.callbacks.pop(job_id, [])
+        metrics.count("image_jobs.done")
+        self._notify(job_id, path, callbacks)
+        return True
+
+    def add_listener(self, fn):
+        with self.lock:
+            self.listeners.append(fn)
+
+    def remove_listener(self, fn):
+        with self.lock:
+            if fn in self.listeners:
+                self.listeners.remove(fn)
+
+    def _notify(self, job_id, path, callbacks):
+        with self.lock:
+            listeners = list(self.listeners)
+        for callback, args in [(fn, (path,)) for fn in callbacks] + [(fn, (job_id, path)) for fn in listeners]:
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Image job callback failed: {e}")
+
+    def drain(self):
+        """Runs every pending job in the calling thread (CLI, tests)."""
+        while self.run_next():
+            pass
+
+    def status(self):
+        rows = self._conn().execute("SELECT status, count(*) FROM image_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    # Worker threads
+
+    def start(self):
+        """Resumes jobs interrupted by a crash and starts the workers."""
+        conn = self._conn()
+        with self.lock:
+            resumed = conn.execute("UPDATE image_jobs SET status = 'pending' WHERE status = 'running'").rowcount
+            conn.commit()
+        if resumed:
+            print(f"Image jobs: {resumed} interrupted job(s) resumed")
+        self._stop.clear()
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._loop, name=f"image-jobs-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self.lock:
+            self.wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        self._conns.close()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                worked = self.run_next()
+            except Exception as e:
+                print(f"Image job worker failed: {e}")
+                worked = False
+            if not worked:
+                with self.lock:
+                    self.wakeup.wait(timeout=1.0)
+
+    def wait(self, timeout=10.0):
+        """Blocks until no job is pending or running (tests)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = self.status()
+            if not status.get('pending') and not status.get('running'):
+                return True
+            time.sleep(0.02)
+        return False
@@ -0,0 +1,97 @@
+import hashlib
+import math
+import time
+from src.config import LEDGER_BLOOM_CAPACITY, LEDGER_BLOOM_ERROR_RATE
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over byte digests.
+    No false negatives: if might_contain() is False the item was never added.
+    """
+    def __init__(self, capacity=LEDGER_BLOOM_CAPACITY, error_rate=LEDGER_BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        # Standard sizing: m = -n ln(p) / (ln 2)^2, k = m/n ln 2
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest):
+        # Double hashing on a SHA-256 of the key (cheap, well distributed)
+        h = hashlib.sha256(digest).digest()
+        h1 = int.from_bytes(h[:8], "little")
+        h2 = int.from_bytes(h[8:16], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, digest):
+        bits = self.bits
+        for pos in self._positions(digest):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class CodeLedger:
+    """
+    Records redeemed exchange codes (table 'used_codes') so a code can only be imported once.
+    An in-memory Bloom filter answers most lookups without touching the DB.
+    """
+    def __init__(self, db_conn, capacity=LEDGER_BLOOM_CAPACITY):
+        self.db_conn = db_conn
+        self.capacity = capacity
+        self.bloom = None
+
+    @staticmethod
+    def digest(signature):
+        return hashlib.sha256(signature.encode()).digest()
+
+    def _ensure_loaded(self):
+        # Lazy: the filter is only built when the first code is checked
+        if self.bloom is not None:
+            return
+        cursor = self.db_conn.cursor()
+        cursor.execute("SELECT count(*) as count FROM used_codes")
+        count = cursor.fetchone()['count']
+        self.bloom = BloomFilter(max(self.capacity, count * 2))
+        cursor.execute("SELECT digest FROM used_codes")
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for row in rows:
+                self.bloom.add(bytes(row['digest']))
+
+    def is_used(self, digest):
+        self._ensure_loaded()
+        if not self.bloom.might_contain(digest):
+            return False
+        cursor = self.db_conn.cursor()
+        cursor.execute("SELECT 1 FROM used_codes WHERE digest = ?", (digest,))
+        return cursor.fetchone() is not None
+
+    def redeem(self, digest, commit=True):
+        """
+        Marks the digest as used. Returns False if it was already redeemed. commit=False leaves
+        it in the caller's transaction (a rollback then un-redeems it).
+        """
+        if self.is_used(digest):
+            return False
+        cursor = self.db_conn.cursor()
+        cursor.execute(
+            "INSERT OR IGNORE INTO used_codes (digest, redeemed_at) VALUES (?, ?)",
+            (digest, int(time.time()))
+        )
+        if commit:
+            self.db_conn.commit()
+        if cursor.rowcount == 0:
+            # Someone else (another connection) redeemed it in between
+            return False
+        self.bloom.add(digest) # After a rollback: a false positive, checked against the DB
+        return True
@@ -0,0 +1,263 @@
+"""
+Load generator: N simulated players drive the engine through GameService.
+
+    python -m src.loadgen --players 8 --iterations 50
+    python -m src.loadgen --players 8 --mode process --roster 5000
+    python -m src.loadgen --players 8 --shared-db          (measure lock contention)
+
+Each player gets its own save DB (unless --shared-db) and the offline AI stand-in,
+and loops recruit / buy / fight / capture. Reports throughput, p50/p99 latency per
+operation and SQLite lock contention. With --shared-db, ops failing on a lock are counted
+apart from the other errors; only read-only ops are retried (a retried recruit or buy
+could be charged twice).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from src.database import init_db
+from src.game_engine import GameEngine
+from src.offline_ai import OfflineAIManager
+from src.service import GameService
+
+LOCK_RETRIES = 50
+RETRYABLE_OPS = {"state"} # Read-only: safe to run again after "database is locked"
+
+
+def seed_roster(db_path, count):
+    """Bulk-inserts count monsters to simulate a large save."""
+    conn = sqlite3.connect(db_path)
+    rows = [(f"seed-{os.getpid()}-{i}", f"Seed{i}", False, "Normal", None, 10, 0, 100, 20, 20, 20, 20, 0, None)
+            for i in range(count)]
+    conn.executemany('''
+        INSERT OR IGNORE INTO monsters (uuid, name, is_mythical, type_1, type_2, level, xp, hp_max, mp_max, attack, defense, speed, evolution_stage, image_path)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+class WalletEngine(GameEngine):
+    """
+    Shared-db mode: the save has a single player row, so each simulated player keeps its own
+    balance here; otherwise players spend each other's money and most errors are "Not
+    enough money" instead of lock contention. The row is still written on every change, so
+    the locking pattern stays the game's.
+    """
+    def __init__(self, *args, money=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.money = money
+
+    def get_player_money(self):
+        return self.money
+
+    def update_player_money(self, amount, commit=True):
+        self.db_conn.execute("UPDATE player SET money = money WHERE id = 1")
+        if commit:
+            self.db_conn.commit()
+        self.money += amount
+        return self.money
+
+
+def is_lock_error(reply):
+    return "database is locked" in reply.get('error', '')
+
+
+class SimulatedPlayer:
+    def __init__(self, player_id, db_path, iterations, shared_db=False):
+        self.player_id = player_id
+        self.db_path = db_path
+        self.iterations = iterations
+        self.shared_db = shared_db
+        self.latencies = {}
+        self.errors = {}
+        self.lock_errors = {}
+        self.lock_retries = 0
+        self.lock_wait = 0.0
+
+    def _backoff(self, conn):
+        conn.rollback()
+        self.lock_retries += 1
+        wait_start = time.perf_counter()
+        time.sleep(0.001)
+        self.lock_wait += time.perf_counter() - wait_start
+
+    def top_up(self, engine):
+        for _ in range(LOCK_RETRIES):
+            try:
+                engine.update_player_money(1000) # Keep the loop funded
+                return
+            except sqlite3.OperationalError:
+                self._backoff(engine.db_conn)
+
+    def call(self, service, request):
+        """
+        Runs one op. Read-only ops are retried (and counted) when the DB is locked by another
+        player; the others fail once, as a lock error.
+        """
+        op = request['op']
+        start = time.perf_counter()
+        for _ in range(LOCK_RETRIES if op in RETRYABLE_OPS else 1):
+            reply = service.handle(request)
+            if not is_lock_error(reply):
+                break
+            self._backoff(service.engine.db_conn)
+        self.latencies.setdefault(op, []).append(time.perf_counter() - start)
+        if is_lock_error(reply):
+            service.engine.db_conn.rollback()
+            self.lock_errors[op] = self.lock_errors.get(op, 0) + 1
+        elif not reply.get('ok'):
+            self.errors[op] = self.errors.get(op, 0) + 1
+        return reply
+
+    def run(self):
+        engine_class = WalletEngine if self.shared_db else GameEngine
+        engine = engine_class(db_path=self.db_path, ai=OfflineAIManager(seed=self.player_id))
+        if self.shared_db:
+            # Fail fast on locks so contention is measured instead of hidden in sqlite's busy wait
+            engine.db_conn.execute("PRAGMA busy_timeout = 0")
+        service = GameService(engine)
+
+        for _ in range(self.iterations):
+            self.top_up(engine)
+            self.call(service, {"op": "recruit"})
+            self.call(service, {"op": "buy", "item": "ball"})
+            fight = self.call(service, {"op": "fight"})
+            if fight.get('won'):
+                self.call(service, {"op": "capture"})
+            self.call(service, {"op": "state"})
+        engine.db_conn.close()
+        return {
+            'latencies': self.latencies,
+            'errors': self.errors,
+            'lock_errors': self.lock_errors,
+            'lock_retries': self.lock_retries,
+            'lock_wait_s': self.lock_wait,
+        }
+
+
+def _prepare_db(path, roster):
+    init_db(path)
+    if roster:
+        seed_roster(path, roster)
+
+
+def _run_player(args):
+    player_id, db_path, iterations, shared_db = args
+    try:
+        return SimulatedPlayer(player_id, db_path, iterations, shared_db).run()
+    except Exception as e:
+        # One crashed player must not lose the whole report
+        print(f"Player {player_id} crashed: {type(e).__name__}: {e}")
+        return {'latencies': {}, 'errors': {}, 'lock_errors': {}, 'lock_retries': 0, 'lock_wait_s': 0.0,
+                'crashed': f"{type(e).__name__}: {e}"}
+
+
+def summarize(results, elapsed):
+    latencies, errors, lock_errors = {}, {}, {}
+    for r in results:
+        for op, values in r['latencies'].items():
+            latencies.setdefault(op, []).extend(values)
+        for op, count in r['errors'].items():
+            errors[op] = errors.get(op, 0) + count
+        for op, count in r['lock_errors'].items():
+            lock_errors[op] = lock_errors.get(op, 0) + count
+
+    total_ops = sum(len(v) for v in latencies.values())
+    ops = {}
+    for op, values in sorted(latencies.items()):
+        values.sort()
+        ops[op] = {
+            'count': len(values),
+            'errors': errors.get(op, 0),
+            'lock_errors': lock_errors.get(op, 0),
+            'mean_ms': round(statistics.fmean(values) * 1000, 3),
+            'p50_ms': round(statistics.median(values) * 1000, 3),
+            'p99_ms': round(values[min(len(values) - 1, int(len(values) * 0.99))] * 1000, 3),
+        }
+    return {
+        'players': len(results),
+        'crashed_players': sum(1 for r in results if r.get('crashed')),
+        'elapsed_s': round(elapsed, 3),
+        'total_ops': total_ops,
+        'ops_per_s': round(total_ops / elapsed, 1) if elapsed else 0,
+        'lock_retries': sum(r['lock_retries'] for r in results),
+        'lock_wait_s': round(sum(r['lock_wait_s'] for r in results), 3),
+        'ops': ops,
+    }
+
+
+def run_load(players=4, iterations=20, mode="thread", shared_db=False, roster=0, workdir=None):
+    tmp = None
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory()
+        workdir = tmp.name
+
+    if shared_db:
+        db_paths = [os.path.join(workdir, "shared.db")] * players
+        _prepare_db(db_paths[0], roster)
+    else:
+        db_paths = [os.path.join(workdir, f"player_{i}.db") for i in range(players)]
+        for path in db_paths:
+            _prepare_db(path, roster)
+
+    jobs = [(i, db_paths[i], iterations, shared_db) for i in range(players)]
+    start = time.perf_counter()
+    if mode == "process":
+        with multiprocessing.Pool(players) as pool:
+            results = pool.map(_run_player, jobs)
+    else:
+        results = [None] * players
+
+        def worker(i):
+            results[i] = _run_player(jobs[i])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(players)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - start
+
+    if tmp:
+        tmp.cleanup()
+    return summarize(results, elapsed)
+
+
+def format_report(stats):
+    lines = [
+        f"{stats['players']} players, {stats['total_ops']} ops in {stats['elapsed_s']}s "
+        f"({stats['ops_per_s']} ops/s), lock retries: {stats['lock_retries']} "
+        f"(waited {stats['lock_wait_s']}s), crashed players: {stats['crashed_players']}",
+        f"{'op':<10}{'count':>8}{'errors':>8}{'locked':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}",
+    ]
+    for op, s in stats['ops'].items():
+        lines.append(f"{op:<10}{s['count']:>8}{s['errors']:>8}{s['lock_errors']:>8}"
+                     f"{s['mean_ms']:>10}{s['p50_ms']:>10}{s['p99_ms']:>10}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated players load generator")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=20, help="Game loops per player")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--shared-db", action="store_true", help="All players on one save DB")
+    parser.add_argument("--roster", type=int, default=0, help="Pre-seeded monsters per save")
+    parser.add_argument("--json", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    stats = run_load(args.players, args.iterations, args.mode, args.shared_db, args.roster)
+    print(format_report(stats))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(stats, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
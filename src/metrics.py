@@ -0,0 +1,236 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Process-wide instrumentation: counters, latency histograms and nested spans.
+#
+#   with metrics.span("start_combat"):          # nested spans get a parent
+#       ...
+#   @traced("ai.generate_abilities")           # same, as a decorator
+#   metrics.count("ai.errors")
+#
+# Spans can be exported as JSON lines or Chrome trace format (chrome://tracing, Perfetto).
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Histogram:
+    """Latency histogram (ms). Keeps exact count/sum/min/max and the last samples for percentiles."""
+    def __init__(self, max_samples=1024):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.errors = 0
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'error_rate': self.errors / self.count if self.count else 0.0,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max or 0.0,
+        }
+
+
+class Span:
+    __slots__ = ('name', 'parent', 'start', 'end', 'thread_id', 'attrs', 'error')
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+        self.error = None
+
+    @property
+    def path(self):
+        # "start_combat > combat.generate_enemy > ai.generate_abilities"
+        names = []
+        span = self
+        while span:
+            names.append(span.name)
+            span = span.parent
+        return " > ".join(reversed(names))
+
+    @property
+    def duration_ms(self):
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+
+class Metrics:
+    def __init__(self, max_spans=10000):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.spans = deque(maxlen=max_spans) # Finished spans, oldest dropped first
+        self.origin = time.perf_counter()
+        self.enabled = True
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value_ms, error=False):
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(value_ms)
+            if error:
+                hist.errors += 1
+
+    def error(self, name):
+        """Marks one failure for name (for errors caught inside the instrumented code)."""
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.errors += 1
+        self.count(f"{name}.errors")
+
+    def span(self, name, **attrs):
+        return _SpanContext(self, name, attrs)
+
+    def timer(self, name):
+        """Histogram-only timing (no span kept)."""
+        return _TimerContext(self, name)
+
+    def current_span(self):
+        return _current_span.get()
+
+    def finish_span(self, span):
+        self.observe(span.name, span.duration_ms, error=span.error is not None)
+        with self.lock:
+            self.spans.append(span)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {name: h.summary() for name, h in self.histograms.items()},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.spans.clear()
+
+    def _span_dicts(self):
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            data = {
+                'name': span.name,
+                'path': span.path,
+                'start_ms': round((span.start - self.origin) * 1000, 3),
+                'duration_ms': round(span.duration_ms, 3),
+                'thread': span.thread_id,
+            }
+            if span.attrs:
+                data['attrs'] = span.attrs
+            if span.error:
+                data['error'] = span.error
+            yield span, data
+
+    def export_jsonl(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            for _, data in self._span_dicts():
+                f.write(json.dumps(data, default=str) + "\n")
+        return path
+
+    def export_chrome_trace(self, path):
+        events = []
+        for span, data in self._span_dicts():
+            args = dict(data.get('attrs', {}))
+            if span.error:
+                args['error'] = span.error
+            events.append({
+                'name': span.name, 'ph': 'X', 'pid': os.getpid(), 'tid': span.thread_id,
+                'ts': round((span.start - self.origin) * 1e6, 1),
+                'dur': round(span.duration_ms * 1000, 1),
+                'args': args,
+            })
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+        return path
+
+
+class _SpanContext:
+    def __init__(self, registry, name, attrs):
+        self.registry = registry
+        self.name = name
+        self.attrs = attrs
+        self.span = None
+        self.token = None
+
+    def __enter__(self):
+        if not self.registry.enabled:
+            return None
+        self.span = Span(self.name, _current_span.get(), self.attrs)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+        self.span.end = time.perf_counter()
+        if exc_type is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+            self.registry.count(f"{self.name}.errors")
+        _current_span.reset(self.token)
+        self.registry.finish_span(self.span)
+        return False
+
+
+class _TimerContext:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, (time.perf_counter() - self.start) * 1000, error=exc_type is not None)
+        return False
+
+
+metrics = Metrics()
+
+
+def traced(name):
+    """Decorator: runs the function inside a span called name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -92,3 +92,20 @@ class Ability:
 
         # In-battle state
         self.current_cooldown = 0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'description': self.description,
+            'type': self.type,
+            'damage': self.damage,
+            'heal': self.heal,
+            'cost_mp': self.cost_mp,
+            'cost_hp': self.cost_hp,
+            'cooldown_local': self.cooldown_local,
+            'cooldown_global': self.cooldown_global,
+            'stun_duration': self.stun_duration,
+            'drain_percent': self.drain_percent,
+            'is_legendary': self.is_legendary,
+            'image_path': self.image_path
+        }
@@ -0,0 +1,188 @@
+import hashlib
+import random
+import re
+import time
+import unicodedata
+from array import array
+from src.config import TEMPLATE_SIMILARITY, TEMPLATE_REUSE_RATE, TEMPLATE_MIN_LIBRARY
+from src.metrics import metrics, traced
+
+# Library of generated monster "species" (name, types, level-1 stats, description, image).
+#
+# Every new monster is compared to the library with MinHash signatures over name trigrams
+# and description word pairs; LSH buckets keep the lookup sub-linear. A near-duplicate
+# (estimated Jaccard >= TEMPLATE_SIMILARITY) is not stored again and reuses the existing
+# image. Once the library is big enough, part of the wild encounters are remixed from it
+# instead of calling the AI at all.
+
+NUM_HASHES = 64
+BANDS = 16 # LSH: 16 bands of 4 rows, candidates above ~0.5 similarity are found reliably
+ROWS = NUM_HASHES // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(4242) # Fixed: signatures are stored, they must be stable across runs
+_COEFFS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+
+STATS = ('hp_max', 'mp_max', 'attack', 'defense', 'speed')
+VARIANTS = ["Alpha", "Sombre", "Ancien", "Chromé", "Sauvage", "Royal"]
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return re.sub(r"[^a-z0-9 ]+", " ", text).split()
+
+
+def shingles(name, description):
+    """Name character trigrams and description word pairs (prefixed so they never collide)."""
+    name = "".join(_normalize(name))
+    result = {f"n:{name[i:i + 3]}" for i in range(max(1, len(name) - 2))}
+    words = _normalize(description)
+    result.update(f"d:{a} {b}" for a, b in zip(words, words[1:]))
+    result.update(f"d:{w}" for w in words if len(words) < 2)
+    return result
+
+
+def minhash(features):
+    values = [int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little") for f in features]
+    if not values:
+        return array("Q", [0] * NUM_HASHES)
+    return array("Q", [min((a * v + b) % _PRIME for v in values) for a, b in _COEFFS])
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_HASHES
+
+
+def level_scale(level):
+    # Same growth as the generators: stats for level L are about level-1 stats * (1 + L/10)
+    return 1 + (level or 1) / 10
+
+
+class TemplateLibrary:
+    def __init__(self, db_conn, threshold=TEMPLATE_SIMILARITY, reuse_rate=TEMPLATE_REUSE_RATE,
+                 min_library=TEMPLATE_MIN_LIBRARY, rng=None):
+        self.db_conn = db_conn
+        self.threshold = threshold
+        self.reuse_rate = reuse_rate
+        self.min_library = min_library
+        self.rng = rng or random.Random()
+        self.templates = None # id -> row dict (loaded on first use)
+        self.signatures = {}
+        self.buckets = {} # (band, band values) -> [template id]
+
+    def _ensure_loaded(self):
+        if self.templates is not None:
+            return
+        self.templates = {}
+        for row in self.db_conn.execute("SELECT * FROM monster_templates"):
+            template = dict(row)
+            sig = array("Q")
+            sig.frombytes(template.pop('signature'))
+            self._index(template, sig)
+
+    def _index(self, template, sig):
+        self.templates[template['id']] = template
+        self.signatures[template['id']] = sig
+        for band in range(BANDS):
+            key = (band, tuple(sig[band * ROWS:(band + 1) * ROWS]))
+            self.buckets.setdefault(key, []).append(template['id'])
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self.templates)
+
+    @traced("templates.find_similar")
+    def find_similar(self, name, description):
+        """(template, similarity) of the closest near-duplicate, or (None, best similarity)."""
+        return self._find(minhash(shingles(name, description)))
+
+    def _find(self, sig):
+        self._ensure_loaded()
+        candidates = set()
+        for band in range(BANDS):
+            candidates.update(self.buckets.get((band, tuple(sig[band * ROWS:(band + 1) * ROWS])), ()))
+        best, best_score = None, 0.0
+        for template_id in candidates:
+            score = similarity(sig, self.signatures[template_id])
+            if score > best_score:
+                best, best_score = self.templates[template_id], score
+        if best_score >= self.threshold:
+            return best, best_score
+        return None, best_score
+
+    @traced("templates.register")
+    def register(self, stats, level=1):
+        """
+        Records a freshly generated monster. Returns (template, is_duplicate): the near-duplicate
+        it matched (nothing new is stored, its image can be reused) or the new template.
+        """
+        sig = minhash(shingles(stats.get('name'), stats.get('description')))
+        duplicate, _ = self._find(sig)
+        if duplicate:
+            metrics.count("templates.duplicates")
+            duplicate['uses'] += 1
+            self.db_conn.execute("UPDATE monster_templates SET uses = uses + 1 WHERE id = ?", (duplicate['id'],))
+            self.db_conn.commit()
+            return duplicate, True
+
+        scale = level_scale(level)
+        template = {
+            'name': stats.get('name'),
+            'type_1': stats.get('type_1'),
+            'type_2': stats.get('type_2'),
+            'is_mythical': bool(stats.get('is_mythical')),
+            'description': stats.get('description'),
+            'image_path': stats.get('image_path'),
+            'uses': 1,
+            'created_at': int(time.time()),
+        }
+        for stat in STATS:
+            template[stat] = round((stats.get(stat) or 10) / scale, 2)
+        cursor = self.db_conn.execute('''
+            INSERT INTO monster_templates (name, type_1, type_2, is_mythical, hp_max, mp_max, attack, defense, speed,
+                                           description, image_path, signature, uses, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (template['name'], template['type_1'], template['type_2'], template['is_mythical'],
+              template['hp_max'], template['mp_max'], template['attack'], template['defense'], template['speed'],
+              template['description'], template['image_path'], sig.tobytes(), 1, template['created_at']))
+        self.db_conn.commit()
+        template['id'] = cursor.lastrowid
+        self._index(template, sig)
+        return template, False
+
+    def set_image(self, template_id, image_path):
+        self.templates[template_id]['image_path'] = image_path
+        self.db_conn.execute("UPDATE monster_templates SET image_path = ? WHERE id = ?", (image_path, template_id))
+        self.db_conn.commit()
+
+    def maybe_reuse(self, level):
+        """
+        Stats for a wild monster remixed from a stored template, or None when the library is
+        still small or the dice say generate something new.
+        """
+        if len(self) < self.min_library or self.rng.random() >= self.reuse_rate:
+            return None
+        metrics.count("templates.reused")
+        template = self.rng.choice(list(self.templates.values()))
+        template['uses'] += 1
+        self.db_conn.execute("UPDATE monster_templates SET uses = uses + 1 WHERE id = ?", (template['id'],))
+        self.db_conn.commit()
+        return self.remix(template, level)
+
+    def remix(self, template, level):
+        rng = self.rng
+        scale = level_scale(level)
+        stats = {stat: max(1, int(template[stat] * scale * rng.uniform(0.9, 1.1))) for stat in STATS}
+        stats.update({
+            'name': template['name'],
+            'is_mythical': bool(template['is_mythical']),
+            'type_1': template['type_1'],
+            'type_2': template['type_2'],
+            'description': template['description'],
+            'image_path': template['image_path'],
+        })
+        if rng.random() < 0.2:
+            # Regional variant: same look, new name and a stat shuffle
+            stats['name'] = f"{template['name']} {rng.choice(VARIANTS)}"
+            stats['attack'], stats['defense'] = stats['defense'], stats['attack']
+        return stats
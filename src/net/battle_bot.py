@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from src.config import BATTLE_SERVER_HOST, BATTLE_SERVER_PORT, MAX_TEAM_SIZE
+from src.constants import TYPES
+from src.game_engine import ExchangeSystem
+from src.models import Monster, Ability
+from src.net.protocol import MAX_MESSAGE_SIZE, read_message, send_message
+
+
+def random_team_codes(size=MAX_TEAM_SIZE):
+    codes = []
+    for i in range(size):
+        monster_type = random.choice(TYPES)
+        monster = Monster({
+            "name": f"Bot{random.randint(0, 99999)}", "type_1": monster_type, "level": 10,
+            "hp_max": random.randint(80, 120), "mp_max": 20, "attack": random.randint(15, 25),
+            "defense": random.randint(15, 25), "speed": random.randint(5, 30)
+        })
+        monster.abilities = [Ability({"name": f"Frappe {n}", "type": monster_type, "damage": random.randint(20, 60)})
+                             for n in range(2)]
+        codes.append(ExchangeSystem.generate_code(monster))
+    return codes
+
+
+class BattleBot:
+    """
+    Plays a full match with random moves. Records the time between sending a move
+    and receiving the resolved turn.
+    """
+    def __init__(self, host=BATTLE_SERVER_HOST, port=BATTLE_SERVER_PORT):
+        self.host = host
+        self.port = port
+        self.turn_latencies = []
+        self.result = None
+
+    async def play(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=MAX_MESSAGE_SIZE)
+        try:
+            await send_message(writer, {"op": "join", "team": random_team_codes()})
+            side, teams, active = None, None, [0, 0]
+            sent_at = None
+
+            while True:
+                msg = await read_message(reader)
+                if msg is None:
+                    break
+                event = msg.get('event')
+                if event == 'start':
+                    side, teams = msg['you'], msg['teams']
+                    turn = 1
+                elif event == 'turn':
+                    if sent_at is not None:
+                        self.turn_latencies.append(time.perf_counter() - sent_at)
+                    for s, slot in msg.get('active', []):
+                        active[s] = slot
+                    turn = msg['t'] + 1
+                elif event == 'end':
+                    self.result = 'win' if msg['winner'] == side else 'loss'
+                    break
+                elif not msg.get('ok', True):
+                    raise RuntimeError(msg.get('error'))
+                else:
+                    continue
+
+                abilities = teams[side][active[side]]['abilities']
+                move = {"op": "move", "turn": turn, "ability": random.randrange(len(abilities)) if abilities else None}
+                sent_at = time.perf_counter()
+                await send_message(writer, move)
+        finally:
+            writer.close()
+        return self.result
+
+
+async def run_bots(host, port, bots=200):
+    """
+    Runs bots concurrently (pairs become matches). Returns a stats dict.
+    """
+    players = [BattleBot(host, port) for _ in range(bots)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*[p.play() for p in players], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(l for p in players for l in p.turn_latencies)
+    errors = [r for r in results if isinstance(r, Exception) or r is None]
+    stats = {
+        'bots': bots,
+        'matches': bots // 2,
+        'elapsed_s': round(elapsed, 3),
+        'turns': len(latencies),
+        'errors': len(errors),
+    }
+    if latencies:
+        stats['turn_p50_ms'] = round(statistics.median(latencies) * 1000, 3)
+        stats['turn_p99_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot clients for the battle server (load test)")
+    parser.add_argument("--host", default=BATTLE_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=BATTLE_SERVER_PORT)
+    parser.add_argument("--bots", type=int, default=200)
+    args = parser.parse_args()
+    print(asyncio.run(run_bots(args.host, args.port, args.bots)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import itertools
+import math
+import random
+from src.config import BATTLE_SERVER_HOST, BATTLE_SERVER_PORT, BATTLE_TURN_TIMEOUT, BATTLE_MAX_TURNS, MAX_TEAM_SIZE
+from src.game_engine import CombatSystem, ExchangeSystem
+from src.net.protocol import MAX_MESSAGE_SIZE, ProtocolError, read_message, send_message, encode_message
+
+ABILITY_NUMBERS = ('damage', 'heal', 'cost_mp', 'cost_hp', 'cooldown_local', 'cooldown_global',
+                   'stun_duration', 'drain_percent')
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def team_error(team):
+    """Why a decoded team cannot fight (a signed code can still hold junk values), or None."""
+    for m in team:
+        if not all(isinstance(getattr(m, stat), int) for stat in ('hp_max', 'attack', 'defense')):
+            return "Incomplete monster stats"
+        if not (m.speed is None or _is_number(m.speed)):
+            return "Invalid monster stats"
+        if not all(t is None or isinstance(t, str) for t in (m.type_1, m.type_2)):
+            return "Invalid monster type"
+        for ability in m.abilities:
+            # Only damage is needed to fight; the other fields may be missing, not junk
+            if not _is_number(ability.damage) or not all(
+                    getattr(ability, field) is None or _is_number(getattr(ability, field)) for field in ABILITY_NUMBERS):
+                return f"Invalid ability: {ability.name}"
+            if not (ability.type is None or isinstance(ability.type, str)):
+                return f"Invalid ability: {ability.name}"
+    return None
+
+
+class Player:
+    def __init__(self, writer, team):
+        self.writer = writer
+        self.team = team
+        self.match = None
+        self.side = None
+
+
+class Match:
+    """
+    One PvP battle. Both players submit a move per turn, then the server resolves
+    the turn with CombatSystem.attack and broadcasts only what changed.
+
+    Move:  {"op": "move", "turn": 3, "ability": 0}  (ability index, null = "Lutte")
+           {"op": "move", "turn": 3, "switch": 1}   (change active monster)
+    Turn:  {"event": "turn", "t": 3, "log": [[side, ability, damage], ...],
+            "hp": [[side, slot, hp], ...], "active": [[side, slot], ...]}
+    """
+    def __init__(self, match_id, players, turn_timeout=BATTLE_TURN_TIMEOUT):
+        self.id = match_id
+        self.players = players
+        self.turn_timeout = turn_timeout
+        self.combat = CombatSystem([], None)
+        self.active = [0, 0]
+        self.turn = 1
+        self.moves = [None, None]
+        self.moves_ready = asyncio.Event()
+        self.winner = None
+
+        for side, player in enumerate(players):
+            player.match = self
+            player.side = side
+            for monster in player.team:
+                monster.current_hp = monster.hp_max
+
+    def current(self, side):
+        return self.players[side].team[self.active[side]]
+
+    def broadcast(self, msg):
+        data = encode_message(msg)
+        for player in self.players:
+            if not player.writer.is_closing():
+                player.writer.write(data)
+
+    def start_message(self, side):
+        return {
+            "event": "start", "match": self.id, "you": side,
+            "teams": [[{
+                "name": m.name, "type_1": m.type_1, "type_2": m.type_2, "level": m.level,
+                "hp_max": m.hp_max, "speed": m.speed,
+                "abilities": [a.name for a in m.abilities]
+            } for m in p.team] for p in self.players]
+        }
+
+    def submit(self, side, msg):
+        if self.winner is not None:
+            return {"ok": False, "error": "Match over"}
+        if msg.get('turn') != self.turn:
+            return {"ok": False, "error": "Wrong turn"}
+        if self.moves[side] is not None:
+            return {"ok": False, "error": "Move already submitted"}
+        self.moves[side] = msg
+        if all(m is not None for m in self.moves):
+            self.moves_ready.set()
+        return {"ok": True}
+
+    def forfeit(self, side):
+        if self.winner is None:
+            self.winner = 1 - side
+            self.moves_ready.set()
+
+    async def run(self):
+        try:
+            for side, player in enumerate(self.players):
+                player.writer.write(encode_message(self.start_message(side)))
+
+            while self.winner is None:
+                try:
+                    await asyncio.wait_for(self.moves_ready.wait(), self.turn_timeout)
+                except asyncio.TimeoutError:
+                    pass # Missing moves default to "Lutte"
+                if self.winner is not None:
+                    break
+                self.broadcast(self.resolve_turn())
+        except Exception as e:
+            # Ends the match for both players instead of leaving them waiting for a turn
+            print(f"Match {self.id} failed: {type(e).__name__}: {e}")
+            self.broadcast({"event": "error", "match": self.id, "error": "Match aborted"})
+            return
+
+        self.broadcast({"event": "end", "match": self.id, "winner": self.winner})
+
+    def resolve_turn(self):
+        moves = [m or {} for m in self.moves]
+        log, hp, active = [], [], []
+
+        # Switches happen before attacks
+        for side, move in enumerate(moves):
+            slot = move.get('switch')
+            team = self.players[side].team
+            if isinstance(slot, int) and 0 <= slot < len(team) and team[slot].current_hp > 0:
+                self.active[side] = slot
+                active.append([side, slot])
+
+        # Faster monster attacks first (ties random)
+        order = sorted((0, 1), key=lambda s: (self.current(s).speed or 0, random.random()), reverse=True)
+        for side in order:
+            if 'switch' in moves[side]:
+                continue
+            attacker, defender = self.current(side), self.current(1 - side)
+            if attacker.current_hp <= 0 or defender.current_hp <= 0:
+                continue
+            index = moves[side].get('ability')
+            ability = None
+            if isinstance(index, int) and 0 <= index < len(attacker.abilities):
+                ability = attacker.abilities[index]
+            else:
+                index = None
+            damage = self.combat.attack(attacker, defender, ability)
+            log.append([side, index, damage])
+            hp.append([1 - side, self.active[1 - side], defender.current_hp])
+
+        # KO: next alive monster comes in, or the match is over
+        for side in (0, 1):
+            if self.current(side).current_hp > 0:
+                continue
+            team = self.players[side].team
+            alive = [i for i, m in enumerate(team) if m.current_hp > 0]
+            if alive:
+                self.active[side] = alive[0]
+                active.append([side, alive[0]])
+            else:
+                self.winner = 1 - side
+
+        if self.winner is None and self.turn >= BATTLE_MAX_TURNS:
+            # Out of turns: the team with the most remaining HP (in %) wins
+            ratios = [sum(m.current_hp for m in p.team) / max(1, sum(m.hp_max for m in p.team)) for p in self.players]
+            self.winner = 0 if ratios[0] >= ratios[1] else 1
+
+        msg = {"event": "turn", "t": self.turn, "log": log, "hp": hp}
+        if active:
+            msg["active"] = active
+        self.turn += 1
+        self.moves = [None, None]
+        self.moves_ready.clear()
+        return msg
+
+
+class BattleServer:
+    """
+    Headless PvP server. A client joins with its team as exchange codes
+    ({"op": "join", "team": [code, ...]}) and is paired with the next waiting player.
+    Codes are only verified (not redeemed): the monsters stay with their owners.
+    """
+    def __init__(self, host=BATTLE_SERVER_HOST, port=BATTLE_SERVER_PORT, turn_timeout=BATTLE_TURN_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.turn_timeout = turn_timeout
+        self.server = None
+        self.waiting = None
+        self.matches = {}
+        self.match_ids = itertools.count(1)
+        self.finished_matches = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle_client, self.host, self.port,
+            limit=MAX_MESSAGE_SIZE, backlog=4096
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if not self.server:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        for match in list(self.matches.values()):
+            match.forfeit(0)
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        player = None
+        try:
+            while True:
+                try:
+                    msg = await read_message(reader)
+                except ProtocolError as e:
+                    await send_message(writer, {"ok": False, "error": str(e)})
+                    break
+                if msg is None:
+                    break
+
+                op = msg.get('op')
+                if op == 'join' and player is None:
+                    player, reply = self.join(writer, msg.get('team'))
+                elif op == 'move' and player and player.match:
+                    reply = player.match.submit(player.side, msg)
+                else:
+                    reply = {"ok": False, "error": f"Unexpected op: {op}"}
+                if "id" in msg:
+                    reply["id"] = msg["id"]
+                await send_message(writer, reply)
+        except ConnectionError:
+            pass
+        finally:
+            if player:
+                if self.waiting is player:
+                    self.waiting = None
+                if player.match:
+                    player.match.forfeit(player.side)
+            writer.close()
+
+    def join(self, writer, codes):
+        if not isinstance(codes, list) or not 0 < len(codes) <= MAX_TEAM_SIZE:
+            return None, {"ok": False, "error": f"Team must have 1 to {MAX_TEAM_SIZE} codes"}
+        team = [ExchangeSystem.load_code(code) if isinstance(code, str) else None for code in codes]
+        if not all(team):
+            return None, {"ok": False, "error": "Invalid code"}
+        error = team_error(team)
+        if error:
+            return None, {"ok": False, "error": error}
+
+        player = Player(writer, team)
+        if self.waiting is None or self.waiting.writer.is_closing():
+            self.waiting = player
+            return player, {"ok": True, "status": "waiting"}
+
+        opponent, self.waiting = self.waiting, None
+        match = Match(next(self.match_ids), [opponent, player], self.turn_timeout)
+        self.matches[match.id] = match
+        task = asyncio.create_task(match.run())
+        task.add_done_callback(lambda _: self.end_match(match))
+        return player, {"ok": True, "status": "matched", "match": match.id}
+
+    def end_match(self, match):
+        self.matches.pop(match.id, None)
+        self.finished_matches += 1
+        for player in match.players:
+            player.match = None
+            if not player.writer.is_closing():
+                player.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monstres Infinis PvP battle server")
+    parser.add_argument("--host", default=BATTLE_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=BATTLE_SERVER_PORT)
+    args = parser.parse_args()
+
+    server = BattleServer(args.host, args.port)
+
+    async def run():
+        await server.start()
+        print(f"Battle server listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
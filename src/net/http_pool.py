@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+from src.config import HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT_S, HTTP_READ_TIMEOUT_S, DOWNLOAD_MAX_BYTES
+from src.metrics import metrics, traced
+
+# Shared HTTP session for image backends.
+#
+# One requests.Session for the whole process: connections are kept alive and pooled per host
+# (HTTP_POOL_SIZE, enough for every image job worker), idempotent requests are retried on
+# connection errors and 5xx. Bodies are streamed to disk in chunks, hashed on the way, and
+# only renamed into place once complete and verified: a download never sits in memory and
+# never leaves half a file behind.
+
+CHUNK_SIZE = 64 * 1024
+TIMEOUT = (HTTP_CONNECT_TIMEOUT_S, HTTP_READ_TIMEOUT_S)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class DownloadError(Exception):
+    pass
+
+
+def get_session():
+    """The shared pooled session (requests is imported on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504),
+                          allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = "MonsterOuterSpace"
+            _session = session
+        return _session
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def stream_to_file(response, dest, sha256=None, max_bytes=DOWNLOAD_MAX_BYTES):
+    """
+    Writes a streamed response body to dest (atomically) and returns its sha256. Raises
+    DownloadError if the body is too big, truncated or does not match sha256.
+    """
+    declared = response.headers.get("Content-Length")
+    if declared and int(declared) > max_bytes:
+        raise DownloadError(f"{declared} bytes announced, limit is {max_bytes}")
+    digest = hashlib.sha256()
+    received = 0
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with open(tmp, "wb") as f:
+            try:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise DownloadError(f"body larger than {max_bytes} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+            except OSError as e: # requests' connection errors are OSErrors too
+                raise DownloadError(f"download failed after {received} bytes: {e}") from e
+        # Content-Length is the size on the wire: compressed bodies are compared before decoding
+        wire = received
+        if response.headers.get("Content-Encoding", "identity") != "identity":
+            tell = getattr(response.raw, "tell", None)
+            wire = tell() if tell else None
+        if declared and wire is not None and wire != int(declared):
+            raise DownloadError(f"truncated: {wire} of {declared} bytes")
+        if sha256 and digest.hexdigest() != sha256.lower():
+            raise DownloadError("checksum mismatch")
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    metrics.count("http.bytes_downloaded", received)
+    return digest.hexdigest()
+
+
+@traced("http.download")
+def download(url, dest, sha256=None, max_bytes=DOWNLOAD_MAX_BYTES, timeout=TIMEOUT):
+    """GETs url into dest through the pooled session. Returns the body's sha256."""
+    with get_session().get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        return stream_to_file(response, dest, sha256, max_bytes)
@@ -0,0 +1,37 @@
+import asyncio
+import json
+
+# Newline-delimited JSON over TCP. One message per line.
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_message(msg):
+    return json.dumps(msg, separators=(",", ":")).encode() + b"\n"
+
+
+async def read_message(reader):
+    """
+    Reads one message. Returns None when the peer closed the connection.
+    """
+    try:
+        line = await reader.readuntil(b"\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ProtocolError("Message too large")
+    try:
+        msg = json.loads(line)
+    except ValueError:
+        raise ProtocolError("Invalid JSON")
+    if not isinstance(msg, dict):
+        raise ProtocolError("Message must be an object")
+    return msg
+
+
+async def send_message(writer, msg):
+    writer.write(encode_message(msg))
+    await writer.drain()
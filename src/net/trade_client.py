@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from src.config import TRADE_SERVER_HOST, TRADE_SERVER_PORT
+from src.game_engine import ExchangeSystem
+from src.models import Monster
+from src.net.protocol import MAX_MESSAGE_SIZE, ProtocolError, read_message, send_message
+
+
+class TradeClient:
+    """
+    Async client for TradeServer. Replies are matched to requests by id,
+    server events (e.g. "claimed") are pushed to self.events.
+    """
+    def __init__(self, host=TRADE_SERVER_HOST, port=TRADE_SERVER_PORT):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.pending = {}
+        self.events = asyncio.Queue()
+        self.request_ids = itertools.count(1)
+        self.reader_task = None
+        self.closed = None # Why the reader stopped, once it has
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=MAX_MESSAGE_SIZE)
+        self.reader_task = asyncio.create_task(self._read_loop())
+        return self
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self.reader_task:
+            self.reader_task.cancel()
+
+    async def _read_loop(self):
+        reason = "Connection closed"
+        try:
+            while True:
+                msg = await read_message(self.reader)
+                if msg is None:
+                    break
+                if 'event' in msg:
+                    self.events.put_nowait(msg)
+                    continue
+                future = self.pending.pop(msg.get('id'), None)
+                if future and not future.done():
+                    future.set_result(msg)
+        except (ProtocolError, ConnectionError) as e:
+            reason = f"Connection lost: {e}"
+        finally:
+            # Also on cancel (close): nobody waits for a reply that cannot come
+            self.closed = reason
+            pending, self.pending = self.pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(reason))
+
+    async def request(self, op, **fields):
+        if self.closed:
+            raise ConnectionError(self.closed)
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        await send_message(self.writer, dict(fields, op=op, id=request_id))
+        return await future
+
+    async def offer(self, code):
+        return await self.request('offer', code=code)
+
+    async def list_offers(self):
+        return await self.request('list')
+
+    async def claim(self, offer_id):
+        return await self.request('claim', offer_id=offer_id)
+
+    async def cancel(self, offer_id):
+        return await self.request('cancel', offer_id=offer_id)
+
+
+async def run_load_test(host, port, clients=1000, connect_concurrency=200):
+    """
+    Each client offers a fresh monster, then claims the offer of the next client
+    (ring), so every offer is claimed exactly once. Returns a stats dict.
+    """
+    latencies = {'connect': [], 'offer': [], 'claim': []}
+    errors = []
+    gate = asyncio.Semaphore(connect_concurrency)
+
+    async def timed(op, coro):
+        start = time.perf_counter()
+        result = await coro
+        latencies[op].append(time.perf_counter() - start)
+        return result
+
+    async def connect_client():
+        async with gate:
+            return await timed('connect', TradeClient(host, port).connect())
+
+    start = time.perf_counter()
+    conns = await asyncio.gather(*[connect_client() for _ in range(clients)])
+
+    codes = [ExchangeSystem.generate_code(Monster({"name": f"Load{i}", "hp_max": 50, "level": 1}))
+             for i in range(clients)]
+    offers = await asyncio.gather(*[timed('offer', c.offer(code)) for c, code in zip(conns, codes)])
+    offer_ids = [o.get('offer_id') for o in offers]
+    errors += [o['error'] for o in offers if not o.get('ok')]
+
+    claims = await asyncio.gather(*[
+        timed('claim', conns[i].claim(offer_ids[(i + 1) % clients])) for i in range(clients)
+    ])
+    errors += [c['error'] for c in claims if not c.get('ok')]
+    elapsed = time.perf_counter() - start
+
+    await asyncio.gather(*[c.close() for c in conns])
+
+    def percentiles(values):
+        if not values:
+            return {}
+        values = sorted(values)
+        return {
+            'p50_ms': round(statistics.median(values) * 1000, 3),
+            'p99_ms': round(values[min(len(values) - 1, int(len(values) * 0.99))] * 1000, 3),
+        }
+
+    return {
+        'clients': clients,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(clients * 2 / elapsed, 1),
+        'errors': len(errors),
+        'latency': {op: percentiles(v) for op, v in latencies.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the trade server")
+    parser.add_argument("--host", default=TRADE_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=TRADE_SERVER_PORT)
+    parser.add_argument("--clients", type=int, default=1000)
+    args = parser.parse_args()
+
+    # Thousands of sockets may need a higher limit: ulimit -n 10000
+    stats = asyncio.run(run_load_test(args.host, args.port, args.clients))
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import itertools
+from src.config import TRADE_SERVER_HOST, TRADE_SERVER_PORT, TRADE_SERVER_DB
+from src.database import init_db, get_db_connection
+from src.game_engine import ExchangeSystem
+from src.ledger import CodeLedger
+from src.net.protocol import MAX_MESSAGE_SIZE, ProtocolError, read_message, send_message
+
+
+class TradeServer:
+    """
+    Brokers monster offers between clients.
+
+    Requests (one JSON object per line, see src/net/protocol.py):
+      {"op": "offer", "code": "..."}     -> {"ok": true, "offer_id": 1}
+      {"op": "list"}                     -> {"ok": true, "offers": [...]}
+      {"op": "claim", "offer_id": 1}     -> {"ok": true, "code": "..."}
+      {"op": "cancel", "offer_id": 1}    -> {"ok": true}
+    The offering client receives {"event": "claimed", "offer_id": 1} when its offer is taken.
+    Codes are verified with ExchangeSystem and redeemed in the server ledger on claim,
+    so each code can only change hands once.
+    """
+    def __init__(self, host=TRADE_SERVER_HOST, port=TRADE_SERVER_PORT, db_path=TRADE_SERVER_DB):
+        self.host = host
+        self.port = port
+        init_db(db_path)
+        self.db_conn = get_db_connection(db_path)
+        # One commit per claim: WAL keeps those cheap under load
+        self.db_conn.execute("PRAGMA journal_mode=WAL")
+        self.db_conn.execute("PRAGMA synchronous=NORMAL")
+        self.ledger = CodeLedger(self.db_conn)
+        self.offers = {} # offer_id -> dict(code, summary, owner)
+        self.owned = {} # writer -> set of offer_ids
+        self.offered_digests = set()
+        self.offer_ids = itertools.count(1)
+        self.server = None
+        self.connections = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle_client, self.host, self.port,
+            limit=MAX_MESSAGE_SIZE, backlog=4096
+        )
+        # Port 0 picks a free port (tests)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if not self.server:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        self.db_conn.close()
+
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        self.owned[writer] = set()
+        try:
+            while True:
+                try:
+                    msg = await read_message(reader)
+                except ProtocolError as e:
+                    await send_message(writer, {"ok": False, "error": str(e)})
+                    break
+                if msg is None:
+                    break
+                try:
+                    reply = self.dispatch(msg, writer)
+                except (TypeError, ValueError, KeyError) as e:
+                    reply = {"ok": False, "error": f"Bad request: {e}"}
+                if "id" in msg:
+                    reply["id"] = msg["id"] # Lets clients pipeline requests
+                await send_message(writer, reply)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            # Offers of a disconnected client are withdrawn
+            for offer_id in list(self.owned[writer]):
+                self.remove_offer(offer_id)
+            del self.owned[writer]
+            writer.close()
+
+    def dispatch(self, msg, writer):
+        op = msg.get('op')
+        if op == 'offer':
+            return self.do_offer(msg.get('code'), writer)
+        if op == 'list':
+            return {"ok": True, "offers": [
+                dict(o['summary'], offer_id=k) for k, o in itertools.islice(self.offers.items(), 100)
+            ]}
+        if op == 'claim':
+            return self.do_claim(msg.get('offer_id'), writer)
+        if op == 'cancel':
+            offer = self.offers.get(msg.get('offer_id'))
+            if not offer or offer['owner'] is not writer:
+                return {"ok": False, "error": "Unknown offer"}
+            self.remove_offer(msg['offer_id'])
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def remove_offer(self, offer_id):
+        offer = self.offers.pop(offer_id)
+        self.owned[offer['owner']].discard(offer_id)
+        self.offered_digests.discard(offer['digest'])
+        return offer
+
+    def do_offer(self, code, writer):
+        if not isinstance(code, str):
+            return {"ok": False, "error": "Missing code"}
+        # Verify only (no redemption yet): the code is redeemed when claimed
+        monster = ExchangeSystem.load_code(code)
+        if not monster:
+            return {"ok": False, "error": "Invalid code"}
+        sig_digest = ExchangeSystem.code_digest(code)
+        if self.ledger.is_used(sig_digest):
+            return {"ok": False, "error": "Code already used"}
+        if sig_digest in self.offered_digests:
+            return {"ok": False, "error": "Code already offered"}
+
+        offer_id = next(self.offer_ids)
+        self.offers[offer_id] = {
+            'code': code,
+            'digest': sig_digest,
+            'owner': writer,
+            'summary': {"name": monster.name, "level": monster.level, "type_1": monster.type_1}
+        }
+        self.owned[writer].add(offer_id)
+        self.offered_digests.add(sig_digest)
+        return {"ok": True, "offer_id": offer_id}
+
+    def do_claim(self, offer_id, writer):
+        offer = self.offers.get(offer_id)
+        if not offer:
+            return {"ok": False, "error": "Unknown offer"}
+        if offer['owner'] is writer:
+            return {"ok": False, "error": "Cannot claim your own offer"}
+        self.remove_offer(offer_id)
+        if not ExchangeSystem.load_code(offer['code'], ledger=self.ledger):
+            return {"ok": False, "error": "Code already used"}
+
+        owner = offer['owner']
+        if not owner.is_closing():
+            owner.write(b'{"event":"claimed","offer_id":%d}\n' % offer_id)
+        return {"ok": True, "code": offer['code']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monstres Infinis trade server")
+    parser.add_argument("--host", default=TRADE_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=TRADE_SERVER_PORT)
+    parser.add_argument("--db", default=TRADE_SERVER_DB)
+    args = parser.parse_args()
+
+    server = TradeServer(args.host, args.port, args.db)
+
+    async def run():
+        await server.start()
+        print(f"Trade server listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
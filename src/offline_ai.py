@@ -0,0 +1,18 @@
+import os
+from src.config import ASSETS_PATH
+from src.procedural import ProceduralGenerator
+
+
+class OfflineAIManager(ProceduralGenerator):
+    """
+    Stand-in for AIManager that never touches the network.
+    Same interface, instant results. Used by the headless CLI, load tests and benchmarks.
+    Monsters and abilities come from the procedural generator; images are one shared file.
+    """
+    PLACEHOLDER_IMAGE = os.path.join(ASSETS_PATH, "offline_placeholder.png")
+
+    def generate_image(self, description, filename_prefix, is_monster=True):
+        # Every monster shares one image: no per-call disk writes
+        if not os.path.exists(self.PLACEHOLDER_IMAGE):
+            self._create_placeholder_image(self.PLACEHOLDER_IMAGE, description)
+        return self.PLACEHOLDER_IMAGE
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import random
+from src.asset_store import AssetStore
+from src.constants import TYPES
+
+# Local procedural generator with the AIManager interface: no network, thousands of
+# monsters per second. Used as the offline tier, as the fallback when Gemini fails or
+# the budget is spent (src/ai_budget.py), and as the first tier when AI_TIER=procedural.
+
+# Per type: name syllables, stat profile (hp, mp, attack, defense, speed weights),
+# palette (body, accent), material for the visual description, ability templates
+# (name, kind, power) where kind is one of attack / heavy / drain / heal / stun.
+TYPE_PROFILES = {
+    "Eau": (["Aqu", "Hydr", "Mar", "Ond", "Nau"], (1.2, 1.0, 0.9, 1.0, 0.9), ((50, 120, 220), (200, 230, 255)), "flowing water",
+            [("Jet d'Eau", "attack", 1.0), ("Hydrocanon", "heavy", 1.6), ("Vague Apaisante", "heal", 0.8), ("Siphon", "drain", 0.9)]),
+    "Feu": (["Pyr", "Flam", "Ign", "Braz", "Cendr"], (0.9, 1.0, 1.3, 0.8, 1.1), ((220, 70, 30), (255, 200, 60)), "living flames",
+            [("Braise", "attack", 1.0), ("Lance-Flammes", "heavy", 1.6), ("Nova Ardente", "heavy", 1.8), ("Fumée Aveuglante", "stun", 0.6)]),
+    "Electricité": (["Volt", "Élek", "Zap", "Ampé", "Fulg"], (0.8, 1.1, 1.1, 0.8, 1.4), ((240, 210, 40), (255, 255, 180)), "crackling lightning",
+                    [("Étincelle", "attack", 1.0), ("Tonnerre", "heavy", 1.6), ("Onde de Choc", "stun", 0.7), ("Surcharge", "drain", 0.9)]),
+    "Plante": (["Sylv", "Flor", "Ronc", "Herb", "Bourg"], (1.2, 1.0, 0.9, 1.1, 0.8), ((60, 170, 70), (190, 240, 120)), "leaves and vines",
+               [("Fouet Liane", "attack", 1.0), ("Tempête Florale", "heavy", 1.5), ("Photosynthèse", "heal", 1.0), ("Vampigraine", "drain", 0.8)]),
+    "Pierre": (["Roc", "Lith", "Gran", "Bas", "Quar"], (1.2, 0.7, 1.1, 1.5, 0.5), ((130, 110, 90), (200, 185, 160)), "cracked stone",
+               [("Jet de Pierres", "attack", 1.0), ("Éboulement", "heavy", 1.6), ("Mur de Roc", "stun", 0.6), ("Séisme", "heavy", 1.8)]),
+    "Espace": (["Cosm", "Astr", "Néb", "Orb", "Stell"], (1.0, 1.3, 1.0, 1.0, 1.0), ((40, 30, 90), (180, 140, 255)), "swirling stardust",
+               [("Poussière d'Étoile", "attack", 1.0), ("Trou Noir", "heavy", 1.7), ("Gravité", "stun", 0.7), ("Comète", "heavy", 1.5)]),
+    "Temps": (["Chron", "Tic", "Horl", "Éon", "Sabl"], (1.0, 1.3, 0.9, 1.0, 1.2), ((170, 150, 90), (240, 220, 160)), "clockwork and sand",
+              [("Seconde Volée", "attack", 1.0), ("Paradoxe", "stun", 0.8), ("Retour Arrière", "heal", 1.0), ("Fin des Temps", "heavy", 1.8)]),
+    "Lumière": (["Lum", "Sol", "Phot", "Aur", "Clar"], (1.0, 1.2, 1.0, 0.9, 1.1), ((250, 240, 190), (255, 255, 255)), "radiant light",
+                [("Rayon", "attack", 1.0), ("Éclat Solaire", "heavy", 1.6), ("Aveuglement", "stun", 0.6), ("Lueur Curative", "heal", 1.0)]),
+    "Ténèbre": (["Umbr", "Noct", "Somb", "Obsc", "Crép"], (1.0, 1.0, 1.2, 0.9, 1.1), ((50, 40, 60), (150, 60, 170)), "living shadow",
+                [("Morsure", "attack", 1.0), ("Éclipse", "heavy", 1.6), ("Vol d'Âme", "drain", 1.0), ("Cauchemar", "stun", 0.7)]),
+    "Psy": (["Psi", "Mném", "Ment", "Onir", "Kin"], (0.9, 1.4, 0.9, 0.9, 1.1), ((220, 90, 170), (255, 190, 230)), "psychic energy",
+            [("Choc Mental", "attack", 1.0), ("Psyko", "heavy", 1.6), ("Hypnose", "stun", 0.7), ("Méditation", "heal", 0.9)]),
+    "Fantome": (["Spect", "Ectop", "Larv", "Fant", "Brum"], (0.8, 1.2, 1.1, 0.8, 1.2), ((120, 100, 170), (210, 200, 255)), "translucent mist",
+                [("Léchouille", "attack", 1.0), ("Ball'Ombre", "heavy", 1.5), ("Malédiction", "drain", 1.0), ("Regard Glaçant", "stun", 0.7)]),
+    "Poison": (["Tox", "Vén", "Mias", "Acid", "Vir"], (1.0, 1.0, 1.0, 1.0, 1.0), ((130, 60, 170), (180, 240, 80)), "bubbling toxic ooze",
+               [("Dard Venin", "attack", 1.0), ("Bombe Beurk", "heavy", 1.5), ("Toxik", "drain", 1.0), ("Gaz Paralysant", "stun", 0.6)]),
+    "Metal": (["Ferr", "Chrom", "Acié", "Titan", "Cuiv"], (1.1, 0.8, 1.1, 1.5, 0.6), ((150, 160, 170), (220, 230, 240)), "polished steel",
+              [("Griffe Acier", "attack", 1.0), ("Tête de Fer", "heavy", 1.6), ("Magnétisme", "stun", 0.6), ("Réparation", "heal", 0.9)]),
+    "Monstre": (["Gron", "Crok", "Brut", "Drak", "Mâch"], (1.3, 0.8, 1.3, 1.0, 0.9), ((110, 70, 50), (230, 120, 60)), "scales and claws",
+                [("Coup de Griffe", "attack", 1.0), ("Rugissement", "stun", 0.6), ("Colère", "heavy", 1.7), ("Dévoreur", "drain", 1.0)]),
+    "Normal": (["Pik", "Ron", "Bal", "Tor", "Mim"], (1.1, 1.0, 1.0, 1.0, 1.0), ((200, 180, 150), (255, 240, 220)), "soft fur",
+               [("Charge", "attack", 1.0), ("Plaquage", "heavy", 1.5), ("Repos", "heal", 1.0), ("Grimace", "stun", 0.5)]),
+}
+
+MIDDLES = ["a", "o", "i", "u", "ra", "li", "mo", "ka", "zu", "ne", "ri", ""]
+SUFFIXES = ["mon", "ix", "or", "ath", "ion", "ak", "eon", "ul", "ys", "arde", "ine", "ok"]
+SIZES = ["tiny", "small", "sturdy", "lanky", "large", "colossal"]
+CREATURES = ["fox", "lizard", "beetle", "owl", "serpent", "golem", "cat", "jellyfish", "wolf", "toad", "moth", "crab"]
+STATS = ['hp_max', 'mp_max', 'attack', 'defense', 'speed']
+BASE_STATS = (50, 20, 11, 11, 11) # Level 1 averages, same scale as the AI prompt examples
+MODIFIERS = ["", "", " Ardente", " Suprême", " Rapide", " Sauvage"]
+
+
+def type_in(text):
+    """First game type named in text (e.g. 'starter pokemon type Feu'), or None."""
+    for t in TYPES:
+        if t.lower() in (text or "").lower():
+            return t
+    return None
+
+
+class ProceduralGenerator:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.store = AssetStore()
+
+    # Monsters
+
+    def make_name(self, type_1):
+        rng = self.rng
+        prefix = rng.choice(TYPE_PROFILES[type_1][0])
+        return (prefix + rng.choice(MIDDLES) + rng.choice(SUFFIXES)).capitalize()
+
+    def make_stats(self, type_1, level, power=1.0):
+        rng = self.rng
+        weights = TYPE_PROFILES[type_1][1]
+        scale = (1 + level / 10) * power
+        return {stat: max(1, int(base * weight * scale * rng.uniform(0.85, 1.15)))
+                for stat, base, weight in zip(STATS, BASE_STATS, weights)}
+
+    def generate_monster_stats(self, level=1, context="random", on_field=None):
+        rng = self.rng
+        type_1 = type_in(context) or rng.choice(TYPES)
+        type_2 = rng.choice([t for t in TYPES if t != type_1]) if rng.random() < 0.3 else None
+        is_mythical = "boss" in context or rng.random() < 0.01
+        power = 0.85 if "weak" in context else 1.0
+        if is_mythical:
+            power *= 1.5
+
+        stats = {
+            "name": self.make_name(type_1),
+            "is_mythical": is_mythical,
+            "type_1": type_1,
+            "type_2": type_2,
+            **self.make_stats(type_1, level, power),
+            "description": f"A {rng.choice(SIZES)} {rng.choice(CREATURES)} made of {TYPE_PROFILES[type_1][3]}"
+                           + (f" with hints of {TYPE_PROFILES[type_2][3]}" if type_2 else "") + ", cute pixel art.",
+        }
+        if on_field:
+            for key, value in stats.items():
+                on_field(key, value)
+        return stats
+
+    def evolve_monster_stats(self, current_stats, evolution_stage):
+        # Same ranges as the AI prompt: +5-15% then +10-25%
+        rng = self.rng
+        low, high = (1.05, 1.15) if evolution_stage == 0 else (1.10, 1.25)
+        new_stats = {k: int((current_stats.get(k) or 10) * rng.uniform(low, high)) for k in STATS}
+        name = current_stats.get('name') or "Mon"
+        type_1 = current_stats.get('type_1') if current_stats.get('type_1') in TYPE_PROFILES else "Normal"
+        new_stats['name'] = name[:4] + rng.choice(SUFFIXES) if evolution_stage == 0 else f"Méga-{name}"
+        new_stats['description'] = f"An imposing evolved form made of {TYPE_PROFILES[type_1][3]}, cute pixel art."
+        return new_stats
+
+    # Abilities
+
+    def make_ability(self, monster_type, template, level=10):
+        name, kind, power = template
+        rng = self.rng
+        damage = int(rng.randint(25, 45) * power) if kind in ("attack", "heavy", "drain", "stun") else 0
+        return {
+            "name": name + rng.choice(MODIFIERS),
+            "description": f"Capacité {monster_type.lower()} ({kind}).",
+            "type": monster_type,
+            "damage": damage,
+            "heal": int(rng.randint(20, 35) * power) if kind == "heal" else 0,
+            "cost_mp": int(3 + damage / 10 + (8 if kind in ("heal", "stun") else 0)),
+            "cost_hp": 0,
+            "cooldown_local": 2 if kind in ("heavy", "stun", "heal") else 0,
+            "cooldown_global": 0,
+            "stun_duration": 1 if kind == "stun" else 0,
+            "drain_percent": rng.choice([25, 50]) if kind == "drain" else 0,
+            "is_legendary": power >= 1.8 and rng.random() < 0.1,
+            "visual_description": f"{name} attack made of {TYPE_PROFILES[monster_type][3]}",
+        }
+
+    def generate_abilities(self, monster_type, count=5):
+        if monster_type not in TYPE_PROFILES:
+            monster_type = "Normal"
+        templates = TYPE_PROFILES[monster_type][4] + TYPE_PROFILES["Normal"][4][:2]
+        picked = self.rng.sample(templates, min(count, len(templates)))
+        return [self.make_ability(monster_type, t) for t in picked]
+
+    # Images
+
+    def generate_image(self, description, filename_prefix, is_monster=True):
+        # Same description, same drawing: the store keeps a single file for it
+        return self.store.put_image(self.draw_creature(description))
+
+    def _create_placeholder_image(self, path, description):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.draw_creature(description).save(path)
+
+    def draw_creature(self, description):
+        """Procedural creature: body, belly, eyes and type-coloured appendages, seeded by description."""
+        from PIL import Image, ImageDraw
+        rng = random.Random(hashlib.sha256((description or "").encode()).digest())
+        type_1 = type_in(description) or next((t for t, p in TYPE_PROFILES.items() if p[3] in (description or "")),
+                                              rng.choice(TYPES))
+        body, accent = TYPE_PROFILES[type_1][2]
+        outline = tuple(max(0, c - 70) for c in body)
+
+        img = Image.new('RGBA', (256, 256), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        w, h = rng.randint(110, 170), rng.randint(100, 160)
+        cx, cy = 128, 140
+        box = [cx - w // 2, cy - h // 2, cx + w // 2, cy + h // 2]
+
+        # Appendages behind the body: spikes, ears or fins
+        for side in (-1, 1):
+            x = cx + side * w // 3
+            top = cy - h // 2
+            draw.polygon([(x - 18, top + 20), (x + 18, top + 20), (x + side * rng.randint(0, 25), top - rng.randint(25, 55))],
+                         fill=accent, outline=outline)
+        for _ in range(rng.randint(0, 3)):
+            angle_x = rng.choice([-1, 1]) * (w // 2 + rng.randint(5, 25))
+            y = cy + rng.randint(-h // 4, h // 3)
+            draw.ellipse([cx + angle_x - 14, y - 10, cx + angle_x + 14, y + 10], fill=accent, outline=outline)
+
+        draw.ellipse(box, fill=body, outline=outline, width=4)
+        draw.ellipse([cx - w // 4, cy - h // 8, cx + w // 4, cy + h // 2 - 8], fill=accent)
+
+        # Eyes and mouth
+        eye_y = cy - h // 5
+        eye_gap = rng.randint(18, 32)
+        eye_r = rng.randint(9, 16)
+        for side in (-1, 1):
+            ex = cx + side * eye_gap
+            draw.ellipse([ex - eye_r, eye_y - eye_r, ex + eye_r, eye_y + eye_r], fill=(255, 255, 255, 255), outline=outline)
+            draw.ellipse([ex - eye_r // 2, eye_y - eye_r // 2, ex + eye_r // 2, eye_y + eye_r // 2], fill=(20, 20, 20, 255))
+        draw.arc([cx - 14, eye_y + 10, cx + 14, eye_y + 28], 20, 160, fill=outline, width=3)
+        return img
@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from src.config import SLOW_QUERY_MS, SLOW_QUERY_LOG, N_PLUS_ONE_THRESHOLD, QUERY_PROFILER_PROGRESS_OPS
+from src.metrics import metrics
+
+# Opt-in SQL profiler (MOS_PROFILE_SQL=1 or `python -m src --profile-sql ...`).
+#
+# Built on the two sqlite3 hooks, so every statement is seen (including the implicit
+# BEGIN/COMMIT and the ones run by executescript):
+#   - the trace callback fires when a statement starts;
+#   - the progress handler fires every QUERY_PROFILER_PROGRESS_OPS VM instructions while it runs.
+# A statement's duration is the time from its start to its last progress tick, so it
+# counts SQLite work (including fetching rows) but not Python time between statements.
+# Statements shorter than one tick report ~0 ms: they are not the ones we are after.
+#
+# Statements are attributed to the root metrics span active when they run (a UI action,
+# a service op...). The same statement running N_PLUS_ONE_THRESHOLD times or more in one
+# action is reported as an N+1 pattern.
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\bX'[0-9A-Fa-f]*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Replaces literals with ? so one statement with different values groups together."""
+    return _SPACES.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+def _root_span():
+    span = metrics.current_span()
+    while span is not None and span.parent is not None:
+        span = span.parent
+    return span
+
+
+class StatementStats:
+    __slots__ = ('count', 'total_ms', 'max_ms', 'vm_steps')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.vm_steps = 0
+
+
+class QueryProfiler:
+    def __init__(self, slow_ms=SLOW_QUERY_MS, log_path=SLOW_QUERY_LOG,
+                 n_plus_one=N_PLUS_ONE_THRESHOLD, progress_ops=QUERY_PROFILER_PROGRESS_OPS):
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.n_plus_one = n_plus_one
+        self.progress_ops = progress_ops
+        self.lock = threading.Lock()
+        self.stats = {} # Normalized SQL -> StatementStats
+        self.slow_queries = [] # Dicts, also appended to log_path
+        self.n_plus_one_patterns = {} # (action, normalized SQL) -> {'invocations', 'max_per_action'}
+        self.plans = {} # Normalized SQL -> EXPLAIN QUERY PLAN rows
+        self.conn = None
+        self.db_path = None
+        self._plan_conn = None
+        self._current = None # [sql, start, last_tick, ticks, root span]
+        self._action = None # Root span of the action being counted
+        self._action_counts = Counter()
+
+    def attach(self, conn):
+        """Starts profiling conn (one connection per profiler)."""
+        # Plans are read through a second connection: the profiled one cannot be used from its own callbacks
+        for _, name, path in conn.execute("PRAGMA database_list"):
+            if name == "main":
+                self.db_path = path or None # "" for in-memory databases
+        self.conn = conn
+        conn.set_trace_callback(self._on_statement)
+        conn.set_progress_handler(self._on_progress, self.progress_ops)
+        return self
+
+    def detach(self):
+        if self.conn is None:
+            return
+        self.conn.set_trace_callback(None)
+        self.conn.set_progress_handler(None, 0)
+        self.flush()
+        if self._plan_conn:
+            self._plan_conn.close()
+            self._plan_conn = None
+        self.conn = None
+
+    # sqlite3 callbacks (must stay cheap and never touch self.conn)
+
+    def _on_statement(self, sql):
+        now = time.perf_counter()
+        with self.lock:
+            self._close_current()
+            self._current = [sql, now, now, 0, _root_span()]
+
+    def _on_progress(self):
+        current = self._current
+        if current is not None:
+            current[2] = time.perf_counter()
+            current[3] += 1
+        return 0 # Non-zero would abort the statement
+
+    # Bookkeeping
+
+    def _close_current(self):
+        if self._current is None:
+            return
+        sql, start, last_tick, ticks, root = self._current
+        self._current = None
+        duration_ms = (last_tick - start) * 1000
+        key = normalize_sql(sql)
+
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = StatementStats()
+        stats.count += 1
+        stats.total_ms += duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        stats.vm_steps += ticks * self.progress_ops
+
+        if root is not self._action:
+            self._close_action()
+            self._action = root
+        if root is not None:
+            self._action_counts[key] += 1
+
+        if duration_ms >= self.slow_ms:
+            self._log_slow(sql, key, duration_ms, root)
+
+    def _close_action(self):
+        if self._action is not None:
+            for key, count in self._action_counts.items():
+                if count >= self.n_plus_one:
+                    pattern = self.n_plus_one_patterns.setdefault(
+                        (self._action.name, key), {'invocations': 0, 'max_per_action': 0})
+                    pattern['invocations'] += 1
+                    pattern['max_per_action'] = max(pattern['max_per_action'], count)
+        self._action = None
+        self._action_counts.clear()
+
+    def flush(self):
+        """Closes the pending statement and action (call before reading the results)."""
+        with self.lock:
+            self._close_current()
+            self._close_action()
+
+    # Slow queries
+
+    def explain(self, sql):
+        """EXPLAIN QUERY PLAN rows for sql, or None (in-memory DB, DDL, unparsable...)."""
+        key = normalize_sql(sql)
+        if key in self.plans:
+            return self.plans[key]
+        plan = None
+        if self.db_path and sql.lstrip().split(" ", 1)[0].upper() in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+            try:
+                if self._plan_conn is None:
+                    self._plan_conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+                plan = [row[3] for row in self._plan_conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            except sqlite3.Error as e:
+                print(f"Query plan unavailable: {e}")
+        self.plans[key] = plan
+        return plan
+
+    def _log_slow(self, sql, key, duration_ms, root):
+        entry = {
+            'ts': time.time(),
+            'duration_ms': round(duration_ms, 3),
+            'action': root.name if root else None,
+            'sql': key,
+            'plan': self.explain(sql),
+        }
+        self.slow_queries.append(entry)
+        metrics.count("sql.slow_queries")
+        if self.log_path:
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Error writing slow query log: {e}")
+
+    # Reporting
+
+    def report(self, top=15):
+        self.flush()
+        with self.lock:
+            statements = sorted(self.stats.items(), key=lambda item: item[1].total_ms, reverse=True)
+            return {
+                'statements': [{
+                    'sql': sql,
+                    'count': s.count,
+                    'total_ms': round(s.total_ms, 3),
+                    'mean_ms': round(s.total_ms / s.count, 3),
+                    'max_ms': round(s.max_ms, 3),
+                    'vm_steps': s.vm_steps,
+                } for sql, s in statements[:top]],
+                'slow_queries': list(self.slow_queries),
+                'n_plus_one': [dict(action=action, sql=sql, **p)
+                               for (action, sql), p in sorted(self.n_plus_one_patterns.items())],
+            }
+
+    def format_report(self, top=15):
+        data = self.report(top)
+        lines = [f"{'count':>7}{'total ms':>11}{'mean ms':>10}{'max ms':>10}  statement"]
+        for s in data['statements']:
+            lines.append(f"{s['count']:>7}{s['total_ms']:>11.2f}{s['mean_ms']:>10.3f}{s['max_ms']:>10.2f}  {s['sql'][:100]}")
+        if data['slow_queries']:
+            lines.append(f"{len(data['slow_queries'])} slow queries (>= {self.slow_ms} ms), see {self.log_path}")
+        for p in data['n_plus_one']:
+            lines.append(f"N+1 in {p['action']}: up to {p['max_per_action']}x per call "
+                         f"({p['invocations']} calls) -> {p['sql'][:100]}")
+        return "\n".join(lines)
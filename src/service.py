@@ -0,0 +1,176 @@
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from src.constants import SHOP_ITEMS
+from src.game_engine import CombatSystem, RecruitmentSystem, ExchangeSystem
+from src.metrics import metrics
+
+# Headless front-end for GameEngine. Imports no Qt module.
+
+
+def monster_summary(monster):
+    data = monster.to_dict()
+    data['id'] = monster.id
+    data['abilities'] = [a.name for a in monster.abilities]
+    return data
+
+
+class GameService:
+    """
+    Dispatches JSON requests ({"op": "...", ...}) to the engine.
+    Every reply is a dict with "ok" and either the result fields or "error".
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.recruitment = RecruitmentSystem(engine)
+        self.last_combat = None # Capture needs the last won fight
+
+    def handle(self, request):
+        op = request.get('op')
+        handler = getattr(self, f"op_{op}", None) if isinstance(op, str) else None
+        if handler is None:
+            return {"ok": False, "error": f"Unknown op: {op}"}
+        try:
+            with metrics.span(f"service.{op}"):
+                return handler(request)
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def op_state(self, request):
+        return {
+            "ok": True,
+            "money": self.engine.get_player_money(),
+            "inventory": self.engine.get_inventory(),
+            "monsters": [monster_summary(m) for m in self.engine.get_all_monsters()],
+        }
+
+    def op_usage(self, request):
+        scheduler = getattr(self.engine.ai, "scheduler", None)
+        if scheduler is None:
+            return {"ok": True, "metered": False} # Offline AI: nothing is billed
+        return {"ok": True, "metered": True, "today": scheduler.status(),
+                "by_method": scheduler.ledger.by_method()}
+
+    def op_recruit(self, request):
+        count = request.get('count', 1)
+        if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+            return {"ok": False, "error": "count doit être un entier positif."}
+        if count > 1:
+            monsters, msg = self.recruitment.draft_monsters(count)
+            if not monsters:
+                return {"ok": False, "error": msg}
+            return {"ok": True, "monsters": [monster_summary(m) for m in monsters],
+                    "money": self.engine.get_player_money()}
+        monster, msg = self.recruitment.draft_monster()
+        if not monster:
+            return {"ok": False, "error": msg}
+        return {"ok": True, "monster": monster_summary(monster)}
+
+    def op_fight(self, request):
+        team = self.engine.get_player_team()
+        if not team:
+            return {"ok": False, "error": "Aucun monstre dans l'équipe."}
+        combat = CombatSystem(team, self.engine)
+        combat.generate_enemy()
+        result = combat.auto_battle()
+        self.last_combat = combat if result['won'] else None
+
+        reply = {"ok": True, "won": result['won'], "enemy": monster_summary(combat.enemy), "log": result['log']}
+        if result['won']:
+            reply['xp'] = result['xp']
+            reply['leveled_up'] = result['leveled_up']
+        return reply
+
+    def op_capture(self, request):
+        if not self.last_combat:
+            return {"ok": False, "error": "Aucun ennemi vaincu à capturer."}
+        if self.engine.get_inventory().get("ball", 0) <= 0:
+            return {"ok": False, "error": "Vous avez besoin d'une 'ball' (à acheter en boutique)."}
+        captured, msg = self.last_combat.capture()
+        self.last_combat = None # One attempt per defeated enemy
+        return {"ok": True, "captured": captured, "message": msg}
+
+    def op_evolve(self, request):
+        monster = self.engine.get_monster(request.get('uuid'))
+        if not monster:
+            return {"ok": False, "error": "Monstre introuvable."}
+        success, msg = self.engine.evolve_monster(monster)
+        if not success:
+            return {"ok": False, "error": msg}
+        return {"ok": True, "monster": monster_summary(monster)}
+
+    def op_evolve_all(self, request):
+        return {"ok": True, "monsters": [monster_summary(m) for m in self.engine.evolve_all()]}
+
+    def op_buy(self, request):
+        item = request.get('item')
+        if item not in SHOP_ITEMS:
+            return {"ok": False, "error": f"Objet inconnu: {item}"}
+        if not self.engine.buy_item(item, SHOP_ITEMS[item][1]):
+            return {"ok": False, "error": "Pas assez d'argent !"}
+        return {"ok": True, "money": self.engine.get_player_money(), "inventory": self.engine.get_inventory()}
+
+    def op_export(self, request):
+        monster = self.engine.get_monster(request.get('uuid'))
+        if not monster:
+            return {"ok": False, "error": "Monstre introuvable."}
+        return {"ok": True, "code": ExchangeSystem.generate_code(monster)}
+
+    def op_import(self, request):
+        monster = self.engine.import_monster(request.get('code', ''))
+        if not monster:
+            return {"ok": False, "error": "Code invalide, corrompu ou déjà utilisé."}
+        return {"ok": True, "monster": monster_summary(monster)}
+
+
+def serve_stdin(service, stdin, stdout):
+    """
+    JSON-lines mode: one request per input line, one reply per output line.
+    """
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            reply = service.handle(request) if isinstance(request, dict) else {"ok": False, "error": "Expected an object"}
+        except ValueError:
+            reply = {"ok": False, "error": "Invalid JSON"}
+        stdout.write(json.dumps(reply, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+
+def make_http_server(service, host="127.0.0.1", port=8080):
+    """
+    POST /<op> with a JSON body (or GET /state). Single-threaded on purpose:
+    the engine's SQLite connection belongs to one thread.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, reply):
+            body = json.dumps(reply, ensure_ascii=False).encode()
+            self.send_response(200 if reply.get('ok') else 400)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            # Read-only: anything that changes the save must be a POST
+            if self.path.strip("/") != "state":
+                return self._reply({"ok": False, "error": "Use POST"})
+            self._reply(service.handle({"op": "state"}))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._reply({"ok": False, "error": "Invalid JSON"})
+            if not isinstance(request, dict):
+                return self._reply({"ok": False, "error": "Expected an object"})
+            request['op'] = self.path.strip("/")
+            self._reply(service.handle(request))
+
+        def log_message(self, format, *args):
+            pass # Keep stdout clean for batch jobs
+
+    return HTTPServer((host, port), Handler)
@@ -0,0 +1,68 @@
+import json
+
+# Incremental parser for a streamed JSON object ({"name": ..., "hp_max": ...}).
+#
+#   parser = IncrementalJSONObject()
+#   for chunk in stream:
+#       for key, value in parser.feed(chunk):
+#           ...                                   # each top-level field, as soon as it is complete
+#
+# Only the top level is split: a nested value (list, object) is surfaced once it is closed.
+# Text before the opening brace (e.g. a ```json fence) and after the closing one is ignored.
+
+
+class IncrementalJSONObject:
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self.done = False # Closing brace seen
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._field_start = None # Start of the current top-level "key": value
+
+    def feed(self, chunk):
+        """Adds chunk; returns the (key, value) pairs completed by it."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        i = self._pos
+        while i < len(text) and not self.done:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif self._field_start is None:
+                if c == "{":
+                    self._depth = 1
+                    self._field_start = i + 1
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed += self._complete(text[self._field_start:i])
+                    self.done = True
+            elif c == "," and self._depth == 1:
+                completed += self._complete(text[self._field_start:i])
+                self._field_start = i + 1
+            i += 1
+        self._pos = i
+        return completed
+
+    def _complete(self, segment):
+        if not segment.strip():
+            return []
+        try:
+            pair = json.loads("{" + segment + "}")
+        except ValueError:
+            return [] # Malformed field: left to the final json.loads of the whole text
+        self.fields.update(pair)
+        return list(pair.items())
@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from src.config import STALL_THRESHOLD_MS, STALL_LOG
+from src.metrics import metrics
+
+# Event loop stall watchdog. Imports no Qt module: the GUI calls tick() from a QTimer
+# on the main thread (see install_qt), a background thread checks the ticks keep coming.
+#
+# While the loop is stalled, the main thread stack is sampled every poll; when it ticks
+# again the stall is logged (JSON lines in STALL_LOG) with its duration, the first stack
+# and the culprit: the project frame seen most often on top of those samples.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def project_frame(stack):
+    """Innermost frame of stack (traceback.FrameSummary list) that belongs to this project."""
+    for frame in reversed(stack):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(PROJECT_ROOT) and os.sep + "site-packages" + os.sep not in path:
+            return f"{os.path.relpath(path, PROJECT_ROOT)}:{frame.lineno} {frame.name}"
+    return f"{stack[-1].filename}:{stack[-1].lineno} {stack[-1].name}" if stack else "?"
+
+
+class StallWatchdog:
+    def __init__(self, threshold_ms=STALL_THRESHOLD_MS, log_path=STALL_LOG, poll_ms=None,
+                 thread_id=None, on_stall=None):
+        self.threshold = threshold_ms / 1000
+        self.poll = (poll_ms or max(10, threshold_ms / 4)) / 1000
+        self.log_path = log_path
+        self.thread_id = thread_id or threading.main_thread().ident # Thread running the event loop
+        self.on_stall = on_stall # Called with each stall record (from the watchdog thread)
+        self.last_tick = time.perf_counter()
+        self.stalls = []
+        self._samples = None # Culprit counter while a stall is in progress
+        self._first_stack = None
+        self._stall_start = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def tick(self):
+        """Called from the event loop: proves it is still turning."""
+        self.last_tick = time.perf_counter()
+
+    def start(self):
+        if self._thread is None:
+            self.last_tick = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll):
+            self.check()
+
+    def check(self):
+        last_tick = self.last_tick
+        idle = time.perf_counter() - last_tick
+        if idle >= self.threshold:
+            self._sample()
+            self._stall_start = last_tick
+        elif self._samples is not None:
+            # Ticked again: the stall lasted from the last tick before it to the first one after
+            self._finish(last_tick - self._stall_start)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        if self._samples is None:
+            self._samples = Counter()
+            self._first_stack = stack
+        self._samples[project_frame(stack)] += 1
+
+    def _finish(self, duration):
+        samples, stack = self._samples, self._first_stack
+        self._samples = self._first_stack = None
+        record = {
+            'ts': time.time(),
+            'duration_ms': round(duration * 1000, 1),
+            'culprit': samples.most_common(1)[0][0],
+            'samples': dict(samples),
+            'stack': traceback.format_list(stack),
+        }
+        self.stalls.append(record)
+        metrics.observe("ui.stall", record['duration_ms'])
+        print(f"Event loop stalled {record['duration_ms']:.0f} ms in {record['culprit']}")
+        if self.log_path:
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Error writing stall log: {e}")
+        if self.on_stall:
+            self.on_stall(record)
+
+
+def install_qt(app, **options):
+    """Starts a watchdog fed by a QTimer on app's event loop. Returns it (or None if disabled)."""
+    from PyQt6.QtCore import QTimer
+    watchdog = StallWatchdog(**options)
+    if watchdog.threshold <= 0:
+        return None
+    timer = QTimer(app)
+    timer.timeout.connect(watchdog.tick)
+    timer.start(max(10, int(watchdog.threshold * 1000 / 5)))
+    watchdog.timer = timer # Keep it alive with the watchdog
+    app.aboutToQuit.connect(watchdog.stop)
+    return watchdog.start()
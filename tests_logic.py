@@ -59,5 +59,176 @@ class TestGameLogic(unittest.TestCase):
 
         self.assertIsNone(ExchangeSystem.load_code(tampered_code))
 
+    def test_exchange_replay(self):
+        m = Monster({"name": "TradeMon", "hp_max": 50})
+        code = ExchangeSystem.generate_code(m)
+
+        self.assertIsNotNone(ExchangeSystem.load_code(code, ledger=self.engine.ledger))
+        # Same code a second time is refused
+        self.assertIsNone(ExchangeSystem.load_code(code, ledger=self.engine.ledger))
+
+        # Survives a restart (fresh ledger rebuilt from the DB)
+        from src.ledger import CodeLedger
+        fresh = CodeLedger(self.engine.db_conn)
+        self.assertIsNone(ExchangeSystem.load_code(code, ledger=fresh))
+
+    def test_import_is_atomic(self):
+        code = ExchangeSystem.generate_code(Monster({"name": "TradeMon", "hp_max": 50}))
+
+        def broken_save(monster, commit=True):
+            raise RuntimeError("disk full")
+
+        save = self.engine.save_monster
+        self.engine.save_monster = broken_save
+        with self.assertRaises(RuntimeError):
+            self.engine.import_monster(code)
+        self.engine.save_monster = save
+        # The failed import did not burn the code
+        self.assertEqual(self.engine.import_monster(code).name, "TradeMon")
+        self.assertIsNone(self.engine.import_monster(code))
+
+    def test_bloom_filter(self):
+        from src.ledger import BloomFilter
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        added = [f"code-{i}".encode() for i in range(1000)]
+        for d in added:
+            bloom.add(d)
+        # No false negatives
+        self.assertTrue(all(bloom.might_contain(d) for d in added))
+        false_pos = sum(bloom.might_contain(f"other-{i}".encode()) for i in range(1000))
+        self.assertLess(false_pos, 50)
+
+    def test_streamed_stats(self):
+        from types import SimpleNamespace
+        from src.ai_manager import AIManager
+        text = ('```json\n{"name": "Pyro, le \\"Grand\\"", "type_1": "fire", "type_2": null, "hp_max": "60", '
+                '"mp_max": 20, "attack": 12.5, "defense": 9, "speed": 12, "description": "Un renard [en feu]"}\n```')
+        chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+
+        class FakeModel:
+            def generate_content(self, prompt, generation_config=None, stream=False):
+                return [SimpleNamespace(text=c) for c in chunks]
+
+        ai = AIManager()
+        ai._model_text = FakeModel()
+        seen = []
+        stats = ai.generate_monster_stats(level=3, on_field=lambda k, v: seen.append((k, v)))
+        self.assertEqual(stats['name'], 'Pyro, le "Grand"')
+        self.assertEqual(stats['type_1'], "Feu")
+        self.assertEqual(seen[1], ("type_1", "Feu"))
+        self.assertEqual(dict(seen)['hp_max'], 60) # Coerced before it is shown
+        self.assertEqual(dict(seen)['attack'], 12)
+        self.assertEqual([k for k, _ in seen], [k for k in stats if k != 'is_mythical'])
+
+        # A failing display callback does not throw the answer away (no procedural fallback)
+        def broken(key, value):
+            raise TypeError("widget gone")
+        self.assertEqual(ai.generate_monster_stats(level=3, on_field=broken)['name'], 'Pyro, le "Grand"')
+
+    def test_ai_json_repair(self):
+        from types import SimpleNamespace
+        from src.ai_manager import AIManager
+        from src.ai_schema import extract_json, validate_monster_stats
+        self.assertEqual(extract_json('Voici: {"a": [1, 2,],} merci', dict), {"a": [1, 2]})
+        stats, problems = validate_monster_stats({"name": "X", "type_1": "Électricité", "type_2": "none",
+                                                  "hp_max": "45 PV", "mp_max": 10.7, "attack": 99999,
+                                                  "defense": 5, "speed": 5})
+        self.assertEqual(problems, [])
+        self.assertEqual((stats['type_1'], stats['type_2'], stats['hp_max'], stats['mp_max'], stats['attack']),
+                         ("Electricité", None, 45, 10, 1000))
+
+        # First answer has an unknown type: the model is asked to fix it once
+        answers = ['{"name": "Bug", "type_1": "Banane", "hp_max": 5, "mp_max": 5, "attack": 5, "defense": 5, "speed": 5}',
+                   '{"name": "Bug", "type_1": "Plante", "hp_max": 5, "mp_max": 5, "attack": 5, "defense": 5, "speed": 5}']
+        prompts = []
+
+        class FakeModel:
+            def generate_content(self, prompt, generation_config=None, stream=False):
+                prompts.append(prompt)
+                self.config = generation_config
+                return SimpleNamespace(text=answers[len(prompts) - 1])
+
+        ai = AIManager()
+        ai._model_text = FakeModel()
+        stats = ai.generate_monster_stats(level=3)
+        self.assertEqual(stats['type_1'], "Plante")
+        self.assertEqual(len(prompts), 2)
+        self.assertIn("Banane", prompts[1])
+        self.assertEqual(ai._model_text.config['response_mime_type'], "application/json")
+
+    def test_ai_budget(self):
+        from types import SimpleNamespace
+        from src.ai_budget import BudgetedAI, BudgetScheduler, NORMAL, ECONOMY, EXHAUSTED
+        from src.ai_manager import AIManager
+        from src.offline_ai import OfflineAIManager
+
+        answer = '{"name": "Real", "type_1": "Eau", "hp_max": 5, "mp_max": 5, "attack": 5, "defense": 5, "speed": 5}'
+
+        class FakeModel:
+            def generate_content(self, prompt, generation_config=None, stream=False):
+                usage = SimpleNamespace(prompt_token_count=300, candidates_token_count=100)
+                return SimpleNamespace(text=answer, usage_metadata=usage)
+
+        real = AIManager()
+        real._model_text = FakeModel()
+        ai = BudgetedAI(real, self.engine.db_conn, fallback=OfflineAIManager(seed=1))
+        ai.scheduler = BudgetScheduler(ai.usage, token_budget=1000, image_budget=0, economy_at=0.5)
+        # The ledger never commits (nor reads through) the engine's connection
+        self.assertIsNot(ai.usage._conn(), self.engine.db_conn)
+        money = self.engine.get_player_money()
+        self.engine.update_player_money(500, commit=False)
+        self.assertEqual(ai.usage.totals()['calls'], 0)
+        self.engine.db_conn.rollback()
+        self.assertEqual(self.engine.get_player_money(), money)
+
+        self.assertEqual(ai.generate_monster_stats(level=2)['name'], "Real")
+        self.assertEqual(ai.usage.totals()['tokens'], 400)
+        self.assertEqual(ai.scheduler.mode(), NORMAL)
+        self.assertTrue(ai.can_prefetch())
+
+        ai.generate_monster_stats(level=2)
+        self.assertEqual(ai.scheduler.mode(), ECONOMY)
+        self.assertFalse(ai.can_prefetch())
+        # Economy: abilities already in the save are reused
+        self.engine.db_conn.execute("INSERT INTO abilities (name, type, damage) VALUES ('Vague', 'Eau', 30)")
+        self.engine.db_conn.commit()
+        self.assertEqual([a['name'] for a in ai.generate_abilities("Eau", count=1)], ["Vague"])
+
+        ai.generate_monster_stats(level=2)
+        self.assertEqual(ai.scheduler.mode(), EXHAUSTED)
+        # Past the budget the procedural generator answers, and nothing more is billed
+        self.assertNotEqual(ai.generate_monster_stats(level=2)['name'], "Real")
+        self.assertEqual(ai.usage.totals()['calls'], 3)
+        self.assertEqual(ai.usage.by_method()['generate_monster_stats']['tokens'], 1200)
+        conn = ai.usage._conn()
+        ai.usage.close()
+        with self.assertRaises(sqlite3.ProgrammingError): # Closed
+            conn.execute("SELECT 1")
+        self.assertEqual(ai.usage.totals()['calls'], 3) # Reopened on demand
+
+    def test_procedural_generator(self):
+        import tempfile, time
+        from src.procedural import ProceduralGenerator
+        from src.ai_schema import validate_monster_stats, validate_abilities
+        gen = ProceduralGenerator(seed=7)
+
+        start = time.perf_counter()
+        monsters = [gen.generate_monster_stats(level=40) for _ in range(1000)]
+        abilities = [gen.generate_abilities(m['type_1'], count=4) for m in monsters]
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+        for stats, moves in zip(monsters[:50], abilities[:50]):
+            self.assertEqual(validate_monster_stats(stats)[1], [])
+            self.assertEqual(validate_abilities(moves)[1], [])
+            self.assertTrue(all(m['type'] == stats['type_1'] for m in moves))
+        # Stats grow with level; a type named in the context is respected
+        self.assertGreater(gen.generate_monster_stats(level=80)['hp_max'], gen.generate_monster_stats(level=1)['hp_max'])
+        self.assertEqual(gen.generate_monster_stats(context="starter pokemon type Psy")['type_1'], "Psy")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "art.png")
+            gen._create_placeholder_image(path, monsters[0]['description'])
+            self.assertTrue(os.path.getsize(path) > 0)
+
 if __name__ == '__main__':
     unittest.main()
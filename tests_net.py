@@ -0,0 +1,256 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from src.game_engine import ExchangeSystem
+from src.models import Monster
+from src.net.trade_server import TradeServer
+from src.net.trade_client import TradeClient, run_load_test
+from src.net.battle_server import BattleServer
+from src.net.battle_bot import BattleBot, run_bots
+from src.net.http_pool import download, DownloadError, close_session
+
+
+class TestTradeServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "trade.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_with_server(self, scenario):
+        async def run():
+            server = await TradeServer("127.0.0.1", 0, self.db_path).start()
+            try:
+                return await scenario(server)
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_offer_and_claim_once(self):
+        code = ExchangeSystem.generate_code(Monster({"name": "TradeMon", "hp_max": 50}))
+
+        async def scenario(server):
+            alice = await TradeClient("127.0.0.1", server.port).connect()
+            bob = await TradeClient("127.0.0.1", server.port).connect()
+
+            offer = await alice.offer(code)
+            self.assertTrue(offer['ok'])
+            listing = await bob.list_offers()
+            self.assertEqual(listing['offers'][0]['name'], "TradeMon")
+
+            # Owner cannot claim its own offer
+            self.assertFalse((await alice.claim(offer['offer_id']))['ok'])
+
+            claim = await bob.claim(offer['offer_id'])
+            self.assertTrue(claim['ok'])
+            self.assertEqual(claim['code'], code)
+            event = await asyncio.wait_for(alice.events.get(), 1)
+            self.assertEqual(event, {"event": "claimed", "offer_id": offer['offer_id']})
+
+            # Redeemed: cannot be offered again
+            self.assertEqual((await alice.offer(code))['error'], "Code already used")
+
+            bad = await alice.offer("not a code")
+            self.assertFalse(bad['ok'])
+
+            await alice.close()
+            await bob.close()
+
+        self.run_with_server(scenario)
+
+    def test_client_fails_pending_requests(self):
+        async def scenario(server):
+            async def handle(reader, writer):
+                await reader.readline()
+                writer.write(b"not json\n") # ProtocolError in the client's reader
+                await writer.drain()
+
+            bad = await asyncio.start_server(handle, "127.0.0.1", 0)
+            client = await TradeClient("127.0.0.1", bad.sockets[0].getsockname()[1]).connect()
+            with self.assertRaises(ConnectionError):
+                await asyncio.wait_for(client.list_offers(), 2)
+            with self.assertRaises(ConnectionError): # Reader gone: fails at once
+                await asyncio.wait_for(client.list_offers(), 2)
+            await client.close()
+            bad.close()
+            await bad.wait_closed()
+
+        self.run_with_server(scenario)
+
+    def test_load_client(self):
+        async def scenario(server):
+            return await run_load_test("127.0.0.1", server.port, clients=50)
+
+        stats = self.run_with_server(scenario)
+        self.assertEqual(stats['errors'], 0)
+
+
+class TestBattleServer(unittest.TestCase):
+    def run_with_server(self, scenario):
+        async def run():
+            server = await BattleServer("127.0.0.1", 0).start()
+            try:
+                return await scenario(server)
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_bots_play_full_matches(self):
+        async def scenario(server):
+            bots = [BattleBot("127.0.0.1", server.port) for _ in range(20)]
+            results = await asyncio.wait_for(asyncio.gather(*[b.play() for b in bots]), 30)
+            return results, server.finished_matches
+
+        results, finished = self.run_with_server(scenario)
+        self.assertEqual(results.count('win'), 10)
+        self.assertEqual(results.count('loss'), 10)
+        self.assertEqual(finished, 10)
+
+    def test_rejects_forged_team(self):
+        async def scenario(server):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            from src.net.protocol import read_message, send_message
+            await send_message(writer, {"op": "join", "team": ["forged"]})
+            reply = await read_message(reader)
+            writer.close()
+            await writer.wait_closed()
+            # Let the server handler see EOF before shutting down
+            await asyncio.sleep(0.05)
+            return reply
+
+        reply = self.run_with_server(scenario)
+        self.assertFalse(reply['ok'])
+
+    def test_rejects_junk_abilities_and_aborts_broken_matches(self):
+        from unittest import mock
+        from src.models import Ability
+        from src.net.protocol import read_message, send_message
+
+        def code(damage=40):
+            m = Monster({"name": "PvPMon", "hp_max": 50, "attack": 10, "defense": 10, "speed": 5})
+            m.abilities = [Ability({"name": "Coup", "type": "Normal", "damage": damage})]
+            return ExchangeSystem.generate_code(m)
+
+        async def join(server, team):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            await send_message(writer, {"op": "join", "team": team})
+            return reader, writer, await read_message(reader)
+
+        async def scenario(server):
+            _, writer, reply = await join(server, [code(damage=None)])
+            self.assertEqual(reply['error'], "Invalid ability: Coup")
+            writer.close()
+
+            # A bug while resolving a turn ends the match with an error event
+            with mock.patch("src.net.battle_server.CombatSystem.attack", side_effect=TypeError("boom")):
+                players = [await join(server, [code()]) for _ in range(2)]
+                events = []
+                for reader, writer, _ in players:
+                    await send_message(writer, {"op": "move", "turn": 1, "ability": 0})
+                for reader, writer, _ in players:
+                    while True:
+                        msg = await asyncio.wait_for(read_message(reader), 5)
+                        if msg is None or msg.get('event') in ('error', 'end'):
+                            events.append(msg and msg['event'])
+                            break
+                    writer.close()
+            await asyncio.sleep(0.05)
+            return events
+
+        self.assertEqual(self.run_with_server(scenario), ['error', 'error'])
+
+    def test_run_bots_stats(self):
+        async def scenario(server):
+            return await run_bots("127.0.0.1", server.port, bots=40)
+
+        stats = self.run_with_server(scenario)
+        self.assertEqual(stats['errors'], 0)
+        self.assertGreater(stats['turns'], 0)
+
+
+class TestImageBackend(unittest.TestCase):
+    """Pooled downloads against a local stand-in for an image generation service."""
+
+    def setUp(self):
+        import gzip, hashlib, io, json, threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new("RGBA", (64, 64), (200, 40, 40, 255)).save(buf, "PNG")
+        png = buf.getvalue()
+        self.png_sha = hashlib.sha256(png).hexdigest()
+        self.tmp = tempfile.TemporaryDirectory()
+        clients = self.clients = set()
+        png_sha = self.png_sha
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, body, content_type="image/png", length=None, encoding=None):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                self.send_header("Content-Length", str(len(body) if length is None else length))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                clients.add(self.client_address)
+                if self.path == "/truncated.png":
+                    self.reply(png[:100], length=len(png))
+                    self.close_connection = True
+                elif self.path == "/gzip.png":
+                    self.reply(gzip.compress(png), encoding="gzip")
+                else:
+                    self.reply(png)
+
+            def do_POST(self):
+                clients.add(self.client_address)
+                self.rfile.read(int(self.headers["Content-Length"]))
+                self.reply(json.dumps({"url": "/images/1.png", "sha256": png_sha}).encode(), "application/json")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        close_session()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_pooled_streaming_download(self):
+        dest = os.path.join(self.tmp.name, "a.png")
+        for _ in range(5):
+            self.assertEqual(download(f"{self.base}/images/1.png", dest, sha256=self.png_sha), self.png_sha)
+        self.assertEqual(len(self.clients), 1) # One kept-alive connection for every call
+
+        bad = os.path.join(self.tmp.name, "bad.png")
+        with self.assertRaises(DownloadError):
+            download(f"{self.base}/images/1.png", bad, sha256="0" * 64)
+        with self.assertRaises(DownloadError):
+            download(f"{self.base}/images/1.png", bad, max_bytes=10)
+        with self.assertRaises(DownloadError):
+            download(f"{self.base}/truncated.png", bad)
+        self.assertEqual(os.listdir(self.tmp.name), ["a.png"]) # No partial file left
+
+        # Compressed by the backend: Content-Length is the gzip size, the file the decoded PNG
+        self.assertEqual(download(f"{self.base}/gzip.png", dest, sha256=self.png_sha), self.png_sha)
+
+    def test_ai_manager_uses_backend(self):
+        from src.ai_manager import AIManager
+        ai = AIManager()
+        ai.image_backend_url = f"{self.base}/generate"
+        path = ai.generate_image("a red square", "wild_test")
+        self.assertTrue(path.endswith(".webp") or path.endswith(".png"))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(len(self.clients), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ from src.models import Monster, Ability
 from src.constants import get_type_multiplier
 from src.database import init_db, DB_PATH
 import os
+import sqlite3
 
 class TestNewFeatures(unittest.TestCase):
     def setUp(self):
@@ -45,5 +46,487 @@ class TestNewFeatures(unittest.TestCase):
         cursor.execute("SELECT count(*) as c FROM monsters")
         self.assertEqual(cursor.fetchone()['c'], 0)
 
+    def test_headless_service(self):
+        from src.offline_ai import OfflineAIManager
+        from src.service import GameService
+        service = GameService(GameEngine(ai=OfflineAIManager(seed=1)))
+
+        recruited = service.handle({"op": "recruit"})
+        self.assertTrue(recruited['ok'])
+        self.assertEqual(len(recruited['monster']['abilities']), 4)
+        self.assertIsNotNone(recruited['monster']['id'])
+        self.assertFalse(service.handle({"op": "recruit", "count": 0})['ok'])
+        self.assertFalse(service.handle({"op": "recruit", "count": -3})['ok'])
+
+        self.assertTrue(service.handle({"op": "buy", "item": "ball"})['ok'])
+        self.assertFalse(service.handle({"op": "buy", "item": "unknown"})['ok'])
+
+        fight = service.handle({"op": "fight"})
+        self.assertTrue(fight['ok'])
+        self.assertTrue(fight['log'])
+
+        code = service.handle({"op": "export", "uuid": recruited['monster']['uuid']})['code']
+        imported = service.handle({"op": "import", "code": code})
+        self.assertTrue(imported['ok'])
+        self.assertNotIn(imported['monster']['id'], (None, recruited['monster']['id'])) # A new row
+        self.assertFalse(service.handle({"op": "import", "code": code})['ok'])
+        self.assertFalse(service.handle({"op": "nope"})['ok'])
+
+    def test_evolve_requires_level(self):
+        m = Monster({"name": "Young", "type_1": "Eau", "level": 10, "hp_max": 50, "attack": 10})
+        ok, reason = self.engine.can_evolve(m)
+        self.assertFalse(ok)
+        m.level = 45
+        self.assertTrue(self.engine.can_evolve(m)[0])
+
+
+    def test_load_generator(self):
+        from src.loadgen import run_load
+        stats = run_load(players=2, iterations=2, roster=10)
+        self.assertEqual(stats['players'], 2)
+        self.assertEqual(stats['ops']['recruit']['count'], 4)
+        self.assertEqual(stats['ops']['recruit']['errors'], 0)
+
+        # Shared save: each player has its own money, so failures are lock errors only
+        shared = run_load(players=3, iterations=3, shared_db=True)
+        self.assertEqual(shared['ops']['recruit']['errors'], 0)
+        self.assertEqual(shared['ops']['recruit']['count'], 9)
+
+        from unittest import mock
+        with mock.patch("src.loadgen.SimulatedPlayer.run", side_effect=RuntimeError("boom")):
+            crashed = run_load(players=2, iterations=1)
+        self.assertEqual(crashed['crashed_players'], 2)
+
+    def test_ability_library(self):
+        from src.offline_ai import OfflineAIManager
+        offline = OfflineAIManager(seed=3)
+        calls = []
+
+        def generate_abilities(monster_type, count=5):
+            calls.append(monster_type)
+            return offline.generate_abilities(monster_type, count)
+
+        self.engine.ai.generate_abilities = generate_abilities
+        library = self.engine.abilities
+        library.min_per_type = 6
+
+        while library.size("Feu") < 6:
+            self.assertEqual(len(library.moveset("Feu", count=4)), 4)
+        calls.clear()
+
+        # Enough Feu abilities: movesets come from the library, distinct and of the right type
+        for level in (1, 50, 90):
+            moves = library.moveset("Feu", count=4, level=level)
+            self.assertEqual(len({m['name'] for m in moves}), 4)
+            self.assertTrue(all(m['type'] == "Feu" for m in moves))
+        self.assertEqual(calls, [])
+        library.moveset("Eau", count=4)
+        self.assertEqual(calls, ["Eau"])
+
+        # Fresh AI abilities go through the same rules: one support move at most, no legendary
+        def generate_supports(monster_type, count=5):
+            return [{"name": f"Soin {i}", "type": "Roche", "damage": 0, "heal": 20} for i in range(3)] + \
+                   [{"name": "Météore", "type": "Roche", "damage": 90, "is_legendary": True},
+                    {"name": "Caillou", "type": "Roche", "damage": 20}]
+
+        self.engine.ai.generate_abilities = generate_supports
+        moves = library.moveset("Roche", count=4)
+        self.assertEqual(sum(m['damage'] == 0 for m in moves), 1)
+        self.assertNotIn("Météore", [m['name'] for m in moves])
+
+    def test_monster_templates(self):
+        from src.monster_templates import TemplateLibrary
+        library = TemplateLibrary(self.engine.db_conn, min_library=2, reuse_rate=1.0)
+        fox = {"name": "Pyroflam", "type_1": "Feu", "hp_max": 110, "mp_max": 40, "attack": 22, "defense": 18,
+               "speed": 25, "description": "A small fox made of living flames with a long burning tail, cute pixel art."}
+        template, duplicate = library.register(fox, level=10)
+        self.assertFalse(duplicate)
+        self.assertEqual(template['hp_max'], 55) # Stored as level 1 stats
+
+        near = dict(fox, name="Pyroflamme", description=fox['description'].replace("long", "very long"))
+        match, duplicate = library.register(near, level=10)
+        self.assertTrue(duplicate)
+        self.assertEqual(match['id'], template['id'])
+
+        other = dict(fox, name="Aquarine", description="A huge jellyfish of flowing water that glows at night.")
+        self.assertFalse(library.register(other)[1])
+        self.assertEqual(len(library), 2)
+
+        # Library big enough: new encounters are remixed from it, scaled to their level
+        remixed = library.maybe_reuse(level=30)
+        self.assertIn(remixed['name'].split()[0], ("Pyroflam", "Aquarine"))
+        self.assertGreater(remixed['hp_max'], 110)
+        # Same data after a reload from the DB
+        self.assertEqual(len(TemplateLibrary(self.engine.db_conn)), 2)
+
+    def test_asset_store(self):
+        import tempfile
+        from src.asset_store import AssetStore, migrate
+        from src.procedural import ProceduralGenerator
+        with tempfile.TemporaryDirectory() as tmp:
+            store = AssetStore(root=os.path.join(tmp, "store"))
+            artist = ProceduralGenerator()
+            path = store.put_image(artist.draw_creature("Feu fox"))
+            self.assertTrue(path.startswith(os.path.join(tmp, "store")))
+            self.assertEqual(len(os.path.relpath(path, store.root).split(os.sep)), 3) # Two shard levels
+            # Same content: same file, nothing written again
+            self.assertEqual(store.put_image(artist.draw_creature("Feu fox")), path)
+            self.assertNotEqual(store.put_image(artist.draw_creature("Eau jellyfish")), path)
+
+            # References counted by the DB triggers
+            def refs(p):
+                row = self.engine.db_conn.execute("SELECT refcount FROM asset_refs WHERE path = ?", (p,)).fetchone()
+                return row[0] if row else 0
+            a, b = Monster({"name": "A", "type_1": "Feu"}), Monster({"name": "B", "type_1": "Feu"})
+            a.image_path = b.image_path = path
+            self.engine.save_monster(a)
+            self.engine.save_monster(b)
+            self.assertEqual(refs(path), 2)
+            legacy = os.path.join(tmp, "wild_b.png")
+            artist.draw_creature("Feu fox").save(legacy)
+            b.image_path = legacy
+            self.engine.save_monster(b)
+            self.engine.db_conn.execute("INSERT INTO evolution_cache (monster_uuid, stage, image_path) VALUES (?, 0, ?)",
+                                        (b.uuid, legacy))
+            self.assertEqual((refs(path), refs(legacy)), (1, 2))
+
+            # Legacy PNGs move into the store (deduplicated with the existing file)
+            self.assertEqual(migrate(self.engine.db_conn, store)[0], 1)
+            self.assertFalse(os.path.exists(legacy))
+            self.assertEqual(refs(path), 3)
+            self.assertEqual(self.engine.db_conn.execute("SELECT image_path FROM evolution_cache").fetchone()[0], path)
+            self.engine.db_conn.execute("DELETE FROM evolution_cache")
+            self.engine.db_conn.execute("DELETE FROM monsters")
+            self.assertEqual(refs(path), 0)
+
+    def test_asset_gc(self):
+        import tempfile
+        from src.asset_gc import AssetGC
+        from src.asset_store import AssetStore
+        from src.procedural import ProceduralGenerator
+        artist = ProceduralGenerator()
+        with tempfile.TemporaryDirectory() as tmp:
+            store = AssetStore(root=os.path.join(tmp, "store"))
+            owned, fled, old_art, new_art = (store.put_image(artist.draw_creature(d)) for d in
+                                             ("Feu fox", "Eau fish", "Plante tree", "Roche golem"))
+            monster = Monster({"name": "Mine", "type_1": "Feu"})
+            monster.image_path = owned
+            self.engine.save_monster(monster)
+            for name, path in (("Old", old_art), ("New", new_art)):
+                self.engine.templates.register({"name": name, "description": f"{name} art", "image_path": path})
+            os.utime(old_art, (1, 1)) # Least recently used
+            legacy = os.path.join(tmp, "wild_1234.png")
+            artist.draw_creature("Feu fox").save(legacy)
+
+            # Garbage: the fled encounter's art and legacy files nobody references
+            gc = AssetGC(store=store, grace_s=0, pause_s=0, legacy_dir=tmp, pack_path=None)
+            summary = gc.run_once()
+            self.assertEqual((summary["scanned"], summary["removed"], summary["evicted"]), (5, 2, 0))
+            self.assertFalse(os.path.exists(fled) or os.path.exists(legacy))
+
+            # Quota: template-only art goes first, least recently used first; owned art stays
+            gc.quota = summary["total_bytes"] - 1
+            self.assertEqual(gc.run_once()["evicted"], 1)
+            self.assertFalse(os.path.exists(old_art))
+            self.assertTrue(os.path.exists(owned) and os.path.exists(new_art))
+            row = self.engine.db_conn.execute("SELECT image_path FROM monster_templates WHERE name = 'Old'").fetchone()
+            self.assertIsNone(row[0])
+
+            # Reset: the roster's art is collected on the next pass
+            self.engine.reset_game()
+            gc.quota = 1 << 30
+            gc.run_once()
+            self.assertFalse(os.path.exists(owned))
+
+    def test_asset_pack(self):
+        import io, tempfile
+        from PIL import Image
+        from src.asset_pack import AssetPack, build_pack, is_stale
+        from src.asset_store import AssetStore
+        from src.procedural import ProceduralGenerator
+        artist = ProceduralGenerator()
+        with tempfile.TemporaryDirectory() as tmp:
+            store = AssetStore(root=os.path.join(tmp, "store"))
+            pack_path = os.path.join(tmp, "thumbs.pack")
+            paths = [store.put_image(artist.draw_creature(d)) for d in ("Feu fox", "Eau fish")]
+            for i, path in enumerate(paths):
+                monster = Monster({"name": f"M{i}", "type_1": "Feu"})
+                monster.image_path = path
+                self.engine.save_monster(monster)
+            self.assertTrue(is_stale(self.engine.db_conn, pack_path))
+            self.assertEqual(build_pack(self.engine.db_conn, pack_path, sizes=(100, 150)), (2, 2))
+            self.assertFalse(is_stale(self.engine.db_conn, pack_path))
+
+            pack = AssetPack(pack_path)
+            self.assertEqual(len(pack), 4)
+            self.assertEqual(Image.open(io.BytesIO(pack.get(paths[0], 150))).size, (150, 150))
+            self.assertIsNone(pack.get(paths[0], 64))
+            self.assertIsNone(pack.get("assets/unknown.png", 100))
+
+            # Rebuild after a capture: known entries are copied, only the new image is encoded
+            monster = Monster({"name": "M2", "type_1": "Eau"})
+            monster.image_path = store.put_image(artist.draw_creature("Plante tree"))
+            self.engine.save_monster(monster)
+            self.assertTrue(is_stale(self.engine.db_conn, pack_path))
+            first = pack.file
+            self.assertEqual(build_pack(self.engine.db_conn, pack_path, sizes=(100, 150)), (3, 1))
+            self.assertIsNotNone(pack.get(paths[0], 100)) # Still reading its own version
+            self.assertEqual(len(pack.reload()), 6)
+            self.assertNotEqual(pack.file, first) # A new file, never rewritten under a reader
+            self.assertIsNotNone(pack.get(monster.image_path, 100))
+
+            # An undecodable image counts as packed: no rebuild on every GC pass
+            broken = Monster({"name": "M3", "type_1": "Eau"})
+            broken.image_path = os.path.join(tmp, "broken.webp")
+            with open(broken.image_path, "wb") as f:
+                f.write(b"not an image")
+            self.engine.save_monster(broken)
+            self.assertEqual(build_pack(self.engine.db_conn, pack_path, sizes=(100, 150)), (3, 0))
+            self.assertFalse(is_stale(self.engine.db_conn, pack_path))
+            pack.close()
+            self.assertEqual([n for n in os.listdir(tmp) if n.endswith(".pack")], [os.path.basename(pack.reload().file)])
+            pack.close()
+
+    def test_image_job_queue(self):
+        import tempfile
+        from src.image_jobs import ImageJobQueue, PRIORITY_ACTIVE, PRIORITY_ROSTER, PRIORITY_PREFETCH
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "game.db")
+            init_db(db_path)
+
+            class FakeAI:
+                calls = []
+
+                def generate_image(self, description, filename_prefix):
+                    self.calls.append(description)
+                    if description == "broken art":
+                        raise RuntimeError("API down")
+                    return os.path.join(tmp, f"{description}.png")
+
+            ai = FakeAI()
+            engine = GameEngine(db_path=db_path, ai=ai)
+            queue = ImageJobQueue(ai, db_path=db_path, workers=0)
+            monster = Monster({"name": "Captured", "type_1": "Feu"})
+            engine.save_monster(monster) # Captured before its image is ready
+            seen = []
+            self.assertIsNone(queue.submit("roster art", PRIORITY_ROSTER, targets=[('monster', monster.uuid)]))
+            queue.submit("prefetch art", PRIORITY_PREFETCH)
+            queue.submit("enemy art", PRIORITY_ACTIVE, on_done=seen.append)
+            queue.submit("roster art", PRIORITY_ROSTER) # Same prompt: same job
+            self.assertEqual(queue.status(), {'pending': 3})
+
+            # Crash while running: the job is resumed on the next start
+            with queue.lock:
+                queue._claim()
+            self.assertEqual(queue.status(), {'pending': 2, 'running': 1})
+            stale = engine.get_monster(monster.uuid) # e.g. the combat team, loaded before the image
+            queue = ImageJobQueue(ai, db_path=db_path, workers=0).start()
+            queue.drain()
+            self.assertEqual(ai.calls, ["enemy art", "roster art", "prefetch art"])
+            self.assertEqual(engine.get_monster(monster.uuid).image_path, os.path.join(tmp, "roster art.png"))
+            stale.xp += 10
+            engine.save_monster(stale) # Does not write its missing image back
+            self.assertEqual(engine.get_monster(monster.uuid).image_path, os.path.join(tmp, "roster art.png"))
+
+            # Already rendered (file still there): no new job, targets applied at once
+            enemy_art = os.path.join(tmp, "enemy art.png")
+            open(enemy_art, "wb").close()
+            self.assertEqual(queue.submit("enemy art", PRIORITY_ACTIVE, on_done=seen.append), enemy_art)
+            self.assertEqual(seen, [enemy_art])
+            self.assertEqual(len(ai.calls), 3)
+
+            # Given up after max_attempts: waiting objects are told (None), once
+            queue.submit("broken art", PRIORITY_ACTIVE, on_done=seen.append)
+            queue.drain()
+            self.assertEqual(ai.calls.count("broken art"), queue.max_attempts)
+            self.assertEqual(queue.status().get('failed'), 1)
+            self.assertEqual(seen, [enemy_art, None])
+            self.assertEqual(queue.callbacks, {})
+            conn = queue._conn()
+            queue.stop() # Closes the connections of the queue
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+            engine.db_conn.close()
+
+    def test_evolution_prefetch(self):
+        from src.evolution_prefetch import EvolutionPrefetcher
+        from src.image_jobs import ImageJobQueue
+        calls = []
+
+        def evolve(stats, stage):
+            calls.append(stats['name'])
+            return {"name": "Grand" + stats['name'], "description": "evolved", "hp_max": stats['hp_max'] * 2}
+
+        self.engine.ai.evolve_monster_stats = evolve
+        self.engine.ai.can_prefetch = lambda: True
+        prefetcher = EvolutionPrefetcher(self.engine, window=3)
+        far = Monster({"name": "Far", "type_1": "Feu", "level": 30, "hp_max": 100})
+        close = Monster({"name": "Close", "type_1": "Feu", "level": 42, "hp_max": 100})
+        self.engine.save_monster(far)
+        self.engine.save_monster(close)
+        self.assertEqual(prefetcher.scan(), 1)
+        self.assertFalse(prefetcher.notify(close)) # Already queued
+        # The queued image only goes to the evolution it was made for, not to another stage
+        self.engine.db_conn.execute("INSERT INTO evolution_cache (monster_uuid, stage, name) VALUES (?, 1, 'Later')",
+                                    (close.uuid,))
+        self.engine.db_conn.commit()
+        self.engine.image_jobs = ImageJobQueue(self.engine.ai, workers=0)
+        prefetcher.drain()
+        self.engine.image_jobs.drain()
+        self.engine.image_jobs = None
+        self.assertEqual(calls, ["Close"])
+        rows = self.engine.db_conn.execute("SELECT stage, image_path FROM evolution_cache ORDER BY stage").fetchall()
+        self.assertEqual([tuple(row) for row in rows], [(0, "test.png"), (1, None)])
+        self.engine.db_conn.execute("DELETE FROM evolution_cache WHERE stage = 1")
+        self.engine.db_conn.commit()
+
+        # Levels gained since the prefetch still count; the evolution costs no AI call
+        close.level, close.hp_max = 45, 110
+        from unittest import mock
+        with mock.patch.object(self.engine, "save_monster", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                self.engine.evolve_monster(Monster(close.to_dict()))
+        self.assertIsNotNone(self.engine.db_conn.execute("SELECT 1 FROM evolution_cache").fetchone()) # Kept
+        ok, _ = self.engine.evolve_monster(close)
+        self.assertTrue(ok)
+        self.assertEqual(calls, ["Close"])
+        self.assertEqual((close.name, close.hp_max, close.image_path), ("GrandClose", 220, "test.png"))
+        self.assertIsNone(self.engine.db_conn.execute("SELECT 1 FROM evolution_cache").fetchone())
+
+        # Over budget: nothing speculative
+        self.engine.ai.can_prefetch = lambda: False
+        far.level = 44
+        self.assertFalse(prefetcher.notify(far))
+
+    def test_batch_operations(self):
+        import threading, time
+        from src.game_engine import RecruitmentSystem
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow_stats(level, context):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            if context == "boom":
+                raise RuntimeError("AI down")
+            return {"name": "Recrue", "hp_max": 50, "attack": 5, "defense": 5, "speed": 5,
+                    "type_1": "Eau", "type_2": None, "mp_max": 10, "is_mythical": False}
+
+        self.engine.ai.generate_monster_stats = slow_stats
+        self.engine.ai.generate_abilities = lambda monster_type, count=5: []
+        recruitment = RecruitmentSystem(self.engine)
+        self.assertEqual(recruitment.draft_monsters(3), ([], "Not enough money")) # 1500 > 1000
+        self.assertEqual(recruitment.draft_monsters(0), ([], "Invalid count"))
+        images = []
+        self.engine.ai.generate_image = lambda d, f: images.append(threading.current_thread()) or "test.png"
+        # Money spent while the stats were generated: no image or ability for nothing
+        self.assertEqual(recruitment.draft_monsters(2, progress=lambda done, total: self.engine.update_player_money(
+            -self.engine.get_player_money())), ([], "Not enough money"))
+        self.assertEqual(images, [])
+        self.engine.update_player_money(5000)
+        seen = []
+        monsters, _ = recruitment.draft_monsters(4, progress=lambda done, total: seen.append((done, total)))
+        self.assertEqual(len(monsters), 4)
+        self.assertGreater(peak[0], 1)
+        self.assertEqual(seen[-1], (4, 4))
+        self.assertEqual(self.engine.get_player_money(), 3000)
+        self.assertEqual(len(self.engine.get_all_monsters()), 4)
+
+        # One failed generation: nothing is paid, nothing is saved
+        self.engine.ai.generate_monster_stats = lambda level, context: slow_stats(level, "boom")
+        with self.assertRaises(RuntimeError):
+            recruitment.draft_monsters(2)
+        self.assertEqual(self.engine.get_player_money(), 3000)
+        self.assertEqual(len(self.engine.get_all_monsters()), 4)
+
+        for monster in monsters[:2]:
+            monster.level = 45
+            self.engine.save_monster(monster)
+        self.engine.db_conn.execute('''
+            INSERT INTO evolution_cache (monster_uuid, stage, name, description, ratios) VALUES (?, 0, 'Prefetched', 'p', '{}')
+        ''', (monsters[1].uuid,))
+        self.engine.db_conn.commit()
+
+        def evolve(stats, stage):
+            if stats['name'] == "Boom":
+                raise RuntimeError("AI down")
+            return {"name": "Grand" + stats['name'], "attack": 50}
+
+        # A failed batch evolves nothing and keeps the prefetched evolution
+        self.engine.ai.evolve_monster_stats = evolve
+        monsters[0].name = "Boom"
+        self.engine.save_monster(monsters[0])
+        with self.assertRaises(RuntimeError):
+            self.engine.evolve_all()
+        self.assertIsNotNone(self.engine.db_conn.execute("SELECT 1 FROM evolution_cache").fetchone())
+
+        monsters[0].name = "Recrue"
+        self.engine.save_monster(monsters[0])
+        images.clear()
+        evolved = self.engine.evolve_all()
+        self.assertEqual(sorted(m.uuid for m in evolved), sorted(m.uuid for m in monsters[:2]))
+        self.assertEqual(images, [threading.current_thread()] * 2) # Requested by the caller, not the workers
+        stages = {m.uuid: (m.evolution_stage, m.name, m.attack) for m in self.engine.get_all_monsters()}
+        self.assertEqual(stages[monsters[0].uuid], (1, "GrandRecrue", 50))
+        self.assertEqual(stages[monsters[1].uuid][:2], (1, "Prefetched"))
+        self.assertEqual(stages[monsters[2].uuid], (0, "Recrue", 5))
+        self.assertIsNone(self.engine.db_conn.execute("SELECT 1 FROM evolution_cache").fetchone())
+
+    def test_metrics_spans(self):
+        import json, tempfile
+        from src.metrics import Metrics
+        registry = Metrics()
+        with registry.span("outer"):
+            with registry.span("inner", size=3):
+                pass
+        with self.assertRaises(ValueError):
+            with registry.span("outer"):
+                raise ValueError("boom")
+        self.assertEqual([s.path for s in registry.spans], ["outer > inner", "outer", "outer"])
+        self.assertEqual(registry.snapshot()['histograms']['outer']['errors'], 1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(registry.export_chrome_trace(os.path.join(tmp, "trace.json"))) as f:
+                events = json.load(f)['traceEvents']
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[0]['args'], {'size': 3})
+
+    def test_query_profiler(self):
+        from src.loadgen import seed_roster
+        from src.service import GameService
+        seed_roster(DB_PATH, 12)
+        profiler = self.engine.enable_sql_profiler(slow_ms=0, log_path=None)
+        self.assertTrue(GameService(self.engine).handle({"op": "state"})['ok'])
+        report = profiler.report()
+
+        counts = {s['sql']: s['count'] for s in report['statements']}
+        self.assertEqual(counts["SELECT * FROM monsters"], 1)
+        # get_all_monsters loads abilities one monster at a time
+        self.assertEqual(len(report['n_plus_one']), 1)
+        self.assertEqual(report['n_plus_one'][0]['action'], "service.state")
+        self.assertEqual(report['n_plus_one'][0]['max_per_action'], 12)
+        self.assertTrue(all(q['plan'] for q in report['slow_queries'] if q['sql'].startswith("SELECT")))
+
+    def test_stall_watchdog(self):
+        import time
+        from src.watchdog import StallWatchdog
+        watchdog = StallWatchdog(threshold_ms=50, log_path=None).start()
+
+        def blocking_work():
+            time.sleep(0.2) # No tick: the "event loop" is stuck here
+
+        blocking_work()
+        watchdog.tick()
+        time.sleep(0.05)
+        watchdog.stop()
+        self.assertEqual(len(watchdog.stalls), 1)
+        self.assertGreaterEqual(watchdog.stalls[0]['duration_ms'], 150)
+        self.assertIn("blocking_work", watchdog.stalls[0]['culprit'])
+
+
 if __name__ == '__main__':
     unittest.main()